@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+xlsx2md 性能基准测试
+对比逐行渲染(iterrows)与按列向量化渲染Markdown表格的速度
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+import pandas as pd
+
+from xlsx2md import ExcelToMarkdownConverter
+
+
+def render_rows_iterrows(df: pd.DataFrame) -> list:
+    """原逐行渲染实现，作为对比基准"""
+    rows = []
+    for _, row in df.iterrows():
+        row_values = []
+        for value in row:
+            if pd.isna(value) or value is None:
+                row_values.append("")
+            else:
+                row_values.append(str(value).replace("|", "\\|").replace("\n", "<br>"))
+        rows.append("| " + " | ".join(row_values) + " |")
+    return rows
+
+
+def load_large_sample() -> pd.DataFrame:
+    """读取create_large_sample()生成的大型示例文件，不存在时先创建"""
+    sample_file = Path("sample_data") / "sample_large.xlsx"
+    if not sample_file.exists():
+        from create_sample_data import create_large_sample
+        sample_file.parent.mkdir(exist_ok=True)
+        create_large_sample()
+
+    sheets = ExcelToMarkdownConverter().read_excel_file(str(sample_file))
+    return next(iter(sheets.values()))
+
+
+def time_render(render, df: pd.DataFrame, repeat: int) -> float:
+    """返回多次运行中最快一次的耗时（秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        render(df)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='xlsx2md Markdown表格渲染性能基准测试')
+    parser.add_argument('--repeat', '-r', type=int, default=3,
+                       help='每种实现运行的次数，取最快一次（默认: 3）')
+    args = parser.parse_args()
+
+    df = load_large_sample()
+    converter = ExcelToMarkdownConverter()
+
+    if render_rows_iterrows(df) != converter.render_table_rows(df):
+        print("❌ 向量化渲染结果与逐行渲染不一致")
+        return 1
+
+    print(f"\n数据规模: {len(df)} 行 × {len(df.columns)} 列")
+    results = [
+        ("逐行渲染 (iterrows)", time_render(render_rows_iterrows, df, args.repeat)),
+        ("按列向量化渲染", time_render(converter.render_table_rows, df, args.repeat)),
+    ]
+    for name, seconds in results:
+        print(f"  {name}: {seconds:.3f} 秒, {len(df) / seconds:,.0f} 行/秒")
+    print(f"  加速比: {results[0][1] / results[1][1]:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Markdown输出压缩模块
+xlsx2md 和 merge_markdown 共用：输出文件名以 .md.gz / .md.zst 结尾时，通过流式压缩器写入，
+不生成未压缩的中间文件，也不需要额外的压缩步骤。
+
+- gzip: 标准库gzip，压缩级别6（与gzip命令行默认一致），头部不记录时间，相同内容生成相同的文件
+- zstd: 需要安装zstandard库，压缩和解压都比gzip快得多
+"""
+
+import gzip
+import io
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional, Union
+
+# 可选的压缩格式及其文件扩展名
+COMPRESSIONS = {'gzip': '.gz', 'zstd': '.zst'}
+
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+# 压缩流的写入缓冲区大小，减少逐行写入时调用压缩器的次数
+WRITE_BUFFER_SIZE = 1 << 20
+
+PathLike = Union[str, Path]
+
+
+def require_zstandard():
+    """导入zstandard，未安装时给出安装提示"""
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("zstd压缩需要安装zstandard库: pip install zstandard")
+    return zstandard
+
+
+def compression_from_path(path: PathLike) -> Optional[str]:
+    """根据文件扩展名判断压缩格式，未压缩时返回None"""
+    suffix = Path(path).suffix.lower()
+    for compression, extension in COMPRESSIONS.items():
+        if suffix == extension:
+            return compression
+    return None
+
+
+def strip_compression_suffix(path: PathLike) -> Path:
+    """去掉压缩扩展名：a.md.gz -> a.md"""
+    path = Path(path)
+    return path.with_suffix('') if compression_from_path(path) else path
+
+
+def with_compression_suffix(path: PathLike, compression: Optional[str]) -> Path:
+    """按压缩格式设置扩展名：a.md -> a.md.gz；compression为None时保持原路径"""
+    path = Path(path)
+    if compression is None:
+        return path
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"不支持的压缩格式: {compression}，可选: {', '.join(COMPRESSIONS)}")
+    return strip_compression_suffix(path).with_name(
+        strip_compression_suffix(path).name + COMPRESSIONS[compression]
+    )
+
+
+def markdown_stem(path: PathLike) -> str:
+    """输出文件的主文件名（不含压缩扩展名和.md），用于命名 _data/、.delta.md 等附属文件"""
+    return strip_compression_suffix(path).stem
+
+
+@contextmanager
+def open_markdown_writer(path: PathLike, name: Optional[PathLike] = None):
+    """
+    打开Markdown输出文件（文本模式，UTF-8）
+
+    Args:
+        path: 实际写入的路径（通常是临时文件）
+        name: 最终的输出文件名，用于判断压缩格式，为空时使用path
+    """
+    target = Path(name or path)
+    compression = compression_from_path(target)
+    if compression is None:
+        with open(path, 'w', encoding='utf-8') as out:
+            yield out
+        return
+
+    with open(path, 'wb') as raw:
+        if compression == 'gzip':
+            # gzip头部记录去掉.gz后的原始文件名
+            stream = gzip.GzipFile(filename=str(strip_compression_suffix(target)), mode='wb',
+                                   fileobj=raw, compresslevel=GZIP_LEVEL, mtime=0)
+        else:
+            compressor = require_zstandard().ZstdCompressor(level=ZSTD_LEVEL)
+            stream = io.BufferedWriter(
+                compressor.stream_writer(raw, closefd=False, write_return_read=True),
+                buffer_size=WRITE_BUFFER_SIZE
+            )
+        with io.TextIOWrapper(stream, encoding='utf-8') as out:
+            yield out
+
+
+def plain_output_fd(out) -> Optional[int]:
+    """
+    open_markdown_writer返回的输出未压缩时返回其文件描述符（可直接在内核中拷贝数据），压缩时返回None
+
+    调用方在写入文件描述符前需要先flush文本层和缓冲层。
+    """
+    buffer = getattr(out, 'buffer', None)
+    if isinstance(buffer, io.BufferedWriter) and isinstance(buffer.raw, io.FileIO):
+        return buffer.raw.fileno()
+    return None
+
+
+def open_markdown_reader(path: PathLike, errors: str = 'strict'):
+    """按扩展名打开Markdown文件用于读取（文本模式，UTF-8），自动解压 .gz / .zst"""
+    compression = compression_from_path(path)
+    if compression == 'gzip':
+        return gzip.open(path, 'rt', encoding='utf-8', errors=errors)
+    if compression == 'zstd':
+        raw = open(path, 'rb')
+        try:
+            reader = require_zstandard().ZstdDecompressor().stream_reader(raw, closefd=True)
+        except Exception:
+            raw.close()
+            raise
+        return io.TextIOWrapper(io.BufferedReader(reader), encoding='utf-8', errors=errors)
+    return open(path, 'r', encoding='utf-8', errors=errors)
@@ -7,10 +7,183 @@ Markdown文件合并工具
 import os
 import sys
 import argparse
+import json
 import re
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Tuple, Optional
+from typing import Any, Callable, Iterable, Iterator, List, Dict, Tuple, Optional
+
+from markdown_compression import COMPRESSIONS, open_markdown_writer, plain_output_fd, with_compression_suffix
+
+# 内核拷贝每次调用的最大字节数
+COPY_CHUNK_SIZE = 1 << 30
+
+
+def copy_file_data(source_fd: int, target_fd: int, count: int) -> int:
+    """
+    在内核中把source_fd当前位置起的count字节拷贝到target_fd的当前位置，数据不经过用户空间
+
+    优先使用copy_file_range（同一文件系统上可能直接共享数据块），不支持时（跨文件系统的旧内核、
+    非Linux系统等）改用sendfile；两者都不可用时返回已拷贝的字节数，由调用方用缓冲读写拷贝剩余部分。
+
+    Returns:
+        已拷贝的字节数（源文件提前结束时可能小于count）
+    """
+    copied = 0
+    for copy in (getattr(os, 'copy_file_range', None), getattr(os, 'sendfile', None)):
+        if copy is None:
+            continue
+        try:
+            while copied < count:
+                if copy is os.sendfile:
+                    sent = copy(target_fd, source_fd, None, min(count - copied, COPY_CHUNK_SIZE))
+                else:
+                    sent = copy(source_fd, target_fd, min(count - copied, COPY_CHUNK_SIZE))
+                if sent == 0:
+                    return copied
+                copied += sent
+            return copied
+        except OSError:
+            # 尚未拷贝任何数据时换下一种方式；已拷贝部分数据时由调用方缓冲拷贝剩余部分
+            if copied:
+                return copied
+    return copied
+
+
+def iter_read_ahead(func: Callable[[Any], Any], items: Iterable, depth: int,
+                    discard: Optional[Callable[[Any], None]] = None) -> Iterator[Tuple[Any, Any, Optional[Exception]]]:
+    """
+    按items的顺序返回func(item)的结果，后台线程最多提前处理depth个item
+    
+    网络文件系统或冷缓存目录中读取文件主要是在等待I/O，调用方处理当前文件时，
+    线程池已在读取后面的文件；已完成但尚未取走的结果最多depth个，内存占用有上限。
+    
+    Args:
+        func: 处理一个item的函数（在线程池中执行）
+        items: 待处理的item
+        depth: 预读数量，小于1时在当前线程中逐个处理
+        discard: 提前结束迭代时用于释放已完成、但未被取走的结果（如关闭文件）
+        
+    Yields:
+        (item, 结果, None)；func抛出异常时为 (item, None, 异常)
+    """
+    if depth < 1:
+        for item in items:
+            try:
+                result = func(item)
+            except Exception as e:
+                yield item, None, e
+            else:
+                yield item, result, None
+        return
+    
+    items = iter(items)
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=depth) as executor:
+        try:
+            for item in items:
+                pending.append((item, executor.submit(func, item)))
+                if len(pending) >= depth:
+                    break
+            while pending:
+                item, future = pending.popleft()
+                # 取走一个结果前先补充一个任务，保持depth个文件在后台读取
+                for next_item in items:
+                    pending.append((next_item, executor.submit(func, next_item)))
+                    break
+                try:
+                    result = future.result()
+                except Exception as e:
+                    yield item, None, e
+                else:
+                    yield item, result, None
+        finally:
+            for _, future in pending:
+                future.cancel()
+            for _, future in pending:
+                if discard is not None and not future.cancelled():
+                    try:
+                        discard(future.result())
+                    except Exception:
+                        pass
+
+class MetadataCache:
+    """
+    文件元信息缓存：记录每个Markdown文件的大小、修改时间、标题、标题来源、行数以及正文能否按原样拷贝
+
+    缓存保存在输出文件所在目录的 .merge_markdown_cache.json 中，以文件绝对路径为键
+    （使用os.path.abspath，不逐级解析符号链接，大量文件时不增加额外的系统调用）。
+    大小和修改时间与记录一致时直接使用记录的元信息，生成目录时不必读取文件。
+    """
+    
+    FILE_NAME = '.merge_markdown_cache.json'
+    VERSION = 2
+    
+    def __init__(self, directory: Path):
+        """
+        加载目录中的缓存（不存在或损坏时从空缓存开始）
+        
+        Args:
+            directory: 缓存文件所在目录（输出文件所在目录）
+        """
+        self.path = Path(directory) / self.FILE_NAME
+        self.entries: Dict[str, Dict] = {}
+        self.dirty = False
+        # 本次合并中使用缓存记录的文件数
+        self.hits = 0
+        # 预读线程同时查询和更新缓存
+        self.lock = threading.Lock()
+        
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('version') == self.VERSION:
+                    self.entries = data.get('files', {})
+            except (OSError, ValueError) as e:
+                print(f"警告: 元信息缓存读取失败，将重新建立: {e}")
+    
+    @staticmethod
+    def file_key(file_path: Path) -> str:
+        """缓存中使用的文件键（绝对路径）"""
+        return os.path.abspath(file_path)
+    
+    def get(self, file_path: Path, stat: os.stat_result) -> Optional[Dict]:
+        """返回文件的元信息，文件大小或修改时间与记录不一致时返回None"""
+        info = self.entries.get(self.file_key(file_path))
+        if info is None or info['size'] != stat.st_size or info['mtime_ns'] != stat.st_mtime_ns:
+            return None
+        with self.lock:
+            self.hits += 1
+        return info
+    
+    def put(self, file_path: Path, info: Dict):
+        """记录文件的元信息"""
+        with self.lock:
+            self.entries[self.file_key(file_path)] = info
+            self.dirty = True
+    
+    def prune(self, directory: Path, files: List[Path]):
+        """删除directory下已不存在（不在本次合并的文件列表中）的文件记录"""
+        prefix = os.path.join(self.file_key(directory), '')
+        current = {self.file_key(file_path) for file_path in files}
+        for key in [key for key in self.entries if key.startswith(prefix) and key not in current]:
+            del self.entries[key]
+            self.dirty = True
+    
+    def save(self):
+        """原子地写入缓存文件"""
+        if not self.dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': self.VERSION, 'files': self.entries}, f, ensure_ascii=False)
+        os.replace(temp_path, self.path)
+        self.dirty = False
 
 class MarkdownMerger:
     """Markdown文件合并器"""
@@ -61,40 +234,138 @@ class MarkdownMerger:
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
                 content = f.read()
-                
-            # 方法1: 查找第一个一级标题
-            match = re.search(r'^#\s+(.+)$', content, re.MULTILINE)
-            if match:
-                return match.group(1).strip(), "一级标题"
-            
-            # 方法2: 查找第一个二级标题
-            match = re.search(r'^##\s+(.+)$', content, re.MULTILINE)
-            if match:
-                return match.group(1).strip(), "二级标题"
-            
-            # 方法3: 使用第一行非空行
-            lines = content.strip().split('\n')
-            for line in lines:
-                if line.strip():
-                    # 移除Markdown标记
-                    clean_line = re.sub(r'^#+\s*', '', line.strip())
-                    if clean_line:
-                        return clean_line[:100], "第一行"
-            
-            # 方法4: 使用文件名
-            return file_path.stem.replace('_', ' ').replace('-', ' ').title(), "文件名"
+            return self.extract_title_from_content(content, file_path)
             
         except Exception as e:
             print(f"警告: 无法读取文件 {file_path}: {e}")
             return file_path.stem, "文件名（错误）"
     
-    def generate_table_of_contents(self, files: List[Path], base_dir: Path) -> str:
+    def extract_title_from_content(self, content: str, file_path: Path) -> Tuple[str, str]:
+        """
+        从已读取的文件内容中提取标题
+        
+        Args:
+            content: 文件内容
+            file_path: 文件路径（没有标题时使用文件名）
+            
+        Returns:
+            (标题, 提取方法)
+        """
+        # 方法1: 查找第一个一级标题
+        match = re.search(r'^#\s+(.+)$', content, re.MULTILINE)
+        if match:
+            return match.group(1).strip(), "一级标题"
+        
+        # 方法2: 查找第一个二级标题
+        match = re.search(r'^##\s+(.+)$', content, re.MULTILINE)
+        if match:
+            return match.group(1).strip(), "二级标题"
+        
+        # 方法3: 使用第一行非空行
+        lines = content.strip().split('\n')
+        for line in lines:
+            if line.strip():
+                # 移除Markdown标记
+                clean_line = re.sub(r'^#+\s*', '', line.strip())
+                if clean_line:
+                    return clean_line[:100], "第一行"
+        
+        # 方法4: 使用文件名
+        return file_path.stem.replace('_', ' ').replace('-', ' ').title(), "文件名"
+    
+    def decode_content(self, data: bytes) -> str:
+        """按文本模式读取的规则解码文件内容：UTF-8，\\r\\n和\\r转换为\\n"""
+        content = data.decode('utf-8')
+        if '\r' in content:
+            content = content.replace('\r\n', '\n').replace('\r', '\n')
+        return content
+    
+    def is_verbatim(self, data: bytes) -> bool:
+        """
+        正文能否按原样拷贝：以换行结尾且不含\\r（文本模式读写后字节不变，也不需要补换行）
+        
+        data须已能按UTF-8解码。
+        """
+        return data.endswith(b'\n') and b'\r' not in data and os.linesep == '\n'
+    
+    def describe_content(self, content: str, file_path: Path, stat: os.stat_result,
+                         verbatim: bool = False) -> Dict:
+        """根据已读取的文件内容生成元信息：大小、修改时间、标题、标题来源、行数以及正文能否按原样拷贝"""
+        title, method = self.extract_title_from_content(content, file_path)
+        return {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'title': title,
+            'title_source': method,
+            'lines': content.count('\n') + 1,
+            'verbatim': verbatim
+        }
+    
+    def describe_data(self, data: bytes, file_path: Path, stat: os.stat_result) -> Dict:
+        """
+        根据读取的文件字节生成元信息
+        
+        Raises:
+            UnicodeDecodeError: 文件不是有效的UTF-8
+        """
+        return self.describe_content(self.decode_content(data), file_path, stat, self.is_verbatim(data))
+    
+    def scan_file(self, file_path: Path, cache: Optional[MetadataCache] = None) -> Dict:
+        """
+        获取文件的元信息：缓存中的记录仍然有效时不读取文件，否则只读取一次
+        
+        Args:
+            file_path: 文件路径
+            cache: 可选的元信息缓存
+            
+        Returns:
+            元信息（见describe_content）
+            
+        Raises:
+            OSError, UnicodeDecodeError: 文件无法读取
+        """
+        if cache is not None:
+            info = cache.get(file_path, file_path.stat())
+            if info is not None:
+                return info
+        with open(file_path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            data = f.read()
+        info = self.describe_data(data, file_path, stat)
+        if cache is not None:
+            cache.put(file_path, info)
+        return info
+    
+    def scan_files(self, files: List[Path], cache: Optional[MetadataCache] = None,
+                   read_ahead: int = 0) -> Dict[Path, Optional[Dict]]:
+        """
+        获取所有文件的元信息，无法读取的文件记为None
+        
+        Args:
+            files: 文件列表
+            cache: 可选的元信息缓存
+            read_ahead: 后台线程同时读取的文件数，0为逐个读取
+            
+        Returns:
+            文件路径 -> 元信息（顺序与files相同）
+        """
+        infos = {}
+        scan = lambda file_path: self.scan_file(file_path, cache)
+        for file_path, info, error in iter_read_ahead(scan, files, read_ahead):
+            if error is not None:
+                print(f"警告: 无法读取文件 {file_path}: {error}")
+            infos[file_path] = info
+        return infos
+    
+    def generate_table_of_contents(self, files: List[Path], base_dir: Path,
+                                   infos: Optional[Dict[Path, Optional[Dict]]] = None) -> str:
         """
         生成目录
         
         Args:
             files: 文件列表
             base_dir: 基础目录（用于计算相对路径）
+            infos: scan_files返回的元信息，为空时读取各文件提取标题
             
         Returns:
             目录Markdown文本
@@ -102,14 +373,18 @@ class MarkdownMerger:
         if not files:
             return "## 目录\n\n（无Markdown文件）\n\n"
         
+        if infos is None:
+            infos = self.scan_files(files)
+        
         toc_lines = ["## 📚 目录\n\n"]
         
         for i, file_path in enumerate(files, 1):
             # 计算相对路径
             rel_path = file_path.relative_to(base_dir) if file_path.is_relative_to(base_dir) else file_path
             
-            # 提取标题
-            title, method = self.extract_title_from_file(file_path)
+            # 使用扫描得到的标题
+            info = infos.get(file_path)
+            title = info['title'] if info is not None else file_path.stem
             
             # 创建目录项
             toc_lines.append(f"{i}. **[{title}](#{self.slugify(title)})**  \n")
@@ -138,20 +413,30 @@ class MarkdownMerger:
     def merge_files(self, input_dir: Path, output_file: Path, 
                    recursive: bool = True, 
                    include_toc: bool = True,
-                   add_separators: bool = True) -> Dict:
+                   add_separators: bool = True,
+                   compression: Optional[str] = None,
+                   use_cache: bool = True,
+                   read_ahead: int = 0) -> Dict:
         """
         合并Markdown文件
         
         Args:
             input_dir: 输入目录
-            output_file: 输出文件
+            output_file: 输出文件（以 .md.gz / .md.zst 结尾时压缩写出）
             recursive: 是否递归查找
             include_toc: 是否包含目录
             add_separators: 是否添加文件分隔符
+            compression: 输出压缩格式（gzip/zstd），输出文件名自动加上 .gz / .zst
+            use_cache: 是否使用输出目录中的元信息缓存（文件未变化时生成目录不再读取文件）
+            read_ahead: 后台线程预读的文件数（写入当前文件时提前打开和读取后面的文件），
+                        默认0为逐个读取，内存占用只与最大的单个文件有关；
+                        开启后最多read_ahead个文件的内容同时驻留内存
             
         Returns:
             合并统计信息
         """
+        output_file = with_compression_suffix(output_file, compression)
+        
         # 验证输入目录
         if not input_dir.exists():
             raise FileNotFoundError(f"输入目录不存在: {input_dir}")
@@ -168,8 +453,6 @@ class MarkdownMerger:
         
         print(f"找到 {len(md_files)} 个Markdown文件")
         
-        # 准备输出
-        output_content = []
         stats = {
             'input_dir': str(input_dir),
             'output_file': str(output_file),
@@ -180,104 +463,52 @@ class MarkdownMerger:
             'total_size': 0
         }
         
-        # 添加文件头
-        output_content.append(f"# 📄 合并Markdown文档\n\n")
-        output_content.append(f"**来源目录**: `{input_dir}`  \n")
-        output_content.append(f"**生成时间**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}  \n")
-        output_content.append(f"**文件数量**: {len(md_files)}  \n\n")
-        output_content.append("---\n\n")
-        
-        # 添加目录
-        if include_toc:
-            toc = self.generate_table_of_contents(md_files, input_dir)
-            output_content.append(toc)
-        
-        # 合并文件内容
-        for i, file_path in enumerate(md_files, 1):
-            file_start_time = datetime.now()
-            
-            try:
-                # 读取文件内容
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                # 计算文件信息
-                file_size = file_path.stat().st_size
-                file_lines = content.count('\n') + 1
-                
-                # 提取标题
-                title, method = self.extract_title_from_file(file_path)
-                
-                # 计算相对路径
-                rel_path = file_path.relative_to(input_dir) if file_path.is_relative_to(input_dir) else file_path
-                
-                # 添加文件分隔符
-                if add_separators and i > 1:
-                    output_content.append("\n" + "=" * 80 + "\n\n")
-                
-                # 添加文件标题和元信息
-                output_content.append(f"## 📝 {title}\n\n")
-                output_content.append(f"**文件**: `{rel_path}`  \n")
-                output_content.append(f"**大小**: {file_size:,} 字节  \n")
-                output_content.append(f"**行数**: {file_lines} 行  \n")
-                output_content.append(f"**标题来源**: {method}  \n")
-                output_content.append(f"**合并顺序**: 第 {i} 个文件  \n\n")
-                output_content.append("---\n\n")
-                
-                # 添加文件内容
-                output_content.append(content)
-                
-                # 确保内容以换行结束
-                if not content.endswith('\n'):
-                    output_content.append('\n')
-                
-                # 更新统计
-                self.file_count += 1
-                self.total_lines += file_lines
+        cache = MetadataCache(output_file.parent) if use_cache else None
+        
+        # 边合并边写入临时文件，内存占用只与最大的单个文件有关；完成后再替换输出文件
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        temp_output = output_file.with_name(output_file.name + '.tmp')
+        try:
+            with open_markdown_writer(temp_output, output_file) as out:
+                # 添加文件头
+                out.write(f"# 📄 合并Markdown文档\n\n")
+                out.write(f"**来源目录**: `{input_dir}`  \n")
+                out.write(f"**生成时间**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}  \n")
+                out.write(f"**文件数量**: {len(md_files)}  \n\n")
+                out.write("---\n\n")
                 
-                # 记录文件处理信息
-                file_stats = {
-                    'file': str(file_path),
-                    'relative_path': str(rel_path),
-                    'title': title,
-                    'title_source': method,
-                    'size': file_size,
-                    'lines': file_lines,
-                    'order': i,
-                    'processing_time': (datetime.now() - file_start_time).total_seconds()
-                }
-                stats['files_processed'].append(file_stats)
-                stats['total_lines'] += file_lines
-                stats['total_size'] += file_size
+                # 添加目录（第一遍只获取元信息，文件未变化时使用缓存；正文在第二遍逐个文件写入）
+                infos = {}
+                if include_toc:
+                    infos = self.scan_files(md_files, cache, read_ahead)
+                    if cache is not None:
+                        print(f"元信息缓存: {cache.hits}/{len(md_files)} 个文件未变化，无需读取标题")
+                    out.write(self.generate_table_of_contents(md_files, input_dir, infos))
                 
-                print(f"✅ 处理文件 {i}/{len(md_files)}: {rel_path}")
-                print(f"   标题: {title} ({method})")
-                print(f"   大小: {file_size:,} 字节, 行数: {file_lines}")
+                # 合并文件内容（后台线程按顺序预读后面的文件，写入顺序不变）
+                prepare = lambda file_path: self.prepare_file(file_path, infos.get(file_path), cache)
+                prepared_files = iter_read_ahead(prepare, md_files, read_ahead,
+                                                 discard=lambda prepared: prepared['source'].close())
+                for i, (file_path, prepared, error) in enumerate(prepared_files, 1):
+                    if error is not None:
+                        self.write_error_section(out, file_path, error)
+                        continue
+                    with prepared['source']:
+                        self.write_file_section(out, file_path, input_dir, i, len(md_files),
+                                                add_separators, stats, prepared)
                 
-            except Exception as e:
-                print(f"❌ 处理文件失败: {file_path}")
-                print(f"   错误: {e}")
-                
-                # 添加错误信息到输出
-                output_content.append(f"## ❌ 文件处理失败: {file_path.name}\n\n")
-                output_content.append(f"错误: {e}\n\n")
-                output_content.append("---\n\n")
-        
-        # 添加文件尾
-        output_content.append("\n" + "=" * 80 + "\n\n")
-        output_content.append("## 📊 合并统计\n\n")
-        output_content.append(f"**总文件数**: {len(md_files)}  \n")
-        output_content.append(f"**总行数**: {stats['total_lines']:,}  \n")
-        output_content.append(f"**总大小**: {stats['total_size']:,} 字节  \n")
-        output_content.append(f"**生成时间**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}  \n")
-        output_content.append(f"**处理耗时**: {(datetime.now() - datetime.fromisoformat(stats['start_time'])).total_seconds():.1f} 秒  \n\n")
-        
-        # 写入输出文件
-        try:
-            output_file.parent.mkdir(parents=True, exist_ok=True)
-            
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(''.join(output_content))
+                # 添加文件尾
+                out.write("\n" + "=" * 80 + "\n\n")
+                out.write("## 📊 合并统计\n\n")
+                out.write(f"**总文件数**: {len(md_files)}  \n")
+                out.write(f"**总行数**: {stats['total_lines']:,}  \n")
+                out.write(f"**总大小**: {stats['total_size']:,} 字节  \n")
+                out.write(f"**生成时间**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}  \n")
+                out.write(f"**处理耗时**: {(datetime.now() - datetime.fromisoformat(stats['start_time'])).total_seconds():.1f} 秒  \n\n")
+            os.replace(temp_output, output_file)
+            if cache is not None:
+                cache.prune(input_dir, md_files)
+                cache.save()
             
             output_size = output_file.stat().st_size
             print(f"\n✅ 合并完成!")
@@ -297,6 +528,152 @@ class MarkdownMerger:
         except Exception as e:
             print(f"❌ 写入输出文件失败: {e}")
             return {'success': False, 'error': str(e)}
+        finally:
+            if temp_output.exists():
+                temp_output.unlink()
+    
+    def prepare_file(self, file_path: Path, info: Optional[Dict] = None,
+                     cache: Optional[MetadataCache] = None) -> Dict:
+        """
+        打开文件并准备写入正文所需的元信息和内容（可在预读线程中执行）
+        
+        Args:
+            file_path: 文件路径
+            info: 生成目录时获取的元信息，文件之后又被修改时重新计算
+            cache: 可选的元信息缓存
+            
+        Returns:
+            {'source': 打开的二进制文件（由调用方关闭）, 'info': 元信息,
+             'data': 已读入的文件字节或None, 'content': 需要按文本写入的内容或None}
+            
+        Raises:
+            OSError, UnicodeDecodeError: 文件无法读取
+        """
+        source = open(file_path, 'rb')
+        try:
+            stat = os.fstat(source.fileno())
+            data = None
+            if info is None and cache is not None:
+                info = cache.get(file_path, stat)
+            # 文件信息（标题、行数）沿用生成目录时的结果，不再重复提取；文件之后又被修改时重新读取
+            if info is None or info['size'] != stat.st_size or info['mtime_ns'] != stat.st_mtime_ns:
+                data = source.read()
+                info = self.describe_data(data, file_path, stat)
+                if cache is not None:
+                    cache.put(file_path, info)
+            elif not info['verbatim']:
+                data = source.read()
+            elif hasattr(os, 'posix_fadvise'):
+                # 正文稍后在内核中拷贝，提前让内核把文件读入页缓存
+                os.posix_fadvise(source.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+            content = None if info['verbatim'] else self.decode_content(data)
+        except BaseException:
+            source.close()
+            raise
+        return {'source': source, 'info': info, 'data': data, 'content': content}
+    
+    def write_file_section(self, out, file_path: Path, input_dir: Path, order: int, file_count: int,
+                           add_separators: bool, stats: Dict, prepared: Dict):
+        """
+        写入一个文件的标题、元信息和内容，并更新合并统计
+        
+        Args:
+            out: 输出文件对象
+            file_path: 文件路径
+            input_dir: 输入目录（用于计算相对路径）
+            order: 合并顺序（从1开始）
+            file_count: 文件总数
+            add_separators: 是否添加文件分隔符
+            stats: 合并统计信息
+            prepared: prepare_file的返回值
+        """
+        file_start_time = datetime.now()
+        
+        info, data, content = prepared['info'], prepared['data'], prepared['content']
+        file_size = info['size']
+        file_lines = info['lines']
+        title, method = info['title'], info['title_source']
+        
+        # 计算相对路径
+        rel_path = file_path.relative_to(input_dir) if file_path.is_relative_to(input_dir) else file_path
+        
+        # 添加文件分隔符
+        if add_separators and order > 1:
+            out.write("\n" + "=" * 80 + "\n\n")
+        
+        # 添加文件标题和元信息
+        out.write(f"## 📝 {title}\n\n")
+        out.write(f"**文件**: `{rel_path}`  \n")
+        out.write(f"**大小**: {file_size:,} 字节  \n")
+        out.write(f"**行数**: {file_lines} 行  \n")
+        out.write(f"**标题来源**: {method}  \n")
+        out.write(f"**合并顺序**: 第 {order} 个文件  \n\n")
+        out.write("---\n\n")
+        
+        # 添加文件内容
+        if content is not None:
+            # 需要转换换行符或补换行的文件按文本写入
+            out.write(content)
+            if not content.endswith('\n'):
+                out.write('\n')
+        else:
+            # 按原样拷贝：已读入的字节直接写入，不再解码和编码；否则在内核中拷贝
+            out.flush()
+            if data is not None:
+                out.buffer.write(data)
+            else:
+                self.copy_body(prepared['source'], out, file_size)
+        
+        # 更新统计
+        self.file_count += 1
+        self.total_lines += file_lines
+        
+        # 记录文件处理信息
+        file_stats = {
+            'file': str(file_path),
+            'relative_path': str(rel_path),
+            'title': title,
+            'title_source': method,
+            'size': file_size,
+            'lines': file_lines,
+            'order': order,
+            'processing_time': (datetime.now() - file_start_time).total_seconds()
+        }
+        stats['files_processed'].append(file_stats)
+        stats['total_lines'] += file_lines
+        stats['total_size'] += file_size
+        
+        print(f"✅ 处理文件 {order}/{file_count}: {rel_path}")
+        print(f"   标题: {title} ({method})")
+        print(f"   大小: {file_size:,} 字节, 行数: {file_lines}")
+    
+    def copy_body(self, source, out, size: int):
+        """
+        把source（二进制文件，位于开头）的size字节原样写入输出（调用前已flush）
+        
+        输出未压缩时通过copy_file_range/sendfile在内核中拷贝，否则（或内核拷贝不可用时）缓冲拷贝。
+        """
+        copied = 0
+        target_fd = plain_output_fd(out)
+        if target_fd is not None:
+            copied = copy_file_data(source.fileno(), target_fd, size)
+            if copied:
+                source.seek(copied)
+        while copied < size:
+            chunk = source.read(min(size - copied, 1 << 20))
+            if not chunk:
+                break
+            out.buffer.write(chunk)
+            copied += len(chunk)
+    
+    def write_error_section(self, out, file_path: Path, error: Exception):
+        """读取文件失败时在输出中记录错误信息"""
+        print(f"❌ 处理文件失败: {file_path}")
+        print(f"   错误: {error}")
+        
+        out.write(f"## ❌ 文件处理失败: {file_path.name}\n\n")
+        out.write(f"错误: {error}\n\n")
+        out.write("---\n\n")
     
     def create_sample_files(self, output_dir: Path, count: int = 5) -> List[Path]:
         """
@@ -376,6 +753,12 @@ def main():
   # 不生成目录
   python merge_markdown.py --dir . --output simple.md --no-toc
   
+  # 网络盘上的目录：同时预读32个文件
+  python merge_markdown.py --dir /mnt/share/docs --output combined.md --read-ahead 32
+  
+  # 直接写出gzip压缩的合并结果 (combined.md.gz)
+  python merge_markdown.py --dir docs --output combined.md --compress gzip
+  
   # 创建示例文件并测试
   python merge_markdown.py --test --sample-count 3
         """
@@ -394,6 +777,12 @@ def main():
                        help='不生成目录')
     parser.add_argument('--no-separators', action='store_true',
                        help='不添加文件分隔符')
+    parser.add_argument('--compress', choices=list(COMPRESSIONS),
+                       help='压缩输出文件（.md.gz / .md.zst，zstd需要zstandard库）')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='不使用输出目录中的元信息缓存（.merge_markdown_cache.json），重新读取所有文件的标题')
+    parser.add_argument('--read-ahead', type=int, default=0,
+                       help='后台线程预读的文件数，适合网络盘或冷缓存目录，最多该数量个文件同时驻留内存 (默认: 0，逐个读取)')
     
     # 测试功能
     parser.add_argument('--test', action='store_true',
@@ -405,6 +794,9 @@ def main():
     
     args = parser.parse_args()
     
+    if args.read_ahead < 0:
+        parser.error("--read-ahead 不能为负数")
+    
     merger = MarkdownMerger()
     
     # 测试模式
@@ -426,7 +818,8 @@ def main():
             output_file,
             recursive=True,
             include_toc=not args.no_toc,
-            add_separators=not args.no_separators
+            add_separators=not args.no_separators,
+            use_cache=False
         )
         
         if result.get('success', False):
@@ -441,7 +834,7 @@ def main():
     
     # 正常合并模式
     input_dir = Path(args.dir)
-    output_file = Path(args.output)
+    output_file = with_compression_suffix(args.output, args.compress)
     
     print(f"🚀 开始合并Markdown文件")
     print(f"   输入目录: {input_dir}")
@@ -456,7 +849,10 @@ def main():
             output_file,
             recursive=args.recursive,
             include_toc=not args.no_toc,
-            add_separators=not args.no_separators
+            add_separators=not args.no_separators,
+            compression=args.compress,
+            use_cache=not args.no_cache,
+            read_ahead=args.read_ahead
         )
         
         if result.get('success', False):
@@ -239,6 +239,248 @@ def test_actual_merge():
         print(f"💥 合并测试异常: {e}")
         return False
 
+def test_streaming_merge():
+    """测试流式合并：内存占用与最大的单个文件有关、与文件总大小无关，目录仍在文件开头"""
+    print_header("测试流式合并")
+    
+    import shutil
+    import tracemalloc
+    from merge_markdown import MarkdownMerger
+    
+    test_dir = Path("test_streaming_merge")
+    if test_dir.exists():
+        shutil.rmtree(test_dir)
+    test_dir.mkdir()
+    output_file = test_dir / "out" / "merged.md"
+    
+    try:
+        file_size = total_size = 0
+        for i in range(20):
+            content = f"# 文档{i}\n\n" + "".join(f"第{j}行 {'内容' * 20}\n" for j in range(5000))
+            (test_dir / f"doc{i:02d}.md").write_text(content, encoding='utf-8')
+            file_size = max(file_size, len(content.encode('utf-8')))
+            total_size += len(content.encode('utf-8'))
+        
+        tracemalloc.start()
+        try:
+            result = MarkdownMerger().merge_files(test_dir, output_file, recursive=False)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        
+        if not result.get('success'):
+            print(f"❌ 合并失败: {result.get('error')}")
+            return False
+        content = output_file.read_text(encoding='utf-8')
+        if list(output_file.parent.glob("*.tmp")):
+            print("❌ 残留临时文件")
+            return False
+        if content.index("## 📚 目录") > content.index("## 📝 文档0"):
+            print("❌ 目录不在正文之前")
+            return False
+        if [content.index(f"## 📝 文档{i}") for i in range(20)] != sorted(content.index(f"## 📝 文档{i}") for i in range(20)):
+            print("❌ 文件顺序不正确")
+            return False
+        if peak > total_size / 3:
+            print(f"❌ 峰值内存 {peak:,} 字节，接近文件总大小 {total_size:,} 字节")
+            return False
+        
+        print(f"✅ 流式合并 {result['file_count']} 个文件，峰值内存 {peak:,} 字节（单个文件 {file_size:,} 字节）")
+        return True
+    finally:
+        shutil.rmtree(test_dir, ignore_errors=True)
+
+def test_metadata_cache():
+    """测试元信息缓存：文件未变化时生成目录不再读取文件，修改过的文件重新提取标题"""
+    print_header("测试元信息缓存")
+    
+    import shutil
+    import time
+    from merge_markdown import MarkdownMerger, MetadataCache
+    
+    test_dir = Path("test_metadata_cache")
+    if test_dir.exists():
+        shutil.rmtree(test_dir)
+    input_dir = test_dir / "docs"
+    input_dir.mkdir(parents=True)
+    output_file = test_dir / "merged.md"
+    
+    try:
+        for i in range(5):
+            (input_dir / f"doc{i}.md").write_text(f"# 文档{i}\n\n内容{i}\n", encoding='utf-8')
+        
+        merger = MarkdownMerger()
+        described = []
+        describe_content = merger.describe_content
+        merger.describe_content = lambda content, file_path, *args: (
+            described.append(file_path.name) or describe_content(content, file_path, *args)
+        )
+        
+        merger.merge_files(input_dir, output_file)
+        first = output_file.read_text(encoding='utf-8')
+        if sorted(described) != [f"doc{i}.md" for i in range(5)]:
+            print(f"❌ 首次合并应读取每个文件一次: {described}")
+            return False
+        
+        described.clear()
+        merger.merge_files(input_dir, output_file)
+        if described:
+            print(f"❌ 文件未变化时仍读取了标题: {described}")
+            return False
+        strip = lambda text: [line for line in text.split("\n") if "生成时间" not in line and "处理耗时" not in line]
+        if strip(output_file.read_text(encoding='utf-8')) != strip(first):
+            print("❌ 使用缓存的合并结果不一致")
+            return False
+        
+        time.sleep(0.01)
+        (input_dir / "doc2.md").write_text("# 修改后的标题\n\n新内容\n", encoding='utf-8')
+        merger.merge_files(input_dir, output_file)
+        content = output_file.read_text(encoding='utf-8')
+        if described != ["doc2.md"] or "**[修改后的标题]" not in content or "文档2" in content:
+            print(f"❌ 修改过的文件没有重新提取标题: {described}")
+            return False
+        
+        (test_dir / MetadataCache.FILE_NAME).unlink()
+        merger.merge_files(input_dir, output_file, use_cache=False)
+        if (test_dir / MetadataCache.FILE_NAME).exists():
+            print("❌ 禁用缓存时仍写入了缓存文件")
+            return False
+        
+        print("✅ 元信息缓存生效，修改过的文件重新提取标题")
+        return True
+    finally:
+        shutil.rmtree(test_dir, ignore_errors=True)
+
+def test_zero_copy_merge():
+    """测试正文按原样拷贝：以换行结尾的UTF-8文件在内核中拷贝，其余文件按文本写入，结果一致"""
+    print_header("测试正文零拷贝")
+    
+    import gzip
+    import shutil
+    import merge_markdown
+    from merge_markdown import MarkdownMerger
+    
+    test_dir = Path("test_zero_copy_merge")
+    if test_dir.exists():
+        shutil.rmtree(test_dir)
+    input_dir = test_dir / "docs"
+    input_dir.mkdir(parents=True)
+    
+    files = {
+        "a_plain.md": "# 普通文件\n\n" + "正文内容\n" * 1000,
+        "b_no_newline.md": "# 没有结尾换行\n\n最后一行",
+        "c_crlf.md": "# Windows换行\r\n\r\n第一行\r\n",
+        "d_bom.md": "\ufeff# 带BOM\n\n内容\n",
+    }
+    for name, content in files.items():
+        (input_dir / name).write_bytes(content.encode('utf-8'))
+    
+    copied = []
+    copy_file_data = merge_markdown.copy_file_data
+    merge_markdown.copy_file_data = lambda source_fd, target_fd, count: (
+        copied.append(count) or copy_file_data(source_fd, target_fd, count)
+    )
+    strip = lambda text: [line for line in text.split("\n") if "生成时间" not in line and "处理耗时" not in line]
+    
+    try:
+        merger = MarkdownMerger()
+        outputs = []
+        for run in range(2):
+            copied.clear()
+            merger.merge_files(input_dir, test_dir / "merged.md")
+            outputs.append((test_dir / "merged.md").read_text(encoding='utf-8'))
+        merger.merge_files(input_dir, test_dir / "merged.md", compression="gzip")
+        with gzip.open(test_dir / "merged.md.gz", "rt", encoding='utf-8') as f:
+            outputs.append(f.read())
+        
+        if sorted(copied) != sorted(len(files[name].encode('utf-8')) for name in ("a_plain.md", "d_bom.md")):
+            print(f"❌ 内核拷贝的文件不符合预期: {copied}")
+            return False
+        if any(strip(output) != strip(outputs[0]) for output in outputs):
+            print("❌ 各次合并结果不一致")
+            return False
+        for name, content in files.items():
+            expected = content.replace("\r\n", "\n")
+            expected += "" if expected.endswith("\n") else "\n"
+            if f"---\n\n{expected}" not in outputs[0]:
+                print(f"❌ {name} 的正文不正确")
+                return False
+        
+        print("✅ 正文零拷贝结果与文本写入一致")
+        return True
+    finally:
+        merge_markdown.copy_file_data = copy_file_data
+        shutil.rmtree(test_dir, ignore_errors=True)
+
+def test_read_ahead_merge():
+    """测试并行预读：后台线程提前读取后面的文件，输出顺序和内容与逐个读取一致"""
+    print_header("测试并行预读")
+    
+    import random
+    import shutil
+    import threading
+    import time
+    from merge_markdown import MarkdownMerger
+    
+    test_dir = Path("test_read_ahead_merge")
+    if test_dir.exists():
+        shutil.rmtree(test_dir)
+    input_dir = test_dir / "docs"
+    input_dir.mkdir(parents=True)
+    
+    for i in range(1, 31):
+        (input_dir / f"doc{i:02d}.md").write_text(f"# 文档{i}\n\n" + f"第{i}个文件\n" * i, encoding='utf-8')
+    # 无法解码的文件在原位置记录错误
+    (input_dir / "doc15.md").write_bytes(b"# \xff\xfe\n")
+    
+    depth = 4
+    lock = threading.Lock()
+    running = [0, 0]  # 当前并发数, 最大并发数
+    
+    def slow(func):
+        def wrapper(*args):
+            with lock:
+                running[0] += 1
+                running[1] = max(running[1], running[0])
+            try:
+                # 随机延迟，让后台线程乱序完成
+                time.sleep(random.uniform(0, 0.01))
+                return func(*args)
+            finally:
+                with lock:
+                    running[0] -= 1
+        return wrapper
+    
+    strip = lambda text: [line for line in text.split("\n") if "生成时间" not in line and "处理耗时" not in line]
+    
+    try:
+        merger = MarkdownMerger()
+        merger.merge_files(input_dir, test_dir / "sequential.md", use_cache=False, read_ahead=0)
+        
+        merger.scan_file = slow(merger.scan_file)
+        merger.prepare_file = slow(merger.prepare_file)
+        result = merger.merge_files(input_dir, test_dir / "parallel.md", use_cache=False, read_ahead=depth)
+        
+        sequential = (test_dir / "sequential.md").read_text(encoding='utf-8')
+        parallel = (test_dir / "parallel.md").read_text(encoding='utf-8')
+        if strip(parallel) != strip(sequential):
+            print("❌ 并行预读的合并结果与逐个读取不一致")
+            return False
+        if not 1 < running[1] <= depth:
+            print(f"❌ 预读并发数不符合预期: {running[1]}（上限 {depth}）")
+            return False
+        
+        order = [record['relative_path'] for record in result['files_processed']]
+        expected = [f"doc{i:02d}.md" for i in range(1, 31) if i != 15]
+        if order != expected or "文件处理失败: doc15.md" not in parallel:
+            print(f"❌ 合并顺序不正确: {order}")
+            return False
+        
+        print(f"✅ 并行预读（最多 {running[1]} 个文件）结果与逐个读取一致")
+        return True
+    finally:
+        shutil.rmtree(test_dir, ignore_errors=True)
+
 def create_usage_examples():
     """创建使用示例"""
     print_header("使用示例")
@@ -282,6 +524,22 @@ def main():
     test4 = test_actual_merge()
     all_tests_passed = all_tests_passed and test4
     
+    # 测试5: 流式合并
+    test5 = test_streaming_merge()
+    all_tests_passed = all_tests_passed and test5
+    
+    # 测试6: 元信息缓存
+    test6 = test_metadata_cache()
+    all_tests_passed = all_tests_passed and test6
+    
+    # 测试7: 正文零拷贝
+    test7 = test_zero_copy_merge()
+    all_tests_passed = all_tests_passed and test7
+    
+    # 测试8: 并行预读
+    test8 = test_read_ahead_merge()
+    all_tests_passed = all_tests_passed and test8
+    
     # 显示使用示例
     create_usage_examples()
     
@@ -292,6 +550,10 @@ def main():
     print(f"✅ 命令行接口测试: {'通过' if test2 else '失败'}")
     print(f"✅ 示例创建测试: {'通过' if test3 else '失败'}")
     print(f"✅ 实际合并测试: {'通过' if test4 else '失败'}")
+    print(f"✅ 流式合并测试: {'通过' if test5 else '失败'}")
+    print(f"✅ 元信息缓存测试: {'通过' if test6 else '失败'}")
+    print(f"✅ 正文零拷贝测试: {'通过' if test7 else '失败'}")
+    print(f"✅ 并行预读测试: {'通过' if test8 else '失败'}")
     
     if all_tests_passed:
         print("\n🎉 所有测试通过!")
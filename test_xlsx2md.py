@@ -0,0 +1,1460 @@
+#!/usr/bin/env python3
+"""
+xlsx2md 功能测试
+测试常规模式与流式模式的转换结果
+"""
+
+import os
+import sys
+import shutil
+from pathlib import Path
+
+TEST_DIR = Path("test_xlsx2md_files")
+
+
+def print_header(title):
+    """打印标题"""
+    print("\n" + "=" * 60)
+    print(f" {title}")
+    print("=" * 60)
+
+
+def prepare_test_dir():
+    """创建空的测试目录"""
+    if TEST_DIR.exists():
+        shutil.rmtree(TEST_DIR)
+    TEST_DIR.mkdir()
+    return TEST_DIR
+
+
+def strip_volatile_lines(content):
+    """去掉转换时间等每次运行都会变化的行"""
+    return "\n".join(
+        line for line in content.split("\n")
+        if "转换时间" not in line and "conversion_time" not in line
+    )
+
+
+def create_test_workbook(file_path):
+    """创建包含多种边界情况的测试工作簿"""
+    import datetime
+    from openpyxl import Workbook
+
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = "混合数据"
+    sheet.append(["名称", None, "名称", 2024, 1.5])
+    sheet.append(["a|b", 1, 2.5, True, datetime.datetime(2024, 1, 2)])
+    sheet.append([None] * 5)
+    sheet.append(["多行\n文本", 3.0, None, None, None, "超宽列"])
+    for i in range(1200):
+        sheet.append([f"行{i}", i, i * 0.5])
+    for _ in range(5):
+        sheet.append([None] * 8)
+
+    workbook.create_sheet("空表")
+    header_only = workbook.create_sheet("只有表头")
+    header_only.append(["列A", "列B"])
+
+    workbook.save(file_path)
+    return file_path
+
+
+def create_shared_strings_workbook(file_path, count, sheet_count=1, texts=None):
+    """
+    手工生成使用共享字符串表的工作簿（openpyxl写入的是内联字符串）
+
+    第k个sheet页（"数据"、"数据2"……）的count行依次引用第k组count个共享字符串，
+    texts为替换的共享字符串（编号 -> 文本）。
+    """
+    import zipfile
+
+    main_ns = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+    rel_ns = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+    pkg_ns = "http://schemas.openxmlformats.org/package/2006/relationships"
+    texts = texts or {}
+    names = ["数据"] + [f"数据{k + 1}" for k in range(1, sheet_count)]
+    strings = "".join(f"<si><t>{texts.get(i, f'文本{i}')}</t></si>" for i in range(count * sheet_count))
+    content_types = (
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        + "".join(f'<Override PartName="/xl/worksheets/sheet{k + 1}.xml" '
+                  'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+                  for k in range(sheet_count)) +
+        '<Override PartName="/xl/sharedStrings.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>'
+        '</Types>'
+    )
+    with zipfile.ZipFile(file_path, "w") as archive:
+        archive.writestr("[Content_Types].xml", content_types)
+        archive.writestr("_rels/.rels", f'<Relationships xmlns="{pkg_ns}"><Relationship Id="rId1" '
+                         f'Type="{rel_ns}/officeDocument" Target="xl/workbook.xml"/></Relationships>')
+        archive.writestr("xl/workbook.xml", f'<workbook xmlns="{main_ns}" xmlns:r="{rel_ns}"><sheets>'
+                         + "".join(f'<sheet name="{name}" sheetId="{k + 1}" r:id="rId{k + 1}"/>'
+                                   for k, name in enumerate(names))
+                         + '</sheets></workbook>')
+        archive.writestr("xl/_rels/workbook.xml.rels", f'<Relationships xmlns="{pkg_ns}">'
+                         + "".join(f'<Relationship Id="rId{k + 1}" Type="{rel_ns}/worksheet" '
+                                   f'Target="worksheets/sheet{k + 1}.xml"/>' for k in range(sheet_count))
+                         + f'<Relationship Id="rId{sheet_count + 1}" Type="{rel_ns}/sharedStrings" '
+                         f'Target="sharedStrings.xml"/></Relationships>')
+        for k in range(sheet_count):
+            rows = "".join(f'<row r="{i + 1}"><c r="A{i + 1}" t="s"><v>{k * count + i}</v></c></row>'
+                           for i in range(count))
+            archive.writestr(f"xl/worksheets/sheet{k + 1}.xml", f'<worksheet xmlns="{main_ns}">'
+                             f'<dimension ref="A1:A{count}"/><sheetData>{rows}</sheetData></worksheet>')
+        archive.writestr("xl/sharedStrings.xml",
+                         f'<sst xmlns="{main_ns}" count="{count * sheet_count}">{strings}</sst>')
+    return file_path
+
+
+def test_streaming_matches_eager():
+    """测试流式模式输出与常规模式一致"""
+    print_header("测试流式模式输出")
+
+    try:
+        from xlsx2md import ExcelToMarkdownConverter
+    except Exception as e:
+        print(f"❌ 模块导入失败: {e}")
+        return False
+
+    input_file = create_test_workbook(prepare_test_dir() / "mixed.xlsx")
+    eager_output = TEST_DIR / "eager.md"
+    stream_output = TEST_DIR / "stream.md"
+
+    eager = ExcelToMarkdownConverter(max_rows_per_page=500)
+    stream = ExcelToMarkdownConverter(chunk_size=7, max_rows_per_page=500, streaming=True)
+
+    try:
+        if not eager.convert_single_file(str(input_file), str(eager_output), force=True):
+            print("❌ 常规模式转换失败")
+            return False
+        if not stream.convert_single_file(str(input_file), str(stream_output), force=True):
+            print("❌ 流式模式转换失败")
+            return False
+
+        eager_content = strip_volatile_lines(eager_output.read_text(encoding="utf-8"))
+        stream_content = strip_volatile_lines(stream_output.read_text(encoding="utf-8"))
+    finally:
+        shutil.rmtree(TEST_DIR, ignore_errors=True)
+
+    if eager_content != stream_content:
+        print("❌ 流式模式输出与常规模式不一致")
+        return False
+
+    print("✅ 流式模式输出与常规模式一致")
+    return True
+
+
+def test_render_table_rows():
+    """测试表格行渲染的空值处理和特殊字符转义"""
+    print_header("测试表格行渲染")
+
+    try:
+        import pandas as pd
+        from xlsx2md import ExcelToMarkdownConverter
+    except Exception as e:
+        print(f"❌ 模块导入失败: {e}")
+        return False
+
+    df = pd.DataFrame({
+        "文本": ["a|b", "多行\n文本", None, "含\x00字符|"],
+        "数值": [1.5, float("nan"), 3.0, 4.0],
+    })
+    expected = [
+        "| a\\|b | 1.5 |",
+        "| 多行<br>文本 |  |",
+        "|  | 3.0 |",
+        "| 含\x00字符\\| | 4.0 |",
+    ]
+
+    rows = ExcelToMarkdownConverter().render_table_rows(df)
+    if rows != expected:
+        print(f"❌ 渲染结果不符合预期: {rows}")
+        return False
+
+    print("✅ 表格行渲染正确")
+    return True
+
+
+def test_fast_engine_matches_openpyxl():
+    """测试fast引擎（常规/流式）输出与openpyxl一致"""
+    print_header("测试fast引擎")
+
+    try:
+        from xlsx2md import ExcelToMarkdownConverter
+    except Exception as e:
+        print(f"❌ 模块导入失败: {e}")
+        return False
+
+    input_file = create_test_workbook(prepare_test_dir() / "mixed.xlsx")
+    converters = {
+        "openpyxl": ExcelToMarkdownConverter(engine="openpyxl"),
+        "fast": ExcelToMarkdownConverter(engine="fast"),
+        "fast流式": ExcelToMarkdownConverter(chunk_size=50, streaming=True, engine="fast"),
+    }
+
+    outputs = {}
+    try:
+        for name, converter in converters.items():
+            output_file = TEST_DIR / f"{name}.md"
+            if not converter.convert_single_file(str(input_file), str(output_file), force=True):
+                print(f"❌ {name} 转换失败")
+                return False
+            outputs[name] = strip_volatile_lines(output_file.read_text(encoding="utf-8"))
+    finally:
+        shutil.rmtree(TEST_DIR, ignore_errors=True)
+
+    for name, content in outputs.items():
+        if content != outputs["openpyxl"]:
+            print(f"❌ {name} 输出与openpyxl不一致")
+            return False
+
+    print("✅ fast引擎输出与openpyxl一致")
+    return True
+
+
+def test_parallel_directory_conversion():
+    """测试目录并行转换的结果统计"""
+    print_header("测试目录并行转换")
+
+    try:
+        from xlsx2md import ExcelToMarkdownConverter
+    except Exception as e:
+        print(f"❌ 模块导入失败: {e}")
+        return False
+
+    input_dir = prepare_test_dir() / "input"
+    input_dir.mkdir()
+    for name in ["a.xlsx", "b.xlsx", "c.xlsx"]:
+        create_test_workbook(input_dir / name)
+    (input_dir / "broken.xlsx").write_text("不是Excel文件", encoding="utf-8")
+    output_dir = TEST_DIR / "output"
+
+    try:
+        results = ExcelToMarkdownConverter().convert_directory(
+            str(input_dir), str(output_dir), force=True, jobs=2
+        )
+        outputs = sorted(f.name for f in output_dir.glob("*.md"))
+    finally:
+        shutil.rmtree(TEST_DIR, ignore_errors=True)
+
+    expected = {"a.xlsx": True, "b.xlsx": True, "c.xlsx": True, "broken.xlsx": False}
+    if results != expected:
+        print(f"❌ 转换结果不符合预期: {results}")
+        return False
+    if outputs != ["a.md", "b.md", "c.md"]:
+        print(f"❌ 输出文件不符合预期: {outputs}")
+        return False
+
+    print("✅ 并行转换结果正确")
+    return True
+
+
+def test_manifest_idempotency():
+    """测试基于转换清单的幂等检测"""
+    print_header("测试转换清单幂等检测")
+
+    try:
+        from xlsx2md import ConversionManifest, ExcelToMarkdownConverter
+    except Exception as e:
+        print(f"❌ 模块导入失败: {e}")
+        return False
+
+    input_dir = prepare_test_dir() / "input"
+    input_dir.mkdir()
+    for name in ["a.xlsx", "b.xlsx"]:
+        create_test_workbook(input_dir / name)
+    output_dir = TEST_DIR / "output"
+    converter = ExcelToMarkdownConverter()
+
+    try:
+        converter.convert_directory(str(input_dir), str(output_dir))
+        manifest = ConversionManifest(output_dir)
+        if sorted(Path(key).name for key in manifest.entries) != ["a.xlsx", "b.xlsx"]:
+            print(f"❌ 转换清单记录不符合预期: {list(manifest.entries)}")
+            return False
+
+        first_mtime = (output_dir / "a.md").stat().st_mtime_ns
+        # 只修改时间戳时内容哈希不变，应跳过；修改内容后应重新转换
+        os.utime(input_dir / "a.xlsx", ns=(0, 0))
+        (output_dir / "b.md").write_text("# 旧输出\n", encoding="utf-8")
+        from openpyxl import load_workbook
+        workbook = load_workbook(input_dir / "b.xlsx")
+        workbook.active["A2"] = "已修改"
+        workbook.save(input_dir / "b.xlsx")
+
+        results = converter.convert_directory(str(input_dir), str(output_dir))
+        a_unchanged = (output_dir / "a.md").stat().st_mtime_ns == first_mtime
+        b_content = (output_dir / "b.md").read_text(encoding="utf-8")
+        a_entry = ConversionManifest(output_dir).get(input_dir / "a.xlsx")
+    finally:
+        shutil.rmtree(TEST_DIR, ignore_errors=True)
+
+    if results != {"a.xlsx": True, "b.xlsx": True}:
+        print(f"❌ 转换结果不符合预期: {results}")
+        return False
+    if not a_unchanged or a_entry["mtime_ns"] != 0:
+        print("❌ 只修改时间戳的文件被重新转换或清单未更新")
+        return False
+    if "已修改" not in b_content:
+        print("❌ 内容修改后的文件没有重新转换")
+        return False
+
+    print("✅ 转换清单幂等检测正确")
+    return True
+
+
+def test_source_hash():
+    """测试共用文件对象计算的哈希与分块读取计算的哈希一致，转换期间源文件被改写时报错而不是使进程退出"""
+    print_header("测试源文件哈希")
+
+    try:
+        from xlsx2md import HASH_CHUNK_SIZE, ExcelToMarkdownConverter
+    except Exception as e:
+        print(f"❌ 模块导入失败: {e}")
+        return False
+
+    converter = ExcelToMarkdownConverter()
+    test_dir = prepare_test_dir()
+    samples = {
+        "empty.bin": b"",
+        "chunks.bin": os.urandom(HASH_CHUNK_SIZE * 2 + 123),
+    }
+
+    try:
+        for name, data in samples.items():
+            file_path = test_dir / name
+            file_path.write_bytes(data)
+            with converter.open_source_file(str(file_path)) as source:
+                source_hash = converter.hash_source(source)
+                if source.tell() != 0:
+                    print(f"❌ {name} 计算哈希后没有回到文件开头")
+                    return False
+            if source_hash != converter.calculate_file_hash(str(file_path)):
+                print(f"❌ {name} 的哈希不一致")
+                return False
+
+        # 其他进程截断并原地改写正在转换的文件
+        file_path = test_dir / "chunks.bin"
+        try:
+            with converter.open_source_file(str(file_path)) as source:
+                converter.hash_source(source)
+                file_path.write_bytes(b"rewritten")
+                source.read()
+            print("❌ 转换期间源文件被改写时没有报错")
+            return False
+        except OSError:
+            pass
+    finally:
+        shutil.rmtree(TEST_DIR, ignore_errors=True)
+
+    print("✅ 源文件哈希一致，转换期间源文件被改写时报错")
+    return True
+
+
+def test_parallel_sheets_match_eager():
+    """测试按sheet页并行处理的输出与常规模式一致"""
+    print_header("测试sheet页并行处理")
+
+    try:
+        from xlsx2md import ExcelToMarkdownConverter
+    except Exception as e:
+        print(f"❌ 模块导入失败: {e}")
+        return False
+
+    input_file = create_test_workbook(prepare_test_dir() / "mixed.xlsx")
+    converters = {
+        "常规模式": ExcelToMarkdownConverter(),
+        "sheet并行": ExcelToMarkdownConverter(chunk_size=100, sheet_jobs=2),
+        "sheet并行fast": ExcelToMarkdownConverter(engine="fast", sheet_jobs=3),
+    }
+
+    outputs = {}
+    try:
+        for name, converter in converters.items():
+            output_file = TEST_DIR / f"{name}.md"
+            if not converter.convert_single_file(str(input_file), str(output_file), force=True):
+                print(f"❌ {name} 转换失败")
+                return False
+            outputs[name] = strip_volatile_lines(output_file.read_text(encoding="utf-8"))
+    finally:
+        shutil.rmtree(TEST_DIR, ignore_errors=True)
+
+    for name, content in outputs.items():
+        if content != outputs["常规模式"]:
+            print(f"❌ {name} 输出与常规模式不一致")
+            return False
+
+    print("✅ sheet页并行处理输出与常规模式一致")
+    return True
+
+
+def test_sheet_cache():
+    """测试sheet页缓存：只重新渲染内容变化的sheet页，输出与常规模式一致"""
+    print_header("测试sheet页缓存")
+
+    try:
+        from openpyxl import load_workbook
+        from xlsx2md import ExcelToMarkdownConverter, SheetCache
+    except Exception as e:
+        print(f"❌ 模块导入失败: {e}")
+        return False
+
+    input_file = create_test_workbook(prepare_test_dir() / "mixed.xlsx")
+    # 新建的工作簿第一次被openpyxl读写时会规范化sheet页XML，之后未修改的sheet页保存结果不变
+    load_workbook(input_file).save(input_file)
+    output_file = TEST_DIR / "cached.md"
+    eager_output = TEST_DIR / "eager.md"
+
+    converter = ExcelToMarkdownConverter(sheet_cache=True)
+    rendered = []
+    render_sheet_section = converter._render_sheet_section
+
+    def counting_render(input_path, sheet_name, *args):
+        rendered.append(sheet_name)
+        return render_sheet_section(input_path, sheet_name, *args)
+
+    converter._render_sheet_section = counting_render
+
+    try:
+        if not converter.convert_single_file(str(input_file), str(output_file)):
+            print("❌ 首次转换失败")
+            return False
+        first_rendered = list(rendered)
+
+        workbook = load_workbook(input_file)
+        workbook["只有表头"].append([1, 2])
+        workbook.save(input_file)
+
+        rendered.clear()
+        if not converter.convert_single_file(str(input_file), str(output_file)):
+            print("❌ 增量转换失败")
+            return False
+        incremental_rendered = list(rendered)
+        ExcelToMarkdownConverter().convert_single_file(str(input_file), str(eager_output), force=True)
+
+        cached_content = strip_volatile_lines(output_file.read_text(encoding="utf-8"))
+        eager_content = strip_volatile_lines(eager_output.read_text(encoding="utf-8"))
+        cache_files = list((TEST_DIR / SheetCache.DIR_NAME).rglob("*.md"))
+
+        # 修改一个sheet页的文字会改变共用的共享字符串表，其他sheet页不需要重新渲染
+        strings_file = create_shared_strings_workbook(TEST_DIR / "strings.xlsx", 50, sheet_count=3)
+        strings_output = TEST_DIR / "strings.md"
+        converter.convert_single_file(str(strings_file), str(strings_output))
+        create_shared_strings_workbook(strings_file, 50, sheet_count=3, texts={60: "已修改"})
+        rendered.clear()
+        converter.convert_single_file(str(strings_file), str(strings_output))
+        strings_rendered = list(rendered)
+        strings_content = strings_output.read_text(encoding="utf-8")
+    finally:
+        shutil.rmtree(TEST_DIR, ignore_errors=True)
+
+    if first_rendered != ["混合数据", "空表", "只有表头"]:
+        print(f"❌ 首次转换渲染的sheet页不符合预期: {first_rendered}")
+        return False
+    if incremental_rendered != ["只有表头"]:
+        print(f"❌ 增量转换渲染的sheet页不符合预期: {incremental_rendered}")
+        return False
+    if cached_content != eager_content:
+        print("❌ 使用缓存的输出与常规模式不一致")
+        return False
+    if len(cache_files) != 3:
+        print(f"❌ 过期缓存没有清理: {len(cache_files)} 个分段文件")
+        return False
+    if strings_rendered != ["数据2"] or "已修改" not in strings_content:
+        print(f"❌ 修改共享字符串后重新渲染的sheet页不符合预期: {strings_rendered}")
+        return False
+
+    print("✅ sheet页缓存只重新渲染变化的sheet页")
+    return True
+
+
+def test_trailing_blank_pruning():
+    """测试使用范围被零散格式扩大时，末尾空行空列在读取时被去掉并记录在摘要中"""
+    print_header("测试末尾空行空列去除")
+
+    try:
+        import json
+        import pandas as pd
+        from openpyxl import load_workbook
+        from openpyxl.styles import Font
+        from xlsx2md import ExcelToMarkdownConverter
+    except Exception as e:
+        print(f"❌ 模块导入失败: {e}")
+        return False
+
+    input_file = create_test_workbook(prepare_test_dir() / "bloated.xlsx")
+    workbook = load_workbook(input_file)
+    sheet = workbook["混合数据"]
+    sheet.cell(row=3000, column=200).font = Font(bold=True)
+    workbook.save(input_file)
+
+    converters = {
+        "常规模式": ExcelToMarkdownConverter(),
+        "fast": ExcelToMarkdownConverter(engine="fast"),
+        "流式": ExcelToMarkdownConverter(chunk_size=100, streaming=True),
+    }
+
+    outputs = {}
+    try:
+        for name, converter in converters.items():
+            output_file = TEST_DIR / f"{name}.md"
+            if not converter.convert_single_file(str(input_file), str(output_file), force=True):
+                print(f"❌ {name} 转换失败")
+                return False
+            outputs[name] = strip_volatile_lines(output_file.read_text(encoding="utf-8"))
+    finally:
+        shutil.rmtree(TEST_DIR, ignore_errors=True)
+
+    for name, content in outputs.items():
+        if content != outputs["常规模式"]:
+            print(f"❌ {name} 输出与常规模式不一致")
+            return False
+
+    summary = json.loads(outputs["常规模式"].split("```json\n")[1].split("\n```")[0])
+    info = summary["sheets_info"]["混合数据"]
+    if (info["columns"], info["pruned_rows"], info["pruned_columns"]) != (6, 3000 - 1204, 194):
+        print(f"❌ 去除的空行空列数量不符合预期: {info}")
+        return False
+
+    df = pd.DataFrame([["1", "", ""], ["", "", ""]], columns=["a", "b", "Unnamed: 2"])
+    pruned = ExcelToMarkdownConverter().prune_dataframe(df)
+    if pruned.shape != (1, 2) or (pruned.attrs["pruned_rows"], pruned.attrs["pruned_columns"]) != (1, 1):
+        print(f"❌ DataFrame末尾空行空列去除不正确: {pruned.shape}, {pruned.attrs}")
+        return False
+
+    print("✅ 末尾空行空列在读取时去除，摘要记录正确")
+    return True
+
+
+def test_jsonl_data_output():
+    """测试各种转换模式输出的JSONL数据文件一致，并记录在摘要中"""
+    print_header("测试JSONL数据输出")
+
+    try:
+        import json
+        from xlsx2md import ExcelToMarkdownConverter
+    except Exception as e:
+        print(f"❌ 模块导入失败: {e}")
+        return False
+
+    input_file = create_test_workbook(prepare_test_dir() / "mixed.xlsx")
+    converters = {
+        "eager": ExcelToMarkdownConverter(data_formats=["jsonl"]),
+        "stream": ExcelToMarkdownConverter(chunk_size=7, streaming=True, data_formats=["jsonl"]),
+        "sheets": ExcelToMarkdownConverter(sheet_jobs=2, data_formats=["jsonl"]),
+        "cached": ExcelToMarkdownConverter(sheet_cache=True, data_formats=["jsonl"]),
+    }
+
+    outputs = {}
+    try:
+        for name, converter in converters.items():
+            output_file = TEST_DIR / name / "mixed.md"
+            # cached模式转换两次，第二次全部使用缓存
+            for _ in range(2 if name == "cached" else 1):
+                if not converter.convert_single_file(str(input_file), str(output_file), force=True):
+                    print(f"❌ {name} 转换失败")
+                    return False
+            content = output_file.read_text(encoding="utf-8")
+            summary = json.loads(content.split("```json\n")[1].split("\n```")[0])
+            outputs[name] = {
+                sheet_name: (info["data_files"],
+                             (output_file.parent / info["data_files"]["jsonl"]).read_text(encoding="utf-8"))
+                for sheet_name, info in summary["sheets_info"].items()
+            }
+    finally:
+        shutil.rmtree(TEST_DIR, ignore_errors=True)
+
+    for name, data in outputs.items():
+        if data != outputs["eager"]:
+            print(f"❌ {name} 的数据文件与常规模式不一致")
+            return False
+
+    data_files, content = outputs["eager"]["混合数据"]
+    rows = [json.loads(line) for line in content.splitlines()]
+    if data_files != {"jsonl": "mixed_data/混合数据.jsonl"} or len(rows) != 1203:
+        print(f"❌ 数据文件不符合预期: {data_files}, {len(rows)} 行")
+        return False
+    if rows[0] != {"名称": "a|b", "Unnamed: 1": "1", "名称.1": "2.5", "2024": "True",
+                   "1.5": "2024-01-02 00:00:00", "Unnamed: 5": ""}:
+        print(f"❌ 数据行不符合预期: {rows[0]}")
+        return False
+
+    print("✅ JSONL数据输出一致")
+    return True
+
+
+def test_xls_lazy_loading():
+    """测试.xls按需加载逐个sheet页读取并卸载，输出与pandas完整读取一致"""
+    print_header("测试.xls按需加载")
+
+    try:
+        import datetime
+        import xlwt
+        from xlsx2md import ExcelToMarkdownConverter
+        from xls_lazy_reader import LazyXlsReader
+    except ImportError as e:
+        print(f"⚠️ 跳过（需要xlwt生成.xls测试文件）: {e}")
+        return True
+
+    input_file = prepare_test_dir() / "legacy.xls"
+    workbook = xlwt.Workbook()
+    sheet = workbook.add_sheet("混合数据")
+    date_style = xlwt.easyxf(num_format_str="YYYY-MM-DD")
+    time_style = xlwt.easyxf(num_format_str="HH:MM:SS")
+    for col, header in enumerate(["编号", "名称", "金额", "日期", "时间", "标志", "", "名称"]):
+        sheet.write(0, col, header)
+    for row in range(1, 1200):
+        sheet.write(row, 0, row)
+        sheet.write(row, 1, f"项|目\n{row}")
+        sheet.write(row, 2, row * 1.5)
+        sheet.write(row, 3, datetime.date(2024, 1, 1) + datetime.timedelta(days=row % 300), date_style)
+        sheet.write(row, 4, datetime.time(row % 24, 30), time_style)
+        sheet.write(row, 5, row % 2 == 0)
+    workbook.add_sheet("空表")
+    header_only = workbook.add_sheet("只有表头")
+    header_only.write(0, 0, "a")
+    header_only.write(0, 1, "b")
+    workbook.save(str(input_file))
+
+    try:
+        reader = LazyXlsReader(str(input_file))
+        with reader:
+            for sheet_name in reader.sheetnames:
+                list(reader.iter_rows(sheet_name))
+                if reader.book.sheet_loaded(sheet_name):
+                    print(f"❌ sheet页 {sheet_name} 读取后没有卸载")
+                    return False
+
+        lazy = ExcelToMarkdownConverter()
+        eager = ExcelToMarkdownConverter()
+        eager.LAZY_EXTENSIONS = ()
+        outputs = {}
+        for name, converter in (("lazy", lazy), ("eager", eager)):
+            output_file = TEST_DIR / name / "legacy.md"
+            if not converter.convert_single_file(str(input_file), str(output_file), force=True):
+                print(f"❌ {name} 转换失败")
+                return False
+            outputs[name] = strip_volatile_lines(output_file.read_text(encoding="utf-8"))
+    finally:
+        shutil.rmtree(TEST_DIR, ignore_errors=True)
+
+    if outputs["lazy"] != outputs["eager"]:
+        print("❌ 按需加载的输出与pandas完整读取不一致")
+        return False
+    if "| 1 | 项\\|目<br>1 | 1.5 | 2024-01-02 00:00:00 | 01:30:00 | False |  |  |" not in outputs["lazy"]:
+        print("❌ 单元格转换结果不符合预期")
+        return False
+
+    print("✅ .xls按需加载输出一致")
+    return True
+
+
+def test_preview_mode():
+    """测试预览模式只读取前N行，且共享字符串表只解析到用到的位置"""
+    print_header("测试预览模式")
+
+    try:
+        from xlsx2md import ExcelToMarkdownConverter
+        from xlsx_fast_reader import FastXlsxReader
+    except Exception as e:
+        print(f"❌ 模块导入失败: {e}")
+        return False
+
+    input_file = create_test_workbook(prepare_test_dir() / "mixed.xlsx")
+    strings_file = create_shared_strings_workbook(TEST_DIR / "strings.xlsx", 20000)
+
+    try:
+        digests = {
+            engine: ExcelToMarkdownConverter(engine=engine).preview_file(str(input_file), 2)
+            for engine in ("fast", "openpyxl")
+        }
+        with FastXlsxReader(str(strings_file)) as reader:
+            rows = list(zip(range(3), reader.iter_rows(reader.sheetnames[0])))
+            parsed_strings = len(reader._shared_strings)
+            all_strings = len(reader.shared_strings)
+            dimension = reader.sheet_dimension(reader.sheetnames[0])
+    finally:
+        shutil.rmtree(TEST_DIR, ignore_errors=True)
+
+    digest = digests["fast"]
+    expected = [
+        "**Sheet页数量:** 3",
+        "## 📄 Sheet: 混合数据",
+        "**使用范围:** A1:H1209 (1209行×8列)",
+        "**前 2 行:**",
+        "| 名称 | Unnamed: 1 | 名称.1 | 2024 | 1.5 |",
+        "| a\\|b | 1 | 2.5 | True | 2024-01-02 00:00:00 |",
+        "|  |  |  |  |  |\n\n---",
+        "## 📄 Sheet: 空表",
+        "*(空表格)*",
+        "**前 0 行:**",
+    ]
+    for line in expected:
+        if line not in digest:
+            print(f"❌ 预览中缺少: {line}")
+            return False
+    if "行0" in digest:
+        print("❌ 预览读取了超过N行的数据")
+        return False
+    engine_lines = ("**读取引擎:**", "**工作表XML大小:**")
+    comparable = {
+        engine: [line for line in text.split("\n") if not line.startswith(engine_lines)]
+        for engine, text in digests.items()
+    }
+    if comparable["fast"] != comparable["openpyxl"]:
+        print("❌ fast与openpyxl的预览不一致")
+        return False
+
+    if rows[2][1] != ("文本2",) or not 3 <= parsed_strings < all_strings == 20000:
+        print(f"❌ 共享字符串表没有按需解析: {parsed_strings}/{all_strings}")
+        return False
+    if dimension != "A1:A20000":
+        print(f"❌ 使用范围读取错误: {dimension}")
+        return False
+
+    print("✅ 预览模式正常")
+    return True
+
+
+def test_column_stats():
+    """测试各种转换模式输出的列统计一致，近似去重数误差在合理范围内"""
+    print_header("测试列统计")
+
+    try:
+        import json
+        from xlsx2md import ExcelToMarkdownConverter
+    except Exception as e:
+        print(f"❌ 模块导入失败: {e}")
+        return False
+
+    input_file = create_test_workbook(prepare_test_dir() / "mixed.xlsx")
+    converters = {
+        "eager": ExcelToMarkdownConverter(column_stats=True),
+        "stream": ExcelToMarkdownConverter(chunk_size=7, streaming=True, column_stats=True),
+        "sheets": ExcelToMarkdownConverter(sheet_jobs=2, column_stats=True),
+        "cached": ExcelToMarkdownConverter(sheet_cache=True, column_stats=True),
+    }
+
+    outputs = {}
+    try:
+        for name, converter in converters.items():
+            output_file = TEST_DIR / name / "mixed.md"
+            for _ in range(2 if name == "cached" else 1):
+                if not converter.convert_single_file(str(input_file), str(output_file), force=True):
+                    print(f"❌ {name} 转换失败")
+                    return False
+            content = output_file.read_text(encoding="utf-8")
+            outputs[name] = json.loads(content.split("```json\n")[1].split("\n```")[0])["sheets_info"]
+    finally:
+        shutil.rmtree(TEST_DIR, ignore_errors=True)
+
+    for name, sheets_info in outputs.items():
+        if sheets_info != outputs["eager"]:
+            print(f"❌ {name} 的列统计与常规模式不一致")
+            return False
+
+    profiles = outputs["eager"]["混合数据"]["column_profiles"]
+    types = [profile["type"] for profile in profiles]
+    if types != ["string", "integer", "float", "boolean", "datetime", "string"]:
+        print(f"❌ 推断类型不符合预期: {types}")
+        return False
+    name_profile = profiles[0]
+    if abs(name_profile["distinct_approx"] - 1202) > 1202 * 0.05 or \
+            (name_profile["min_length"], name_profile["max_length"]) != (2, 5) or \
+            name_profile["null_ratio"] != round(1 / 1203, 4):
+        print(f"❌ 列统计不符合预期: {name_profile}")
+        return False
+    if outputs["eager"]["只有表头"]["column_profiles"][0]["type"] != "empty":
+        print("❌ 没有数据的列应推断为empty")
+        return False
+
+    print("✅ 列统计一致")
+    return True
+
+
+def test_compact_string_storage():
+    """测试紧凑字符串存储（category/pyarrow）的输出与object存储一致"""
+    print_header("测试紧凑字符串存储")
+
+    try:
+        import pandas as pd
+        from xlsx2md import ExcelToMarkdownConverter
+        from xlsx_string_storage import is_compact_column
+    except Exception as e:
+        print(f"❌ 模块导入失败: {e}")
+        return False
+
+    storages = ["category"]
+    try:
+        import pyarrow
+        storages.append("pyarrow")
+    except ImportError:
+        print("⚠️ 未安装pyarrow，跳过pyarrow存储")
+
+    input_file = create_test_workbook(prepare_test_dir() / "mixed.xlsx")
+    outputs = {}
+    try:
+        for storage in ["object"] + storages:
+            converter = ExcelToMarkdownConverter(max_rows_per_page=100, string_storage=storage,
+                                                 data_formats=["jsonl"], column_stats=True)
+            output_file = TEST_DIR / storage / "mixed.md"
+            if not converter.convert_single_file(str(input_file), str(output_file), force=True):
+                print(f"❌ {storage} 转换失败")
+                return False
+            data_file = output_file.parent / "mixed_data" / "混合数据.jsonl"
+            outputs[storage] = (strip_volatile_lines(output_file.read_text(encoding="utf-8")),
+                                data_file.read_text(encoding="utf-8"))
+
+        sheets = ExcelToMarkdownConverter(string_storage="category").read_excel_file(str(input_file))
+    finally:
+        shutil.rmtree(TEST_DIR, ignore_errors=True)
+
+    for storage in storages:
+        if outputs[storage] != outputs["object"]:
+            print(f"❌ {storage} 存储的输出与object存储不一致")
+            return False
+
+    dtypes = sheets["混合数据"].dtypes.tolist()
+    # 第1、2、3列几乎都是不同值，不做字典编码（有pyarrow时为Arrow字符串列）；其余列重复值多，使用字典编码
+    if [isinstance(dtype, pd.CategoricalDtype) for dtype in dtypes] != [False, False, False, True, True, True]:
+        print(f"❌ category存储的列类型不符合预期: {dtypes}")
+        return False
+    distinct_compact = [is_compact_column(sheets["混合数据"].iloc[:, col_idx]) for col_idx in range(3)]
+    expected_object = 0 if "pyarrow" in storages else 3
+    if distinct_compact != [expected_object == 0] * 3 or \
+            sheets["混合数据"].attrs.get("object_columns") != expected_object:
+        print(f"❌ 不同值较多的列存储方式不符合预期: {dtypes[:3]}, {sheets['混合数据'].attrs}")
+        return False
+
+    print(f"✅ 紧凑字符串存储输出一致: {', '.join(storages)}")
+    return True
+
+
+def test_arrow_string_escaping():
+    """测试Arrow字符串列（pyarrow存储及category存储中不同值较多的列）的渲染与object存储一致"""
+    print_header("测试Arrow字符串列渲染")
+
+    try:
+        import pandas as pd
+        from xlsx2md import ExcelToMarkdownConverter
+        from xlsx_string_storage import CompactFrameBuilder, compact_dataframe, is_compact_column
+    except Exception as e:
+        print(f"❌ 模块导入失败: {e}")
+        return False
+    try:
+        import pyarrow
+    except ImportError:
+        print("⚠️ 未安装pyarrow，跳过")
+        return True
+
+    rows = [[f"值{i}|a", "多行\n文本" if i % 3 else "", f"x{i % 2}"] for i in range(40)] + [["只有一列"]]
+    headers = ["A", "B", "C"]
+    expected = pd.DataFrame([row + [""] * (3 - len(row)) for row in rows], columns=headers, dtype=object)
+    # pandas读取的结果中有缺失值
+    with_missing = expected.copy()
+    with_missing.iloc[5, 0] = None
+
+    converter = ExcelToMarkdownConverter()
+    frames = {}
+    for storage in ["pyarrow", "category"]:
+        builder = CompactFrameBuilder(storage)
+        builder.append_rows(rows[:25])
+        builder.append_rows(rows[25:])
+        frames[f"{storage}-builder"] = (builder.to_dataframe(headers), expected)
+        frames[f"{storage}-pandas"] = (compact_dataframe(with_missing, storage), with_missing)
+
+    for name, (df, reference) in frames.items():
+        arrow_columns = [col for col in headers if isinstance(df[col].dtype, pd.StringDtype)]
+        # pyarrow存储全部为Arrow列；category存储中只有不同值较多的A列不做字典编码
+        if arrow_columns != (headers if name.startswith("pyarrow") else ["A"]) or \
+                not all(is_compact_column(df[col]) for col in headers) or df.attrs.get("object_columns"):
+            print(f"❌ {name} 的列存储不符合预期: {df.dtypes.tolist()}")
+            return False
+        for start, end in [(0, len(df)), (3, 17)]:
+            if converter.render_table_rows(df.iloc[start:end]) != \
+                    converter.render_table_rows(reference.iloc[start:end]):
+                print(f"❌ {name} 第{start}~{end}行的渲染结果与object存储不一致")
+                return False
+
+    print("✅ Arrow字符串列的空值处理和转义与object存储一致")
+    return True
+
+
+def test_row_delta():
+    """测试行级增量：常规模式和流式模式按键列/行号输出相同的新增、修改和删除"""
+    print_header("测试行级增量")
+
+    try:
+        import json
+        from openpyxl import Workbook
+        from xlsx2md import ExcelToMarkdownConverter
+    except Exception as e:
+        print(f"❌ 模块导入失败: {e}")
+        return False
+
+    def save_version(file_path, rows, extra_sheet):
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.title = "订单"
+        sheet.append(["编号", "名称", "数量"])
+        for row in rows:
+            sheet.append(row)
+        if extra_sheet:
+            extra = workbook.create_sheet("临时")
+            extra.append(["列A"])
+            extra.append(["x"])
+        workbook.save(file_path)
+
+    # 增量Markdown中记录源文件哈希的行（文件头和摘要JSON）
+    SOURCE_HASH_LINES = ("**文件哈希:**", "**上次文件哈希:**", '"file_hash":', '"previous_hash":')
+
+    rows = [[f"K{i}", f"名称{i}", i] for i in range(50)]
+    input_file = prepare_test_dir() / "orders.xlsx"
+    outputs = {}
+    try:
+        for key in ["编号", None]:
+            for streaming in [False, True]:
+                name = f"{key or 'position'}-{'stream' if streaming else 'eager'}"
+                converter = ExcelToMarkdownConverter(chunk_size=7, streaming=streaming, delta=True, delta_key=key)
+                output_file = TEST_DIR / name / "orders.md"
+
+                save_version(input_file, rows, True)
+                converter.convert_single_file(str(input_file), str(output_file))
+                first = [json.loads(line) for line in
+                         output_file.with_name("orders.delta.jsonl").read_text(encoding="utf-8").splitlines()]
+                if len(first) != 51 or any(record["op"] != "added" for record in first):
+                    print(f"❌ {name} 首次转换应把所有行输出为新增")
+                    return False
+
+                changed = [row[:] for row in rows]
+                changed[3][1] = "改|名"
+                del changed[10]
+                changed.append(["K99", "新行", 99])
+                save_version(input_file, changed, False)
+                if not converter.convert_single_file(str(input_file), str(output_file)):
+                    print(f"❌ {name} 转换失败")
+                    return False
+                # openpyxl在工作簿和zip条目中记录保存时间，各次保存的源文件哈希可能不同，只去掉记录源文件哈希的行
+                delta_markdown = strip_volatile_lines(
+                    output_file.with_name("orders.delta.md").read_text(encoding="utf-8"))
+                outputs[name] = (
+                    output_file.with_name("orders.delta.jsonl").read_text(encoding="utf-8"),
+                    "\n".join(line for line in delta_markdown.split("\n")
+                              if not line.lstrip().startswith(SOURCE_HASH_LINES))
+                )
+    finally:
+        shutil.rmtree(TEST_DIR, ignore_errors=True)
+
+    for key in ["编号", "position"]:
+        if outputs[f"{key}-stream"] != outputs[f"{key}-eager"]:
+            print(f"❌ {key} 流式模式的增量与常规模式不一致")
+            return False
+
+    records = [json.loads(line) for line in outputs["编号-eager"][0].splitlines()]
+    summary = [(record["sheet"], record["op"], record["row"], record["key"]) for record in records]
+    expected = [("订单", "changed", 5, "K3"), ("订单", "added", 51, "K99"),
+                ("订单", "removed", 12, "K10"), ("临时", "removed", 2, "2")]
+    if summary != expected or records[0]["values"] != {"编号": "K3", "名称": "改|名", "数量": "3"}:
+        print(f"❌ 按键列的增量不符合预期: {summary}")
+        return False
+    if "| 修改 | 5 | K3 | 改\\|名 | 3 |" not in outputs["编号-eager"][1]:
+        print("❌ 增量Markdown中缺少修改的行")
+        return False
+
+    # 按行号对比时，删除一行使其后的行都变为修改
+    ops = [json.loads(line)["op"] for line in outputs["position-eager"][0].splitlines()]
+    if (ops.count("added"), ops.count("changed"), ops.count("removed")) != (0, 41, 1):
+        print(f"❌ 按行号的增量不符合预期: {ops}")
+        return False
+
+    print("✅ 行级增量正确")
+    return True
+
+
+def test_sheet_column_row_selection():
+    """测试sheet页/列/行选择：各种读取方式的输出一致，未选中的sheet页不出现在输出中"""
+    print_header("测试sheet页/列/行选择")
+
+    try:
+        import json
+        from xlsx2md import ExcelToMarkdownConverter
+    except Exception as e:
+        print(f"❌ 模块导入失败: {e}")
+        return False
+
+    input_file = create_test_workbook(prepare_test_dir() / "mixed.xlsx")
+    selection = dict(sheets=["混合数据", "只有表头"], exclude_sheets=["只有表头"],
+                     columns=["名称.1", "A", "E"], rows="4:20")
+    converters = {
+        "eager": ExcelToMarkdownConverter(**selection),
+        "fast": ExcelToMarkdownConverter(engine="fast", **selection),
+        "stream": ExcelToMarkdownConverter(chunk_size=7, streaming=True, **selection),
+        "sheets": ExcelToMarkdownConverter(sheet_cache=True, engine="fast", **selection),
+    }
+
+    outputs = {}
+    try:
+        for name, converter in converters.items():
+            output_file = TEST_DIR / name / "mixed.md"
+            if not converter.convert_single_file(str(input_file), str(output_file), force=True):
+                print(f"❌ {name} 转换失败")
+                return False
+            outputs[name] = strip_volatile_lines(output_file.read_text(encoding="utf-8"))
+    finally:
+        shutil.rmtree(TEST_DIR, ignore_errors=True)
+
+    for name, content in outputs.items():
+        if content != outputs["eager"]:
+            print(f"❌ {name} 的输出与常规模式不一致")
+            return False
+
+    summary = json.loads(outputs["eager"].split("```json\n")[1].split("\n```")[0])
+    sheet_info = summary["sheets_info"].get("混合数据", {})
+    if list(summary["sheets_info"]) != ["混合数据"] or \
+            sheet_info.get("column_names") != ["名称", "名称.1", 1.5] or sheet_info.get("rows") != 17:
+        print(f"❌ 选择结果不符合预期: {summary['sheets_info']}")
+        return False
+    if summary.get("selection", {}).get("rows") != "4:20":
+        print("❌ 摘要中缺少选择条件")
+        return False
+    if "| 多行<br>文本 |  |  |" not in outputs["eager"] or "| 行15 | 7.5 |  |" not in outputs["eager"] \
+            or "行16" in outputs["eager"]:
+        print("❌ 选择的行不符合预期")
+        return False
+
+    print("✅ sheet页/列/行选择正确")
+    return True
+
+
+def test_compressed_output():
+    """测试压缩输出：.md.gz 的内容与未压缩输出一致，幂等检测识别压缩后的输出"""
+    print_header("测试压缩输出")
+
+    try:
+        import gzip
+        from xlsx2md import ConversionManifest, ExcelToMarkdownConverter
+        from merge_markdown import MarkdownMerger
+    except Exception as e:
+        print(f"❌ 模块导入失败: {e}")
+        return False
+
+    input_file = create_test_workbook(prepare_test_dir() / "mixed.xlsx")
+    plain_file = TEST_DIR / "plain" / "mixed.md"
+    output_dir = TEST_DIR / "gzip"
+    output_file = output_dir / "mixed.md.gz"
+    try:
+        ExcelToMarkdownConverter().convert_single_file(str(input_file), str(plain_file), force=True)
+        outputs = {"plain": strip_volatile_lines(plain_file.read_text(encoding="utf-8"))}
+        converters = {
+            "eager": ExcelToMarkdownConverter(compression="gzip"),
+            "stream": ExcelToMarkdownConverter(streaming=True, compression="gzip"),
+            "sheets": ExcelToMarkdownConverter(sheet_cache=True, compression="gzip"),
+        }
+        for name, converter in converters.items():
+            # 传入未压缩的文件名，自动加上 .gz
+            if not converter.convert_single_file(str(input_file), str(output_dir / "mixed.md"), force=True):
+                print(f"❌ {name} 转换失败")
+                return False
+            with gzip.open(output_file, "rt", encoding="utf-8") as f:
+                outputs[name] = strip_volatile_lines(f.read())
+
+        converter = converters["eager"]
+        if not converter.check_if_already_converted(input_file, output_file):
+            print("❌ 转换清单未识别压缩后的输出")
+            return False
+        ConversionManifest(output_dir).path.unlink()
+        if not converter.check_if_already_converted(input_file, output_file, ConversionManifest(output_dir)):
+            print("❌ 未能从压缩输出的头部读取文件哈希")
+            return False
+
+        directory_results = converter.convert_directory(str(TEST_DIR), str(TEST_DIR / "batch"))
+        if not all(directory_results.values()) or not (TEST_DIR / "batch" / "mixed.md.gz").exists():
+            print("❌ 目录模式未输出压缩文件")
+            return False
+
+        merged = MarkdownMerger().merge_files(TEST_DIR / "plain", TEST_DIR / "merged.md", compression="gzip")
+        with gzip.open(TEST_DIR / "merged.md.gz", "rt", encoding="utf-8") as f:
+            if not merged.get("success") or "## 📊 合并统计" not in f.read():
+                print("❌ 合并结果未压缩写出")
+                return False
+    finally:
+        shutil.rmtree(TEST_DIR, ignore_errors=True)
+
+    for name, content in outputs.items():
+        if content != outputs["plain"]:
+            print(f"❌ {name} 的压缩输出与未压缩输出不一致")
+            return False
+
+    print("✅ 压缩输出与未压缩输出一致，幂等检测识别压缩输出")
+    return True
+
+
+def test_sheet_dedup():
+    """测试sheet页去重：不同工作簿中相同的sheet页只渲染一次，输出与不去重时一致"""
+    print_header("测试sheet页去重")
+
+    try:
+        from openpyxl import Workbook
+        from xlsx2md import ExcelToMarkdownConverter
+    except Exception as e:
+        print(f"❌ 模块导入失败: {e}")
+        return False
+
+    def save_workbook(file_path, sheets):
+        workbook = Workbook()
+        workbook.remove(workbook.active)
+        for title, rows in sheets:
+            sheet = workbook.create_sheet(title)
+            for row in rows:
+                sheet.append(row)
+        workbook.save(file_path)
+
+    template = [["编号", "名称", "说明"]] + [[i, f"类别{i % 7}", "a|b\nc" if i % 5 == 0 else None]
+                                          for i in range(300)]
+    input_dir = prepare_test_dir() / "input"
+    input_dir.mkdir()
+    # 模板页在各工作簿中的位置不同，共享字符串表也不同
+    save_workbook(input_dir / "a.xlsx", [("模板", template), ("数据", [["x", "y"], ["甲", 1]])])
+    save_workbook(input_dir / "b.xlsx", [("数据", [["x", "z"], ["乙", 2], ["丙", 3]]), ("对照表", template)])
+    save_workbook(input_dir / "c.xlsx", [("模板", template), ("数据", [["x", "y"], ["甲", 1]])])
+
+    outputs = {}
+    try:
+        for name, options in [("plain", {}), ("dedup", {"dedup": True}),
+                              ("parallel", {"dedup": True, "data_formats": ["jsonl"]})]:
+            converter = ExcelToMarkdownConverter(**options)
+            jobs = 2 if name == "parallel" else 1
+            results = converter.convert_directory(str(input_dir), str(TEST_DIR / name), force=True, jobs=jobs)
+            if not all(results.values()):
+                print(f"❌ {name} 转换失败")
+                return False
+            outputs[name] = {
+                file_name: strip_volatile_lines((TEST_DIR / name / f"{Path(file_name).stem}.md")
+                                                .read_text(encoding="utf-8"))
+                for file_name in results
+            }
+            # 并行转换时多个进程可能同时渲染相同的sheet页，只检查顺序转换的复用数
+            expected_reused = {"plain": 0, "dedup": 3}.get(name, converter.dedup_stats["reused"])
+            if converter.dedup_stats["reused"] != expected_reused or \
+                    name != "plain" and converter.dedup_stats["sheets"] != 6:
+                print(f"❌ {name} 去重统计不正确: {converter.dedup_stats}")
+                return False
+        data_file = TEST_DIR / "parallel" / "b_data" / "对照表.jsonl"
+        if len(data_file.read_text(encoding="utf-8").splitlines()) != 300:
+            print("❌ 复用的sheet页缺少数据文件")
+            return False
+    finally:
+        shutil.rmtree(TEST_DIR, ignore_errors=True)
+
+    if outputs["dedup"] != outputs["plain"]:
+        print("❌ 去重后的输出与不去重时不一致")
+        return False
+    print("✅ 相同的sheet页只渲染一次，输出一致")
+    return True
+
+
+def test_sheet_dedup_equal_size():
+    """测试sheet页去重：工作表XML大小相同、单元格不同的sheet页不会被当作相同内容"""
+    print_header("测试大小相同的sheet页去重")
+
+    try:
+        import zipfile
+        from openpyxl import Workbook
+        from xlsx2md import ExcelToMarkdownConverter
+        from xlsx_fast_reader import FastXlsxReader
+    except Exception as e:
+        print(f"❌ 模块导入失败: {e}")
+        return False
+
+    input_dir = prepare_test_dir() / "input"
+    input_dir.mkdir()
+    # 数值位数相同，工作表XML的大小相同、内容不同
+    for name, offset in [("a", 1000), ("b", 2000)]:
+        workbook = Workbook()
+        workbook.active.title = "数据"
+        for i in range(50):
+            workbook.active.append([i + offset, (i * 7) % 10 + offset])
+        workbook.save(input_dir / f"{name}.xlsx")
+
+    try:
+        sizes = set()
+        fingerprints = set()
+        for name in ["a", "b"]:
+            with zipfile.ZipFile(input_dir / f"{name}.xlsx") as archive:
+                sizes.add(archive.getinfo("xl/worksheets/sheet1.xml").file_size)
+            with FastXlsxReader(str(input_dir / f"{name}.xlsx")) as reader:
+                fingerprints.add(reader.sheet_content_fingerprint("数据"))
+        if len(sizes) != 1 or len(fingerprints) != 2 or None in fingerprints:
+            print(f"❌ 大小相同的工作表指纹不正确: 大小 {sizes}, 指纹 {fingerprints}")
+            return False
+
+        converter = ExcelToMarkdownConverter(dedup=True)
+        results = converter.convert_directory(str(input_dir), str(TEST_DIR / "output"), force=True)
+        if not all(results.values()) or converter.dedup_stats["reused"] != 0:
+            print(f"❌ 转换失败或错误复用: {results}, {converter.dedup_stats}")
+            return False
+        for name, offset in [("a", 1000), ("b", 2000)]:
+            content = (TEST_DIR / "output" / f"{name}.md").read_text(encoding="utf-8")
+            if f"| {offset + 49} |" not in content:
+                print(f"❌ {name}.md 的内容不是该工作簿自己的数据")
+                return False
+    finally:
+        shutil.rmtree(TEST_DIR, ignore_errors=True)
+
+    print("✅ 大小相同、内容不同的sheet页分别渲染")
+    return True
+
+
+def test_watch_mode():
+    """测试监视模式：新增和修改的文件在稳定后转换，未写完的文件不会被读取；inotify和轮询结果一致"""
+    print_header("测试监视模式")
+
+    try:
+        import threading
+        import time
+        from xlsx2md import ExcelToMarkdownConverter
+        from xlsx_watch import watch_directory
+    except Exception as e:
+        print(f"❌ 模块导入失败: {e}")
+        return False
+
+    def wait_for(condition, timeout=15):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if condition():
+                return True
+            time.sleep(0.05)
+        return False
+
+    prepare_test_dir()
+    try:
+        for use_inotify in [True, False]:
+            name = "inotify" if use_inotify else "polling"
+            input_dir = TEST_DIR / name / "input"
+            output_dir = TEST_DIR / name / "output"
+            input_dir.mkdir(parents=True)
+            create_test_workbook(input_dir / "first.xlsx")
+            workbook_bytes = (input_dir / "first.xlsx").read_bytes()
+
+            converter = ExcelToMarkdownConverter()
+            stop = threading.Event()
+            watcher = threading.Thread(target=watch_directory, args=(converter, str(input_dir), str(output_dir)),
+                                       kwargs=dict(debounce=0.5, poll_interval=0.2, use_inotify=use_inotify,
+                                                   stop_event=stop))
+            watcher.start()
+            try:
+                if not wait_for(lambda: (output_dir / "first.md").exists()):
+                    print(f"❌ {name} 启动时未转换已有文件")
+                    return False
+
+                # 分两次写入：写完前半部分后停顿，期间不应转换
+                with open(input_dir / "second.xlsx", "wb") as f:
+                    f.write(workbook_bytes[:len(workbook_bytes) // 2])
+                    f.flush()
+                    time.sleep(0.3)
+                    f.write(workbook_bytes[len(workbook_bytes) // 2:])
+                (input_dir / "~$second.xlsx").write_bytes(b"lock")
+                if not wait_for(lambda: (output_dir / "second.md").exists()):
+                    print(f"❌ {name} 未转换新增的文件")
+                    return False
+
+                first_output = output_dir / "first.md"
+                first_mtime = first_output.stat().st_mtime_ns
+                with open(input_dir / "first.xlsx", "ab") as f:
+                    f.write(b"")
+                os.utime(input_dir / "first.xlsx")
+                time.sleep(1.5)
+                if first_output.stat().st_mtime_ns != first_mtime:
+                    print(f"❌ {name} 内容未变化的文件被重新转换")
+                    return False
+            finally:
+                stop.set()
+                watcher.join(timeout=10)
+
+            if watcher.is_alive() or (output_dir / "~$second.md").exists():
+                print(f"❌ {name} 监视未正常退出或转换了锁文件")
+                return False
+            if strip_volatile_lines((output_dir / "second.md").read_text(encoding="utf-8")).replace("second", "first") != \
+                    strip_volatile_lines((output_dir / "first.md").read_text(encoding="utf-8")):
+                print(f"❌ {name} 新增文件的转换结果不正确")
+                return False
+    finally:
+        shutil.rmtree(TEST_DIR, ignore_errors=True)
+
+    print("✅ 监视模式只转换新增或修改的文件")
+    return True
+
+
+def test_iter_markdown():
+    """测试iter_markdown逐段生成的Markdown与写出的文件一致，提前停止时不解析后面的sheet页"""
+    print_header("测试生成器API")
+
+    from xlsx2md import ExcelToMarkdownConverter
+
+    input_file = create_test_workbook(prepare_test_dir() / "mixed.xlsx")
+    try:
+        for name, options in (("openpyxl", {}), ("fast", {"engine": "fast", "column_stats": True}),
+                              ("paged", {"max_rows_per_page": 100})):
+            converter = ExcelToMarkdownConverter(**options)
+            output_file = TEST_DIR / name / "mixed.md"
+            if not converter.convert_single_file(str(input_file), str(output_file), force=True):
+                print(f"❌ {name} 转换失败")
+                return False
+            chunks = list(converter.iter_markdown(str(input_file)))
+            if strip_volatile_lines("".join(chunks)) != \
+                    strip_volatile_lines(output_file.read_text(encoding="utf-8")):
+                print(f"❌ {name} 拼接后的片段与输出文件不一致")
+                return False
+            if name == "paged" and sum(chunk.startswith("## 📋 混合数据") for chunk in chunks) != 13:
+                print("❌ 表格没有按页生成片段")
+                return False
+
+        converter = ExcelToMarkdownConverter()
+        read_sheets = []
+        read_sheet_dataframe = converter.read_sheet_dataframe
+        converter.read_sheet_dataframe = lambda workbook, sheet_name: (
+            read_sheets.append(sheet_name) or read_sheet_dataframe(workbook, sheet_name)
+        )
+        chunks = converter.iter_markdown(str(input_file))
+        header = next(chunks)
+        first_sheet = next(chunks)
+        chunks.close()
+        if not header.startswith("# Excel文件转换结果: mixed.xlsx") or "混合数据" not in first_sheet:
+            print("❌ 片段顺序不符合预期")
+            return False
+        if read_sheets != ["混合数据"]:
+            print(f"❌ 提前停止后仍读取了其他sheet页: {read_sheets}")
+            return False
+        if list(TEST_DIR.glob("*.md")):
+            print("❌ 生成器API写入了输出文件")
+            return False
+    finally:
+        shutil.rmtree(TEST_DIR, ignore_errors=True)
+
+    print("✅ 生成器API输出一致，可以提前停止")
+    return True
+
+
+def test_budget_pagination():
+    """测试按字节/token预算分页：每页接近预算且不超过，各种模式的输出一致"""
+    print_header("测试按预算分页")
+
+    from openpyxl import load_workbook
+    from xlsx2md import ExcelToMarkdownConverter
+
+    input_file = create_test_workbook(prepare_test_dir() / "mixed.xlsx")
+    workbook = load_workbook(input_file)
+    sheet = workbook.create_sheet("宽窄不一")
+    sheet.append(["编号", "说明"])
+    for i in range(600):
+        sheet.append([i, "很长的说明文字" * 150 if i % 50 == 0 else f"短{i}"])
+    workbook.save(input_file)
+    shutil.copyfile(input_file, TEST_DIR / "copy.xlsx")
+
+    budget = 4000
+    converters = {
+        "常规模式": ExcelToMarkdownConverter(page_bytes=budget),
+        "流式": ExcelToMarkdownConverter(page_bytes=budget, streaming=True, chunk_size=70),
+        "fast": ExcelToMarkdownConverter(page_bytes=budget, engine="fast", streaming=True),
+        "sheet并行": ExcelToMarkdownConverter(page_bytes=budget, sheet_jobs=2),
+        "缓存": ExcelToMarkdownConverter(page_bytes=budget, sheet_cache=True),
+        "去重": ExcelToMarkdownConverter(page_bytes=budget, dedup=True, chunk_size=70),
+    }
+    try:
+        outputs = {}
+        for name, converter in converters.items():
+            for source in ("copy.xlsx", "mixed.xlsx"):
+                output_file = TEST_DIR / name / source.replace(".xlsx", ".md")
+                if not converter.convert_single_file(str(TEST_DIR / source), str(output_file), force=True):
+                    print(f"❌ {name} 转换失败")
+                    return False
+            outputs[name] = strip_volatile_lines(output_file.read_text(encoding="utf-8"))
+        if converters["去重"].dedup_stats["reused"] != 4:
+            print(f"❌ 去重模式没有复用sheet页: {converters['去重'].dedup_stats}")
+            return False
+
+        chunks = list(converters["常规模式"].iter_markdown(str(input_file)))
+        token_pages = [chunk for chunk in ExcelToMarkdownConverter(page_tokens=budget // 3).iter_markdown(
+            str(input_file)) if chunk.startswith("## 📋 宽窄不一")]
+    finally:
+        shutil.rmtree(TEST_DIR, ignore_errors=True)
+
+    for name, content in outputs.items():
+        if content != outputs["常规模式"]:
+            print(f"❌ {name} 输出与常规模式不一致")
+            return False
+    if strip_volatile_lines("".join(chunks)) != outputs["常规模式"]:
+        print("❌ 生成器API输出与写出的文件不一致")
+        return False
+
+    pages = [chunk for chunk in chunks if chunk.startswith("## 📋 宽窄不一")]
+    sizes = [len(page.encode("utf-8")) for page in pages]
+    rows = [page.count("\n| ") - 2 for page in pages]
+    if not all(page.split("\n")[3].startswith("| 编号 | 说明 |") for page in pages):
+        print("❌ 每页没有重复表头")
+        return False
+    if any(size > budget for size, count in zip(sizes, rows) if count > 1):
+        print(f"❌ 多行的页面超过预算: {max(sizes)} 字节")
+        return False
+    if sum(rows) != 600 or len(pages) >= 600 / 10 or min(sizes[:-1]) < budget // 3:
+        print(f"❌ 分页结果不符合预期: {len(pages)} 页，每页 {min(sizes)}~{max(sizes)} 字节")
+        return False
+    if len(token_pages) == len(pages) or not token_pages[0].startswith("## 📋 宽窄不一\n*页面 1/"):
+        print("❌ 按token预算分页结果不符合预期")
+        return False
+
+    print(f"✅ 按预算分页: {len(pages)} 页，每页 {min(sizes)}~{max(sizes)} 字节，各模式输出一致")
+    return True
+
+
+def main():
+    """主测试函数"""
+    print_header("xlsx2md 功能测试")
+
+    tests = [
+        test_render_table_rows,
+        test_streaming_matches_eager,
+        test_fast_engine_matches_openpyxl,
+        test_parallel_directory_conversion,
+        test_manifest_idempotency,
+        test_source_hash,
+        test_parallel_sheets_match_eager,
+        test_sheet_cache,
+        test_trailing_blank_pruning,
+        test_jsonl_data_output,
+        test_xls_lazy_loading,
+        test_preview_mode,
+        test_column_stats,
+        test_compact_string_storage,
+        test_arrow_string_escaping,
+        test_row_delta,
+        test_sheet_column_row_selection,
+        test_compressed_output,
+        test_sheet_dedup,
+        test_sheet_dedup_equal_size,
+        test_watch_mode,
+        test_iter_markdown,
+        test_budget_pagination,
+    ]
+
+    results = []
+    for test in tests:
+        try:
+            results.append(test())
+        except Exception as e:
+            print(f"❌ 测试执行失败: {e}")
+            results.append(False)
+
+    passed = sum(results)
+    total = len(results)
+    print(f"\n测试结果: {passed}/{total} 通过")
+    return 0 if passed == total else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
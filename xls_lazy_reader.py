@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+XLS按需读取模块
+使用xlrd的按需加载模式（on_demand=True）打开.xls工作簿，打开时只解析全局信息和sheet列表，
+sheet页在迭代时才解析，迭代结束后立即卸载（unload_sheet），
+因此单元格对象占用的内存只与最大的sheet页有关，与整个工作簿无关。
+
+单元格值的转换规则（数字、日期、布尔、错误值等）与pandas的xlrd读取器一致。
+"""
+
+import io
+import itertools
+import math
+from datetime import time
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+class LazyXlsReader:
+    """基于xlrd按需加载的XLS读取器，逐个sheet页解析并在读完后卸载"""
+
+    def __init__(self, file_path):
+        """
+        打开工作簿，只解析全局信息（字符串表、格式等）和sheet列表
+
+        Args:
+            file_path: .xls文件路径、文件内容或已打开的文件对象
+        """
+        import xlrd
+
+        if isinstance(file_path, (bytes, bytearray)):
+            contents = file_path
+        elif isinstance(file_path, io.BytesIO):
+            # open_source_file已把.xls读入内存：getvalue返回同一个bytes对象，不再复制
+            contents = file_path.getvalue()
+        elif hasattr(file_path, 'read'):
+            contents = file_path.read()
+        else:
+            contents = None
+
+        # ragged_rows=True: 每行只保留到该行最后一个单元格，不按最宽一行补齐
+        if contents is not None:
+            self.book = xlrd.open_workbook(file_contents=contents, on_demand=True, ragged_rows=True)
+        else:
+            # 不让xlrd映射文件：映射期间文件被截断或改写时进程会因SIGBUS直接退出
+            self.book = xlrd.open_workbook(file_path, on_demand=True, ragged_rows=True, use_mmap=False)
+
+    @property
+    def sheetnames(self) -> List[str]:
+        """sheet页名称列表"""
+        return self.book.sheet_names()
+
+    def iter_rows(self, sheet_name: str, extent: Optional[Dict] = None,
+                  select_columns: Optional[Callable[[tuple], Sequence[int]]] = None,
+                  row_range: Optional[Tuple[int, Optional[int]]] = None) -> Iterator[tuple]:
+        """
+        解析sheet页并逐行返回单元格值，迭代结束（或中断）后卸载该sheet页
+
+        空单元格和错误单元格返回None（pandas读为NaN），由调用方去掉每行末尾的空单元格。
+
+        Args:
+            sheet_name: sheet页名称
+            extent: 可选字典，写入使用范围: rows_read（行数）、raw_width（列数）；选择了列或行时不写入
+            select_columns: 可选函数，参数为第1行（表头）的单元格值，返回保留的列下标（从0开始）；
+                返回的每行只包含保留的列，未保留列的单元格不做转换
+            row_range: 可选的 (起始行, 结束行)，第1行之外只返回该范围内的行
+
+        Yields:
+            单元格值元组
+        """
+        import xlrd
+
+        sheet = self.book.sheet_by_name(sheet_name)
+        datemode = self.book.datemode
+        try:
+            if extent is not None and select_columns is None and row_range is None:
+                extent['rows_read'] = max(extent.get('rows_read', 0), sheet.nrows)
+                extent['raw_width'] = max(extent.get('raw_width', 0), sheet.ncols)
+
+            min_row, max_row = row_range or (2, None)
+            last_row = sheet.nrows if max_row is None else min(sheet.nrows, max_row)
+            columns = None
+            for row_index in itertools.chain(range(min(1, sheet.nrows)), range(min_row - 1, last_row)):
+                cells = zip(sheet.row_values(row_index), sheet.row_types(row_index))
+                if select_columns is not None:
+                    cells = list(cells)
+                    if columns is None:
+                        header = tuple(_parse_cell(value, cell_type, datemode, xlrd)
+                                       for value, cell_type in cells) if row_index == 0 else ()
+                        columns = select_columns(header)
+                    cells = [cells[index] if index < len(cells) else (None, xlrd.XL_CELL_EMPTY)
+                             for index in columns]
+                    while cells and cells[-1][1] in (xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK):
+                        cells.pop()
+                yield tuple(_parse_cell(value, cell_type, datemode, xlrd) for value, cell_type in cells)
+        finally:
+            self.book.unload_sheet(sheet_name)
+
+    def close(self):
+        """释放工作簿占用的资源"""
+        self.book.release_resources()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _parse_cell(value, cell_type: int, datemode: int, xlrd):
+    """转换单元格原始值，规则与pandas的xlrd读取器一致"""
+    if cell_type in (xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK, xlrd.XL_CELL_ERROR):
+        return None
+    if cell_type == xlrd.XL_CELL_DATE:
+        try:
+            value = xlrd.xldate.xldate_as_datetime(value, datemode)
+        except OverflowError:
+            return value
+        # Excel不区分日期和时间，纪元当天的日期按时间处理
+        year = value.timetuple()[0:3]
+        if (not datemode and year == (1899, 12, 31)) or (datemode and year == (1904, 1, 1)):
+            value = time(value.hour, value.minute, value.second, value.microsecond)
+        return value
+    if cell_type == xlrd.XL_CELL_BOOLEAN:
+        return bool(value)
+    if cell_type == xlrd.XL_CELL_NUMBER and math.isfinite(value):
+        int_value = int(value)
+        if int_value == value:
+            return int_value
+    return value
@@ -8,31 +8,406 @@ XLSX to Markdown Converter
 import argparse
 import os
 import sys
+import shutil
 import pandas as pd
 import numpy as np
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
 import warnings
 from tqdm import tqdm
 import json
 import hashlib
+import re
+import signal
+import threading
+import time
+import io
+import itertools
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+
+from markdown_compression import (
+    COMPRESSIONS, markdown_stem, open_markdown_reader, open_markdown_writer, require_zstandard,
+    with_compression_suffix
+)
+from xlsx_column_stats import ColumnProfiler
+from xlsx_data_writer import ARROW_FORMATS, DATA_FORMATS, SheetDataWriter, require_pyarrow
+from xlsx_fast_reader import FastXlsxReader, UnsupportedXlsxFeature
+from xlsx_row_delta import DeltaRecorder, RowIndex
+from xlsx_selection import SheetSelection
+from xlsx_sheet_store import SheetStore
+from xlsx_string_storage import (STRING_STORAGES, CompactFrameBuilder, compact_dataframe,
+                                 escape_compact_column, is_compact_column)
+from xlsx_watch import watch_directory
+from xls_lazy_reader import LazyXlsReader
+from openpyxl.utils.cell import get_column_letter, range_boundaries
 
 warnings.filterwarnings('ignore')
 
+# openpyxl只读模式下错误单元格以字符串返回，pandas会将其读为NaN
+EXCEL_ERROR_CODES = ('#NULL!', '#DIV/0!', '#VALUE!', '#REF!', '#NAME?', '#NUM!', '#N/A')
+
+# 批量转义时用于拼接单元格的分隔符（Excel单元格中不会出现NUL字符）
+CELL_SEPARATOR = "\x00"
+
+# 计算文件哈希时每次处理的字节数
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# 按token预算分页时估算token数：ASCII字符约每4个计1个token，其他字符（多为中文）每个计1个token
+ASCII_CHARS_PER_TOKEN = 4
+
+
+def _convert_cell(value):
+    """
+    转换单元格原始值，与pandas的openpyxl读取器保持一致
+
+    整数值的浮点数转为int，None转为空字符串，错误单元格转为空字符串
+    """
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        try:
+            int_value = int(value)
+        except (OverflowError, ValueError):
+            return value
+        return int_value if int_value == value else float(value)
+    if isinstance(value, str) and value in EXCEL_ERROR_CODES:
+        return ""
+    return value
+
+
+def _escape_markdown_cells(cells: List[str]) -> List[str]:
+    """
+    批量转义一列单元格中的Markdown特殊字符（| 和换行）
+
+    整列先拼接成一个字符串统一替换再拆分，避免逐个单元格调用replace；
+    单元格本身含有分隔符时退回逐个替换。
+    """
+    joined = CELL_SEPARATOR.join(cells)
+    if "|" not in joined and "\n" not in joined:
+        return cells
+    escaped = joined.replace("|", "\\|").replace("\n", "<br>").split(CELL_SEPARATOR)
+    if len(escaped) != len(cells):
+        return [cell.replace("|", "\\|").replace("\n", "<br>") for cell in cells]
+    return escaped
+
+
+def _source_state(source) -> Tuple[int, int]:
+    """已打开文件当前的大小和修改时间（纳秒）"""
+    stat = os.fstat(source.fileno())
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _format_size(num_bytes: int) -> str:
+    """将字节数格式化为便于阅读的大小"""
+    size = float(num_bytes)
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def _tee_lines(lines: Iterable[str], target) -> Iterator[str]:
+    """逐行返回lines，同时把每行写入target"""
+    for line in lines:
+        target.write(line + "\n")
+        yield line
+
+
+def _mangle_headers(raw_headers: List) -> List:
+    """为空列名和重复列名生成列名，规则与pandas一致（Unnamed: i / name.1）"""
+    names = [f"Unnamed: {i}" if h == "" else h for i, h in enumerate(raw_headers)]
+    counts: Dict = {}
+    for i, col in enumerate(names):
+        cur_count = counts.get(col, 0)
+        while cur_count > 0:
+            counts[col] = cur_count + 1
+            col = f"{col}.{cur_count}"
+            cur_count = counts.get(col, 0)
+        names[i] = col
+        counts[col] = cur_count + 1
+    return names
+
+
+class ConversionManifest:
+    """
+    转换清单：记录输出目录中每个源文件转换时的大小、修改时间和内容哈希
+
+    清单保存在输出目录的 .xlsx2md_manifest.json 中，以源文件绝对路径（所在目录解析符号链接后加文件名）为键。
+    幂等检测只需对源文件做一次stat，无需读取已生成的Markdown文件；批量转换同一目录时
+    目录只解析一次（见source_key的directory参数）。
+    """
+
+    FILE_NAME = '.xlsx2md_manifest.json'
+    VERSION = 1
+    # 批量转换时两次自动保存之间的最小间隔（秒）
+    AUTOSAVE_INTERVAL = 30
+
+    def __init__(self, output_dir: Path):
+        """
+        加载输出目录中的转换清单（不存在或损坏时从空清单开始）
+
+        Args:
+            output_dir: 输出目录
+        """
+        self.path = Path(output_dir) / self.FILE_NAME
+        self.entries: Dict[str, Dict] = {}
+        self.dirty = False
+        self.last_saved = time.monotonic()
+
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('version') == self.VERSION:
+                    self.entries = data.get('files', {})
+            except (OSError, ValueError) as e:
+                print(f"警告: 转换清单读取失败，将重新建立: {e}")
+
+    @staticmethod
+    def source_key(input_file: Path, directory: Optional[str] = None) -> str:
+        """
+        清单中使用的源文件键（绝对路径）
+
+        Args:
+            input_file: 源文件
+            directory: 已解析为绝对路径的所在目录，为空时解析input_file所在目录
+        """
+        input_file = Path(input_file)
+        if directory is None:
+            directory = str(input_file.parent.resolve())
+        return os.path.join(directory, input_file.name)
+
+    def get(self, input_file: Path, key: Optional[str] = None) -> Optional[Dict]:
+        """获取源文件的清单记录（key为source_key的结果，为空时计算）"""
+        return self.entries.get(key or self.source_key(input_file))
+
+    def record(self, input_file: Path, output_file: Path, file_hash: str,
+               stat: Optional[os.stat_result] = None, key: Optional[str] = None):
+        """
+        记录一次成功的转换
+
+        Args:
+            input_file: 源文件
+            output_file: 输出文件
+            file_hash: 源文件内容哈希
+            stat: 源文件的stat结果（为空时重新获取）
+            key: source_key的结果（为空时计算）
+        """
+        stat = stat or Path(input_file).stat()
+        self.entries[key or self.source_key(input_file)] = {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'hash': file_hash,
+            'output': Path(output_file).name,
+            'converted_at': pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+        self.dirty = True
+
+    def autosave(self):
+        """距上次保存超过AUTOSAVE_INTERVAL秒时保存，避免批量转换中断后丢失记录"""
+        if self.dirty and time.monotonic() - self.last_saved >= self.AUTOSAVE_INTERVAL:
+            self.save()
+
+    def save(self):
+        """原子地写入清单文件"""
+        if not self.dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': self.VERSION, 'files': self.entries}, f, ensure_ascii=False)
+        os.replace(temp_path, self.path)
+        self.dirty = False
+        self.last_saved = time.monotonic()
+
+
+class SheetCache:
+    """
+    sheet页渲染缓存：保存每个sheet页渲染后的Markdown分段和摘要信息
+
+    缓存位于输出目录的 .xlsx2md_cache/<源文件路径哈希>/ 中，以sheet页内容指纹和
+    影响渲染结果的设置（分页方式）命名，源文件只有部分sheet页变化时，其余sheet页
+    直接使用缓存的分段，无需重新解析和渲染。
+    """
+
+    DIR_NAME = '.xlsx2md_cache'
+    VERSION = 2
+
+    def __init__(self, output_dir: Path, input_file: Path, paging: str,
+                 data_formats: Iterable[str] = (), column_stats: bool = False, selection: str = ""):
+        """
+        Args:
+            output_dir: 输出目录
+            input_file: 源文件
+            paging: 分页设置的摘要（见ExcelToMarkdownConverter.paging_signature）
+            data_formats: 同时缓存的数据文件格式（见xlsx_data_writer.DATA_FORMATS）
+            column_stats: 摘要信息中是否包含列统计
+            selection: 列和行选择条件的摘要（见SheetSelection.signature），为空表示未选择
+        """
+        source_key = ConversionManifest.source_key(input_file)
+        self.directory = Path(output_dir) / self.DIR_NAME / hashlib.md5(source_key.encode('utf-8')).hexdigest()
+        self.settings = "-".join([f"v{self.VERSION}", paging, *sorted(data_formats)]
+                                 + (["stats"] if column_stats else [])
+                                 + ([f"sel{selection}"] if selection else []))
+        self.data_extensions = [DATA_FORMATS[fmt] for fmt in data_formats]
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, fingerprint: str, suffix: str) -> Path:
+        return self.directory / f"{fingerprint}-{self.settings}{suffix}"
+
+    def section_path(self, fingerprint: str) -> str:
+        """sheet页渲染结果（分段文件）的路径，数据文件与其同名、扩展名不同"""
+        return str(self._path(fingerprint, '.md'))
+
+    def get(self, fingerprint: str) -> Optional[Dict]:
+        """返回缓存的sheet页摘要信息，分段文件、数据文件或摘要不存在时返回None"""
+        info_path = self._path(fingerprint, '.json')
+        required = [info_path] + [self._path(fingerprint, ext) for ext in ['.md'] + self.data_extensions]
+        if not all(path.exists() for path in required):
+            return None
+        try:
+            with open(info_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, fingerprint: str, sheet_info: Dict):
+        """分段文件写入完成后，记录sheet页摘要信息"""
+        info_path = self._path(fingerprint, '.json')
+        temp_path = info_path.with_name(info_path.name + '.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(sheet_info, f, ensure_ascii=False, default=str)
+        os.replace(temp_path, info_path)
+
+    def prune(self, fingerprints: Iterable[Optional[str]]):
+        """删除不再属于当前源文件任何sheet页（或使用了不同设置）的缓存"""
+        keep = {self._path(fingerprint, '').name for fingerprint in fingerprints if fingerprint is not None}
+        for path in self.directory.iterdir():
+            if path.name.split('.', 1)[0] not in keep:
+                path.unlink()
+
+
+class _ColumnSelector:
+    """
+    读取器读到表头（第1行）时调用：确定保留的列，并记录这些列在完整表头中的列名
+
+    表头单元格按与转换结果相同的规则转换和命名后与指定的列名比较；保留的列沿用原列名
+    （如 名称.1），表头为空的列按选择后的位置重新命名（与pandas的usecols一致）。
+    """
+
+    def __init__(self, selection: SheetSelection):
+        self.selection = selection
+        self.headers: Optional[tuple] = None
+
+    def __call__(self, header_row: tuple) -> List[int]:
+        raw_headers = [_convert_cell(value) for value in header_row]
+        while raw_headers and raw_headers[-1] == "":
+            raw_headers.pop()
+        names = _mangle_headers(raw_headers)
+        indices = self.selection.column_indices([str(name) for name in names])
+        headers = [names[index] if index < len(raw_headers) and raw_headers[index] != "" else None
+                   for index in indices]
+        while headers and headers[-1] is None:
+            headers.pop()
+        self.headers = tuple(headers)
+        return indices
+
 
 class ExcelToMarkdownConverter:
     """Excel文件转Markdown转换器 - 修复版本"""
 
-    def __init__(self, chunk_size: int = 1000, max_rows_per_page: int = 500):
+    # 目录模式下转换的Excel文件扩展名
+    EXCEL_EXTENSIONS = ('.xlsx', '.xls', '.xlsm', '.xlsb')
+
+    # 支持只读流式读取的扩展名（openpyxl / fast）
+    STREAMING_EXTENSIONS = ('.xlsx', '.xlsm')
+
+    # 使用xlrd按需加载、逐个sheet页解析和卸载的扩展名
+    LAZY_EXTENSIONS = ('.xls',)
+
+    # 可选的读取引擎，fast为内置的zip+iterparse快速解析器
+    ENGINES = ('fast', 'openpyxl', 'xlrd')
+
+    def __init__(self, chunk_size: int = 1000, max_rows_per_page: int = 500,
+                 streaming: bool = False, engine: Optional[str] = None, sheet_jobs: int = 1,
+                 sheet_cache: bool = False, data_formats: Iterable[str] = (),
+                 column_stats: bool = False, string_storage: str = 'object',
+                 delta: bool = False, delta_key: Optional[str] = None,
+                 sheets: Optional[Iterable[str]] = None, exclude_sheets: Optional[Iterable[str]] = None,
+                 columns: Optional[Iterable[str]] = None, rows: Optional[str] = None,
+                 compression: Optional[str] = None, dedup: bool = False,
+                 page_bytes: Optional[int] = None, page_tokens: Optional[int] = None):
         """
         初始化转换器
 
         Args:
-            chunk_size: 分块处理的行数
+            chunk_size: 分块处理的行数（流式模式下每批读取的行数）
             max_rows_per_page: 每个Markdown页面的最大行数
+            streaming: 是否使用流式模式（逐批读取、渲染并写入磁盘）
+            engine: 优先使用的读取引擎（fast/openpyxl/xlrd），失败时按默认顺序回退
+            sheet_jobs: 单个文件内并行处理sheet页的进程数（仅.xlsx/.xlsm），0表示使用全部CPU核数
+            sheet_cache: 是否在输出目录中缓存各sheet页的渲染结果，只重新渲染变化的sheet页（仅.xlsx/.xlsm）
+            data_formats: 同时输出的sheet页数据文件格式（parquet/arrow/jsonl），写入 <输出文件名>_data/ 目录
+            column_stats: 是否在文件摘要中输出每列的统计信息（空值比例、近似去重数、长度范围、推断类型）
+            string_storage: 常规模式下DataFrame的字符串存储方式（object/pyarrow/category），
+                pyarrow和category为紧凑存储，大幅降低文本较多的sheet页的内存占用
+            delta: 是否输出与上次转换相比的行级增量（<输出文件名>.delta.md / .delta.jsonl）
+            delta_key: 增量对比使用的键列名称，为空时按行号对比；指定时自动启用delta
+            sheets: 只转换这些sheet页，未选中的sheet页不会被解析
+            exclude_sheets: 不转换这些sheet页
+            columns: 只保留这些列（表头名称或Excel列字母/范围，如 B、D:F），读取时跳过其余列
+            rows: 只保留该范围内的行 START:END（Excel行号，第1行表头始终保留），读到结束行即停止
+            compression: 输出文件的压缩格式（gzip/zstd），输出文件名自动加上 .gz / .zst；
+                为空时按输出文件名判断（以 .md.gz / .md.zst 结尾时压缩）
+            dedup: 是否按内容指纹复用已渲染的相同sheet页（仅.xlsx/.xlsm，保存在输出目录的
+                .xlsx2md_store/ 中，跨工作簿、跨多次运行共用）
+            page_bytes: 按字节预算分页：每页（含标题和表头）的UTF-8字节数尽量不超过该值，
+                不再按max_rows_per_page固定行数分页
+            page_tokens: 按估算的token数预算分页，与page_bytes不能同时指定
         """
-        self.chunk_size = chunk_size
+        if engine is not None and engine not in self.ENGINES:
+            raise ValueError(f"不支持的读取引擎: {engine}，可选: {', '.join(self.ENGINES)}")
+        data_formats = list(dict.fromkeys(data_formats))
+        for fmt in data_formats:
+            if fmt not in DATA_FORMATS:
+                raise ValueError(f"不支持的数据格式: {fmt}，可选: {', '.join(DATA_FORMATS)}")
+        if string_storage not in STRING_STORAGES:
+            raise ValueError(f"不支持的字符串存储方式: {string_storage}，可选: {', '.join(STRING_STORAGES)}")
+        if any(fmt in ARROW_FORMATS for fmt in data_formats) or string_storage == 'pyarrow':
+            require_pyarrow()
+        if compression is not None and compression not in COMPRESSIONS:
+            raise ValueError(f"不支持的压缩格式: {compression}，可选: {', '.join(COMPRESSIONS)}")
+        if compression == 'zstd':
+            require_zstandard()
+        if page_bytes is not None and page_tokens is not None:
+            raise ValueError("page_bytes 和 page_tokens 不能同时指定")
+        for budget in (page_bytes, page_tokens):
+            if budget is not None and budget <= 0:
+                raise ValueError(f"每页预算必须大于0: {budget}")
+
+        self.chunk_size = max(1, chunk_size)
         self.max_rows_per_page = max_rows_per_page
+        self.page_bytes = page_bytes
+        self.page_tokens = page_tokens
+        self.streaming = streaming
+        self.engine = engine
+        self.sheet_jobs = sheet_jobs if sheet_jobs > 0 else (os.cpu_count() or 1)
+        self.sheet_cache = sheet_cache
+        self.data_formats = data_formats
+        self.column_stats = column_stats
+        self.string_storage = string_storage
+        self.delta = delta or delta_key is not None
+        self.delta_key = delta_key
+        self.selection = SheetSelection(sheets, exclude_sheets, columns, rows)
+        self.compression = compression
+        self.dedup = dedup
+        # 去重统计: 处理的sheet页数、复用的sheet页数、复用的行数和表格行字节数
+        self.dedup_stats = dict.fromkeys(('sheets', 'reused', 'reused_rows', 'reused_bytes'), 0)
 
     def get_file_extension(self, file_path: str) -> str:
         """获取文件扩展名"""
@@ -56,12 +431,13 @@ class ExcelToMarkdownConverter:
             # 默认使用openpyxl
             return 'openpyxl'
 
-    def read_excel_file(self, file_path: str) -> Dict:
+    def read_excel_file(self, file_path: str, source=None) -> Dict:
         """
         读取Excel文件，处理多个sheet页 - 增强版本
 
         Args:
             file_path: Excel文件路径
+            source: 已打开的文件对象（open_source_file的返回值），为空时按路径读取
 
         Returns:
             包含sheet名和DataFrame的字典
@@ -79,17 +455,58 @@ class ExcelToMarkdownConverter:
         else:
             engines_to_try = ['openpyxl', 'xlrd']
 
+        # 指定的引擎优先尝试，fast只支持.xlsx/.xlsm
+        if self.engine == 'fast':
+            if file_ext in self.STREAMING_EXTENSIONS:
+                engines_to_try.insert(0, 'fast')
+        elif self.engine in engines_to_try:
+            engines_to_try.remove(self.engine)
+            engines_to_try.insert(0, self.engine)
+
         last_error = None
+        excel_source = source if source is not None else file_path
 
         for engine in engines_to_try:
+            if source is not None:
+                source.seek(0)
+
+            # .xlsx/.xlsm按行流式读取，末尾的空行空列在读取时丢弃，不交给pandas分配
+            if engine in ('fast', 'openpyxl') and file_ext in self.STREAMING_EXTENSIONS:
+                try:
+                    print(f"尝试使用 {engine} 引擎读取 {file_name}...")
+                    sheets = self.read_excel_file_rows(excel_source, engine)
+                    print(f"✓ 使用 {engine} 引擎成功读取 {file_name}")
+                    return sheets
+                except UnsupportedXlsxFeature as e:
+                    last_error = e
+                    print(f"✗ fast 引擎不支持该文件，回退到其他引擎: {e}")
+                    continue
+                except Exception as e:
+                    last_error = e
+                    print(f"✗ 使用 {engine} 引擎失败: {e}")
+                    continue
+
+            # .xls按需加载，每个sheet页读完后即卸载；失败时再用pandas完整读取
+            if engine == 'xlrd' and file_ext in self.LAZY_EXTENSIONS:
+                try:
+                    print(f"尝试使用 xlrd 按需加载读取 {file_name}...")
+                    sheets = self.read_excel_file_rows(excel_source, engine)
+                    print(f"✓ 使用 xlrd 按需加载成功读取 {file_name}")
+                    return sheets
+                except Exception as e:
+                    last_error = e
+                    print(f"✗ xlrd 按需加载失败: {e}")
+                    if source is not None:
+                        source.seek(0)
+
             try:
                 print(f"尝试使用 {engine} 引擎读取 {file_name}...")
 
                 # 使用当前引擎读取Excel文件
-                excel_file = pd.ExcelFile(file_path, engine=engine)
+                excel_file = pd.ExcelFile(excel_source, engine=engine)
                 sheets = {}
 
-                for sheet_name in excel_file.sheet_names:
+                for sheet_name in self.selection.select_sheets(excel_file.sheet_names):
                     try:
                         # 读取每个sheet页
                         df = pd.read_excel(
@@ -99,8 +516,11 @@ class ExcelToMarkdownConverter:
                             na_filter=False,  # 不将空字符串转为NaN
                             engine=engine
                         )
+                        df = compact_dataframe(self.prune_dataframe(self.select_dataframe(df)),
+                                               self.string_storage)
                         sheets[sheet_name] = df
-                        print(f"  ✓ 读取sheet页: {sheet_name} ({len(df)}行×{len(df.columns)}列)")
+                        print(f"  ✓ 读取sheet页: {sheet_name} ({len(df)}行×{len(df.columns)}列)"
+                              f"{self._format_pruned(df.attrs)}{self._format_object_columns(df.attrs)}")
 
                     except Exception as e:
                         print(f"  ✗ 读取sheet页 {sheet_name} 时出错: {e}")
@@ -113,7 +533,9 @@ class ExcelToMarkdownConverter:
                                 na_filter=False,
                                 engine=engine
                             )
-                            sheets[sheet_name] = df
+                            sheets[sheet_name] = compact_dataframe(
+                                self.prune_dataframe(self.select_dataframe(df)), self.string_storage
+                            )
                             print(f"  ✓ 使用备用参数读取sheet页: {sheet_name}")
                         except Exception as e2:
                             print(f"  ✗ 备用参数也失败: {e2}")
@@ -133,6 +555,474 @@ class ExcelToMarkdownConverter:
         print(f"最后错误: {last_error}")
         return {}
 
+    def read_excel_file_rows(self, file_path: str, engine: str = 'fast') -> Dict:
+        """
+        按行流式读取所有sheet页（fast解析器、openpyxl只读模式或xlrd按需加载）
+
+        单元格转换、表头命名和末尾空行/空列的处理规则与pandas读取结果一致，
+        但末尾的空行空列在读取时即被丢弃，去掉的行列数记录在DataFrame.attrs中。
+
+        Args:
+            file_path: .xlsx/.xlsm/.xls文件路径或已打开的文件对象
+            engine: 'fast'、'openpyxl' 或 'xlrd'（仅.xls）
+
+        Returns:
+            包含sheet名和DataFrame的字典
+
+        Raises:
+            UnsupportedXlsxFeature: 工作簿含有快速解析器不支持的特性
+        """
+        sheets = {}
+        workbook = self.load_streaming_workbook(file_path, engine)
+        try:
+            for sheet_name in self.get_sheet_names(workbook):
+                sheets[sheet_name] = self.read_sheet_dataframe(workbook, sheet_name)
+        finally:
+            workbook.close()
+        return sheets
+
+    def read_sheet_dataframe(self, workbook, sheet_name: str) -> pd.DataFrame:
+        """
+        按行读取一个sheet页并转换为DataFrame，读取出错时返回空的DataFrame
+
+        Raises:
+            UnsupportedXlsxFeature: 工作簿含有快速解析器不支持的特性
+        """
+        stats = {}
+        try:
+            df = self.rows_to_dataframe(self.sheet_rows(workbook, sheet_name, stats), stats)
+        except UnsupportedXlsxFeature:
+            raise
+        except Exception as e:
+            print(f"  ✗ 读取sheet页 {sheet_name} 时出错: {e}")
+            df = pd.DataFrame()
+        print(f"  ✓ 读取sheet页: {sheet_name} ({len(df)}行×{len(df.columns)}列)"
+              f"{self._format_pruned(df.attrs)}{self._format_object_columns(df.attrs)}")
+        return df
+
+    def rows_to_dataframe(self, rows: Iterable[tuple], stats: Optional[Dict] = None,
+                          limit: Optional[int] = None) -> pd.DataFrame:
+        """
+        将原始行数据（第一行为表头）转换为全部为字符串的DataFrame
+
+        limit不为空时只读取表头和前limit个数据行，不再继续读取后面的行。
+        使用紧凑字符串存储时按chunk_size分批逐列写入，不生成整张表的对象矩阵。
+        """
+        stats = stats if stats is not None else {}
+        trimmed_rows = self._iter_trimmed_rows(rows, stats)
+        raw_headers = next(trimmed_rows, [])
+        if limit is not None:
+            trimmed_rows = itertools.islice(trimmed_rows, limit)
+
+        if self.string_storage != 'object':
+            builder = CompactFrameBuilder(self.string_storage)
+            while True:
+                chunk = [[str(value) for value in row]
+                         for row in itertools.islice(trimmed_rows, self.chunk_size)]
+                if not chunk:
+                    break
+                builder.append_rows(chunk)
+            width = stats['width']
+            headers = _mangle_headers(list(raw_headers) + [""] * (width - len(raw_headers)))
+            df = builder.to_dataframe(headers)
+        else:
+            data = [[str(value) for value in row] for row in trimmed_rows]
+            width = stats['width']
+            headers = _mangle_headers(list(raw_headers) + [""] * (width - len(raw_headers)))
+            for row in data:
+                row.extend([""] * (width - len(row)))
+            df = pd.DataFrame(data, columns=headers, dtype=object)
+        df.attrs['pruned_rows'] = stats.get('pruned_rows', 0)
+        df.attrs['pruned_columns'] = stats.get('pruned_columns', 0)
+        return df
+
+    def select_dataframe(self, df: pd.DataFrame) -> pd.DataFrame:
+        """对pandas完整读取的DataFrame应用列和行的选择（与按行读取时下推的选择结果一致）"""
+        if self.selection.row_range is not None:
+            start, end = self.selection.row_range
+            # 第1行为表头，DataFrame的第i行对应Excel第i+2行
+            df = df.iloc[start - 2:end - 1 if end is not None else None]
+        if self.selection.columns is not None:
+            df = df.iloc[:, self.selection.column_indices([str(name) for name in df.columns])]
+            # 与按行读取时一致：表头为空的列按选择后的位置重新命名
+            df.columns = [f"Unnamed: {position}" if str(name).startswith("Unnamed: ") else name
+                          for position, name in enumerate(df.columns)]
+        return df
+
+    def prune_dataframe(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        去掉pandas读取结果（如xlrd）中末尾的空行和没有表头的空列，规则与按行读取时一致
+
+        去掉的行列数记录在DataFrame.attrs中
+        """
+        values = df.to_numpy(dtype=object)
+        empty = pd.isna(values) | (values == "")
+
+        row_has_data = ~empty.all(axis=1) if len(df.columns) else np.zeros(len(df), dtype=bool)
+        keep_rows = int(np.flatnonzero(row_has_data)[-1]) + 1 if row_has_data.any() else 0
+
+        keep_columns = len(df.columns)
+        while keep_columns > 0:
+            header = str(df.columns[keep_columns - 1])
+            if not header.startswith("Unnamed: ") or not empty[:keep_rows, keep_columns - 1].all():
+                break
+            keep_columns -= 1
+
+        pruned_rows = len(df) - keep_rows
+        pruned_columns = len(df.columns) - keep_columns
+        if pruned_rows or pruned_columns:
+            df = df.iloc[:keep_rows, :keep_columns]
+        df.attrs['pruned_rows'] = pruned_rows
+        df.attrs['pruned_columns'] = pruned_columns
+        return df
+
+    def _format_pruned(self, stats: Dict) -> str:
+        """读取日志中去掉的末尾空行/空列数量"""
+        if not stats.get('pruned_rows') and not stats.get('pruned_columns'):
+            return ""
+        return f"，已去掉末尾 {stats.get('pruned_rows', 0)} 个空行、{stats.get('pruned_columns', 0)} 个空列"
+
+    def _format_object_columns(self, attrs: Dict) -> str:
+        """读取日志中未能紧凑存储的列数（category存储下不同值过多、且未安装pyarrow的列）"""
+        if not attrs.get('object_columns'):
+            return ""
+        return f"，{attrs['object_columns']} 列不同值过多，未做字典编码，按对象存储（安装pyarrow后存为Arrow字符串列）"
+
+    def supports_streaming(self, file_path: str) -> bool:
+        """判断文件是否可以使用流式模式读取"""
+        return self.get_file_extension(file_path) in self.STREAMING_EXTENSIONS
+
+    def supports_lazy_loading(self, file_path: str) -> bool:
+        """判断文件是否可以按需逐个sheet页加载（.xls，需要xlrd）"""
+        if self.get_file_extension(file_path) not in self.LAZY_EXTENSIONS:
+            return False
+        try:
+            import xlrd
+            return True
+        except ImportError:
+            return False
+
+    def load_streaming_workbook(self, file_path: str, engine: str = 'openpyxl'):
+        """
+        以只读方式打开工作簿，只解析sheet列表，单元格数据在迭代时才读取
+
+        Args:
+            file_path: Excel文件路径或已打开的文件对象
+            engine: 'fast' 使用内置快速解析器，'xlrd' 按需加载.xls，其他值使用openpyxl只读模式
+        """
+        if engine == 'fast':
+            return FastXlsxReader(file_path)
+        if engine == 'xlrd':
+            return LazyXlsReader(file_path)
+
+        from openpyxl import load_workbook
+        return load_workbook(file_path, read_only=True, data_only=True)
+
+    def get_sheet_names(self, workbook) -> List[str]:
+        """返回工作簿中要转换的数据sheet页名称（与pandas一致，不含图表页；按sheets/exclude_sheets过滤）"""
+        if isinstance(workbook, (FastXlsxReader, LazyXlsReader)):
+            return self.selection.select_sheets(workbook.sheetnames)
+        return self.selection.select_sheets([worksheet.title for worksheet in workbook.worksheets])
+
+    def sheet_rows(self, workbook, sheet_name: str, stats: Optional[Dict] = None) -> Iterator[tuple]:
+        """
+        迭代指定sheet页的原始行数据，不会一次性加载整个工作簿
+
+        Args:
+            workbook: load_streaming_workbook返回的工作簿
+            sheet_name: sheet页名称
+            stats: 与_iter_trimmed_rows共用的统计字典，fast/xlrd读取器在其中记录使用范围
+        """
+        selector = _ColumnSelector(self.selection) if self.selection.columns is not None else None
+        if isinstance(workbook, (FastXlsxReader, LazyXlsReader)):
+            rows = workbook.iter_rows(sheet_name, extent=stats, select_columns=selector,
+                                      row_range=self.selection.row_range)
+        else:
+            worksheet = workbook[sheet_name]
+            # 与pandas一致：忽略文件中记录的尺寸（可能不准确），按实际单元格读取
+            worksheet.reset_dimensions()
+            if not self.selection.filters_cells:
+                return worksheet.iter_rows(values_only=True)
+            max_row = self.selection.row_range[1] if self.selection.row_range else None
+            rows = self._select_rows(worksheet.iter_rows(max_row=max_row, values_only=True), selector)
+        return rows if selector is None else self._with_selected_headers(rows, selector)
+
+    def _select_rows(self, rows: Iterator[tuple], selector=None) -> Iterator[tuple]:
+        """对openpyxl逐行返回的数据应用列和行的选择（openpyxl只读模式无法跳过单元格的解析）"""
+        first_row = self.selection.first_row
+        columns = None
+        for row_number, row in enumerate(rows, 1):
+            if 1 < row_number < first_row:
+                continue
+            if selector is not None:
+                if columns is None:
+                    columns = selector(row if row_number == 1 else ())
+                row = [row[index] if index < len(row) else None for index in columns]
+                # 与fast/xlrd读取器一致：每行只到最后一个有值的选中列为止
+                while row and row[-1] is None:
+                    row.pop()
+                row = tuple(row)
+            yield row
+
+    def _with_selected_headers(self, rows: Iterator[tuple], selector) -> Iterator[tuple]:
+        """把选择列后的表头行替换为这些列在完整表头中的列名"""
+        rows = iter(rows)
+        header = next(rows, None)
+        if header is None:
+            return
+        yield selector.headers if selector.headers is not None else header
+        yield from rows
+
+    def _iter_trimmed_rows(self, rows: Iterable[tuple], stats: Dict) -> Iterator[List]:
+        """
+        转换单元格并去掉每行末尾的空单元格，丢弃表格末尾的空行
+
+        中间的空行只在遇到后续数据行时才补出，因此末尾空行不会被保留在内存中；
+        每行先去掉末尾的None再转换，被零散格式扩大的空列不会被转换和分配。
+
+        stats中记录:
+            width: 最宽一行的列数（实际数据范围）
+            rows_read / raw_width: 读取到的使用范围（行数/列数）
+            pruned_rows / pruned_columns: 使用范围中去掉的末尾空行/空列数
+        """
+        stats.setdefault('width', 0)
+        pending_blank_rows = 0
+        rows_read = 0
+        raw_width = 0
+        kept_rows = 0
+        for raw_row in rows:
+            rows_read += 1
+            end = len(raw_row)
+            if end > raw_width:
+                raw_width = end
+            while end and raw_row[end - 1] is None:
+                end -= 1
+            row = [_convert_cell(value) for value in raw_row[:end]]
+            while row and row[-1] == "":
+                row.pop()
+            if not row:
+                pending_blank_rows += 1
+                continue
+            for _ in range(pending_blank_rows):
+                yield []
+            kept_rows += pending_blank_rows + 1
+            pending_blank_rows = 0
+            stats['width'] = max(stats['width'], len(row))
+            yield row
+
+        stats['rows_read'] = max(stats.get('rows_read', 0), rows_read)
+        stats['raw_width'] = max(stats.get('raw_width', 0), raw_width)
+        stats['pruned_rows'] = stats['rows_read'] - kept_rows
+        stats['pruned_columns'] = stats['raw_width'] - stats['width']
+
+    def spool_sheet_rows(self, rows: Iterable[tuple], spool, stats: Optional[Dict] = None,
+                         data_spool=None, profiler: Optional[ColumnProfiler] = None,
+                         delta: Optional[DeltaRecorder] = None) -> Dict:
+        """
+        按chunk_size分批读取行数据，渲染为Markdown表格行并写入临时文件
+
+        Args:
+            rows: 原始行迭代器（第一行为表头）
+            spool: 以文本模式打开的临时文件
+            stats: 与sheet_rows共用的统计字典
+            data_spool: 可选的临时文件，同时写入每行的单元格值（JSON数组），用于输出数据文件
+            profiler: 可选的列统计器，在同一遍读取中按批统计各列
+            delta: 可选的增量记录器（已调用begin_sheet），在同一遍读取中按批对比行指纹
+
+        Returns:
+            sheet信息: 表头、行数、列数、去掉的末尾空行/空列数以及每批的(行数, 列数)；
+            按预算分页时还包括每批各行的大小（见line_costs）
+        """
+        stats = stats if stats is not None else {}
+        trimmed_rows = self._iter_trimmed_rows(rows, stats)
+        raw_headers = next(trimmed_rows, [])
+        if delta is not None:
+            delta.set_headers(_mangle_headers(list(raw_headers)))
+
+        total_rows = 0
+        chunks = []
+        row_costs = [] if self.paged_by_budget() else None
+        while True:
+            chunk = list(itertools.islice(trimmed_rows, self.chunk_size))
+            if not chunk:
+                break
+            chunk = [[str(value) for value in row] for row in chunk]
+            chunk_width = max(1, max(len(row) for row in chunk))
+            chunk_df = pd.DataFrame(
+                [row + [""] * (chunk_width - len(row)) for row in chunk],
+                dtype=object
+            )
+            lines = self.render_table_rows(chunk_df)
+            for line in lines:
+                spool.write(line + "\n")
+            if row_costs is not None:
+                row_costs.append(self.line_costs(lines))
+            if profiler is not None:
+                profiler.update(chunk_df)
+            if delta is not None:
+                delta.add_rows(chunk)
+            if data_spool is not None:
+                for row in chunk:
+                    data_spool.write(json.dumps(row, ensure_ascii=False) + "\n")
+            chunks.append((len(chunk), chunk_width))
+            total_rows += len(chunk)
+
+        width = stats['width']
+        headers = _mangle_headers(list(raw_headers) + [""] * (width - len(raw_headers)))
+        return {
+            'headers': headers,
+            'rows': total_rows,
+            'columns': width,
+            'pruned_rows': stats['pruned_rows'],
+            'pruned_columns': stats['pruned_columns'],
+            'chunks': chunks,
+            'row_costs': row_costs
+        }
+
+    def _iter_spooled_data(self, data_spool, width: int) -> Iterator[List[str]]:
+        """从临时文件读回单元格值，并补齐到最终列数"""
+        data_spool.seek(0)
+        for line in data_spool:
+            row = json.loads(line)
+            row.extend([""] * (width - len(row)))
+            yield row
+
+    def _spooled_row_costs(self, sheet_info: Dict) -> Optional[np.ndarray]:
+        """按预算分页时各表格行的大小，加上补齐列数部分的大小；不按预算分页时返回None"""
+        if sheet_info['row_costs'] is None:
+            return None
+        width = sheet_info['columns']
+        blank_cost = self.line_costs([""])[0]
+        costs = [
+            chunk_costs + (self.line_costs(["  |" * (width - chunk_width)])[0] - blank_cost)
+            for chunk_costs, (_, chunk_width) in zip(sheet_info['row_costs'], sheet_info['chunks'])
+        ]
+        return np.concatenate(costs) if costs else np.zeros(0)
+
+    def _iter_spooled_rows(self, spool, sheet_info: Dict) -> Iterator[str]:
+        """从临时文件读回表格行，并补齐各批次与最终列数之间的差异"""
+        spool.seek(0)
+        width = sheet_info['columns']
+        for chunk_rows, chunk_width in sheet_info['chunks']:
+            padding = "  |" * (width - chunk_width)
+            for line in itertools.islice(spool, chunk_rows):
+                yield line[:-1] + padding
+
+    def write_paged_table(self, out, sheet_name: str, headers: List,
+                          row_lines: Iterator[str], total_rows: int,
+                          row_costs: Optional[np.ndarray] = None):
+        """
+        将已渲染的表格行分页写入输出，格式与process_large_dataframe一致
+
+        Args:
+            out: 输出文件对象
+            sheet_name: sheet页名称
+            headers: 列名列表
+            row_lines: 已渲染的表格行迭代器
+            total_rows: 总行数
+            row_costs: 按预算分页时各行的大小（见line_costs），为空时读出全部行后计算
+        """
+        if total_rows == 0 or not headers:
+            out.write(self.dataframe_to_markdown_table(pd.DataFrame(), sheet_name) + "\n")
+            return
+
+        for page in self.iter_table_pages(sheet_name, headers, row_lines, total_rows, row_costs):
+            out.write(page + "\n")
+
+    def iter_table_pages(self, sheet_name: str, headers: List, row_lines: Iterable[str],
+                         total_rows: int, row_costs: Optional[np.ndarray] = None) -> Iterator[str]:
+        """
+        将已渲染的表格行分页，逐页生成Markdown表格（格式与dataframe_to_markdown_table一致），
+        每页重复表头
+
+        Args:
+            sheet_name: sheet页名称
+            headers: 列名列表
+            row_lines: 已渲染的表格行
+            total_rows: 总行数
+            row_costs: 按预算分页时各行的大小（见line_costs），为空时读出全部行后计算
+        """
+        table_header = self.render_table_header(headers)
+        row_lines = iter(row_lines)
+        overhead = 0.0
+        if self.paged_by_budget():
+            if row_costs is None:
+                row_lines = list(row_lines)
+                row_costs = self.line_costs(row_lines)
+                row_lines = iter(row_lines)
+            # 每页的标题和表头（页码按最长的情况估计）也计入预算
+            title = [f"## 📋 {sheet_name}", f"*页面 {total_rows}/{total_rows}*", ""] if sheet_name else []
+            overhead = float(self.line_costs(title + table_header + [""]).sum())
+
+        page_ends = self.page_ends(total_rows, row_costs, overhead)
+        start = 0
+        for page, end in enumerate(page_ends):
+            page_lines = []
+            if sheet_name:
+                page_lines.append(f"## 📋 {sheet_name}")
+                if len(page_ends) > 1:
+                    page_lines.append(f"*页面 {page + 1}/{len(page_ends)}*")
+                page_lines.append("")
+            page_lines.extend(table_header)
+            page_lines.extend(itertools.islice(row_lines, end - start))
+            page_lines.append("")
+            yield "\n".join(page_lines)
+            start = end
+
+    def paged_by_budget(self) -> bool:
+        """是否按字节或token预算分页"""
+        return self.page_bytes is not None or self.page_tokens is not None
+
+    def paging_signature(self) -> str:
+        """分页设置的摘要，用于sheet页缓存的命名"""
+        if self.page_tokens is not None:
+            return f"t{self.page_tokens}"
+        if self.page_bytes is not None:
+            return f"b{self.page_bytes}"
+        return f"p{self.max_rows_per_page}"
+
+    def line_costs(self, lines: List[str]) -> np.ndarray:
+        """
+        每个表格行（含换行符）计入每页预算的大小：UTF-8字节数，按token预算分页时为估算的token数
+
+        非ASCII字符的个数由字节数与字符数之差估算（按3字节的中文计）。
+        """
+        count = len(lines)
+        sizes = np.fromiter(map(len, map(str.encode, lines)), dtype=np.int64, count=count) + 1
+        if self.page_tokens is None:
+            return sizes.astype(np.float64)
+        chars = np.fromiter(map(len, lines), dtype=np.int64, count=count) + 1
+        multibyte = (sizes - chars) / 2
+        return (chars - multibyte) / ASCII_CHARS_PER_TOKEN + multibyte
+
+    def page_ends(self, total_rows: int, row_costs: Optional[np.ndarray] = None,
+                  overhead: float = 0.0) -> List[int]:
+        """
+        计算每一页的结束位置（不含）
+
+        不按预算分页时每页max_rows_per_page行；按预算分页时对各行大小做累计和，
+        每页用searchsorted找到累计大小不超过 预算-overhead 的最后一行，每页至少一行。
+
+        Args:
+            total_rows: 总行数
+            row_costs: 各行的大小（见line_costs）
+            overhead: 每页标题和表头的大小
+        """
+        if not self.paged_by_budget():
+            return list(range(self.max_rows_per_page, total_rows, self.max_rows_per_page)) + [total_rows]
+
+        budget = self.page_tokens if self.page_tokens is not None else self.page_bytes
+        available = max(0.0, budget - overhead)
+        cumulative = np.cumsum(row_costs)
+        ends = []
+        start = 0
+        while start < total_rows:
+            base = cumulative[start - 1] if start else 0.0
+            end = int(np.searchsorted(cumulative, base + available, side='right'))
+            start = max(end, start + 1)
+            ends.append(start)
+        return ends
+
     def detect_merged_cells(self, file_path: str, sheet_name: str) -> List[Tuple]:
         """
         检测合并单元格（简化版本）
@@ -185,30 +1075,60 @@ class ExcelToMarkdownConverter:
             markdown_lines.append("")
 
         # 表格头部
+        markdown_lines.extend(self.render_table_header(headers))
+
+        # 添加数据行
+        markdown_lines.extend(self.render_table_rows(df))
+
+        markdown_lines.append("")  # 空行分隔
+        return "\n".join(markdown_lines)
+
+    def render_table_header(self, headers: List) -> List[str]:
+        """生成Markdown表格的表头行和分隔行"""
         header_line = "| " + " | ".join(str(h) for h in headers) + " |"
         separator_line = "| " + " | ".join(["---"] * len(headers)) + " |"
+        return [header_line, separator_line]
 
-        markdown_lines.append(header_line)
-        markdown_lines.append(separator_line)
+    def render_table_rows(self, df: pd.DataFrame) -> List[str]:
+        """
+        将DataFrame的数据部分渲染为Markdown表格行（按列向量化处理）
 
-        # 添加数据行
-        for _, row in df.iterrows():
-            row_values = []
-            for col in headers:
-                value = row[col]
-                # 处理NaN和None值
-                if pd.isna(value) or value is None:
-                    row_values.append("")
-                else:
-                    # 转义Markdown特殊字符
-                    cell_value = str(value).replace("|", "\\|").replace("\n", "<br>")
-                    row_values.append(cell_value)
+        逐列完成空值处理和特殊字符转义，再按行拼接。单元格取自df.values，
+        与逐行迭代(iterrows)得到的值完全相同，因此输出保持一致。
 
-            row_line = "| " + " | ".join(row_values) + " |"
-            markdown_lines.append(row_line)
+        Args:
+            df: DataFrame数据
 
-        markdown_lines.append("")  # 空行分隔
-        return "\n".join(markdown_lines)
+        Returns:
+            每行一个字符串的列表（不含换行符）
+        """
+        if len(df) == 0:
+            return []
+        if len(df.columns) == 0:
+            return ["|  |"] * len(df)
+
+        # 紧凑存储（Arrow字符串/字典编码）的列直接在原存储上处理，不转换为object
+        compact = any(is_compact_column(df.iloc[:, col_idx]) for col_idx in range(len(df.columns)))
+        values = None if compact else df.values
+        columns = []
+        for col_idx in range(len(df.columns)):
+            if compact:
+                column = df.iloc[:, col_idx]
+                if is_compact_column(column):
+                    columns.append(escape_compact_column(column, _escape_markdown_cells))
+                    continue
+                column = pd.Series(column.to_numpy(dtype=object), dtype=object)
+            else:
+                column = pd.Series(values[:, col_idx], dtype=object)
+            # 处理NaN和None值
+            is_missing = column.isna()
+            cells = column.astype(str)
+            if is_missing.any():
+                cells = cells.where(~is_missing, "")
+            # 转义Markdown特殊字符
+            columns.append(_escape_markdown_cells(cells.tolist()))
+
+        return ["| " + " | ".join(row) + " |" for row in zip(*columns)]
 
     def process_large_dataframe(self, df: pd.DataFrame, sheet_name: str) -> List[str]:
         """
@@ -221,15 +1141,26 @@ class ExcelToMarkdownConverter:
         Returns:
             分页的Markdown字符串列表
         """
+        return list(self.iter_dataframe_pages(df, sheet_name))
+
+    def iter_dataframe_pages(self, df: pd.DataFrame, sheet_name: str) -> Iterator[str]:
+        """逐页生成DataFrame的Markdown表格；不按预算分页时每次只渲染一页"""
         if df.empty:
-            return [self.dataframe_to_markdown_table(df, sheet_name)]
+            yield self.dataframe_to_markdown_table(df, sheet_name)
+            return
+
+        if self.paged_by_budget():
+            row_lines = self.render_table_rows(df)
+            yield from self.iter_table_pages(sheet_name, df.columns.tolist(), row_lines, len(df),
+                                             self.line_costs(row_lines))
+            return
 
         total_rows = len(df)
         if total_rows <= self.max_rows_per_page:
-            return [self.dataframe_to_markdown_table(df, sheet_name)]
+            yield self.dataframe_to_markdown_table(df, sheet_name)
+            return
 
         # 分页处理
-        pages = []
         num_pages = (total_rows + self.max_rows_per_page - 1) // self.max_rows_per_page
 
         for page in range(num_pages):
@@ -237,91 +1168,205 @@ class ExcelToMarkdownConverter:
             end_idx = min((page + 1) * self.max_rows_per_page, total_rows)
             page_df = df.iloc[start_idx:end_idx]
 
-            page_md = self.dataframe_to_markdown_table(
+            yield self.dataframe_to_markdown_table(
                 page_df, sheet_name, page + 1, num_pages
             )
-            pages.append(page_md)
 
-        return pages
+    def iter_dataframe_rows(self, df: pd.DataFrame) -> Iterator[List[str]]:
+        """按chunk_size分批把DataFrame转换为字符串行（空值为空字符串），用于输出数据文件"""
+        for start in range(0, len(df), self.chunk_size):
+            for row in df.iloc[start:start + self.chunk_size].to_numpy(dtype=object).tolist():
+                yield ["" if value is None or value is pd.NA or value != value else str(value)
+                       for value in row]
+
+    def profile_dataframe(self, df: pd.DataFrame) -> List[Dict]:
+        """按chunk_size分批统计DataFrame各列的信息，与流式模式的统计结果一致"""
+        profiler = ColumnProfiler()
+        for start in range(0, len(df), self.chunk_size):
+            profiler.update(df.iloc[start:start + self.chunk_size])
+        return profiler.profiles(df.columns.tolist())
+
+    def record_dataframe_delta(self, delta: DeltaRecorder, sheet_name: str, df: pd.DataFrame):
+        """按chunk_size分批对比DataFrame各行的指纹，与流式模式的对比结果一致"""
+        delta.begin_sheet(sheet_name, self.selection.first_row)
+        delta.set_headers(df.columns.tolist())
+        rows = self.iter_dataframe_rows(df)
+        while True:
+            batch = list(itertools.islice(rows, self.chunk_size))
+            if not batch:
+                break
+            # 与流式模式一致：去掉每行末尾的空单元格
+            for row in batch:
+                while row and row[-1] == "":
+                    row.pop()
+            delta.add_rows(batch)
+        delta.end_sheet(df.columns.tolist())
 
     def calculate_file_hash(self, file_path: str) -> str:
-        """计算文件哈希值，用于幂等检测"""
+        """计算文件哈希值，用于幂等检测（分块读取，不会把整个文件读入内存）"""
         try:
+            md5 = hashlib.md5()
             with open(file_path, 'rb') as f:
-                file_hash = hashlib.md5(f.read()).hexdigest()
-            return file_hash
+                for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                    md5.update(chunk)
+            return md5.hexdigest()
         except Exception as e:
             print(f"计算文件哈希时出错: {e}")
             return ""
 
-    def check_if_already_converted(self, input_file: Path, output_file: Path) -> bool:
+    @contextmanager
+    def open_source_file(self, file_path: str):
         """
-        检查文件是否已经转换过（幂等检测）- 增强版本
-        
+        以二进制方式打开源文件，哈希计算和解析共用同一个文件对象
+
+        不使用内存映射：映射期间文件被其他进程截断或原地改写时，访问映射会触发SIGBUS，
+        进程（监视模式的常驻进程、进程池的工作进程）直接退出；普通读取只会抛出可以处理的异常。
+        转换正常结束时再检查一次文件大小和修改时间，转换期间文件被改写时抛出OSError，不记录这次转换。
+
+        .xls由xlrd解析，xlrd不映射文件时本来就要把整个文件读入内存，因此这里读取一次、
+        返回内存中的BytesIO：哈希直接对这份内容计算，xlrd（LazyXlsReader、pandas）读取时
+        得到的是同一个bytes对象，不再复制，也不再读文件。
+        """
+        with open(file_path, 'rb') as f:
+            state = _source_state(f)
+            if self.get_file_extension(file_path) in self.LAZY_EXTENSIONS:
+                contents = f.read()
+                if len(contents) != state[0]:
+                    raise OSError(f"源文件在读取过程中被修改: {file_path}")
+                yield io.BytesIO(contents)
+            else:
+                yield f
+            if _source_state(f) != state:
+                raise OSError(f"源文件在转换过程中被修改: {file_path}")
+
+    def hash_source(self, source) -> str:
+        """
+        按块计算open_source_file返回的文件对象的MD5（读入同一个缓冲区，不在堆内存中复制整个文件），
+        计算完成后回到文件开头
+
+        Raises:
+            OSError: 计算哈希期间文件被修改
+        """
+        md5 = hashlib.md5()
+        if isinstance(source, io.BytesIO):
+            # 已读入内存的.xls：getvalue返回同一个bytes对象，不复制
+            md5.update(source.getvalue())
+            source.seek(0)
+            return md5.hexdigest()
+
+        buffer = bytearray(HASH_CHUNK_SIZE)
+        view = memoryview(buffer)
+        source.seek(0)
+        state = _source_state(source)
+        hashed = 0
+        while True:
+            count = source.readinto(buffer)
+            if not count:
+                break
+            md5.update(view[:count])
+            hashed += count
+        if hashed != state[0] or _source_state(source) != state:
+            raise OSError("源文件在计算哈希时被修改")
+        source.seek(0)
+        return md5.hexdigest()
+
+    def read_recorded_hash(self, output_file: Path) -> Optional[str]:
+        """从已生成的Markdown文件头部读取记录的源文件哈希"""
+        try:
+            with open_markdown_reader(output_file) as f:
+                for line in itertools.islice(f, 10):
+                    if line.startswith("**文件哈希:** `"):
+                        return line.strip()[len("**文件哈希:** `"):-1]
+        except (OSError, EOFError, UnicodeDecodeError):
+            pass
+        return None
+
+    def check_if_already_converted(self, input_file: Path, output_file: Path,
+                                   manifest: Optional[ConversionManifest] = None,
+                                   existing_outputs: Optional[Set[str]] = None,
+                                   key: Optional[str] = None) -> bool:
+        """
+        检查文件是否已经转换过（幂等检测）- 基于转换清单
+
+        1. 输出文件不存在时需要转换
+        2. 清单记录的大小和修改时间与源文件一致时直接跳过（只需一次stat）
+        3. 大小一致但修改时间变化（如复制、touch）时这里不读取文件，返回需要转换；
+           转换时先计算哈希，与记录一致则保留原输出并更新记录（见conversion_check）
+        4. 清单中没有记录时（旧版本生成的输出），比较输出文件头部记录的哈希，一致则补录
+
         Args:
             input_file: 输入文件路径
             output_file: 输出文件路径
-            
+            manifest: 转换清单，为空时加载输出目录中的清单
+            existing_outputs: 输出目录中已有的文件名（批量转换时只列一次目录），为空时检查输出文件是否存在
+            key: 源文件在清单中的键（见ConversionManifest.source_key），为空时计算
+
         Returns:
             True: 已经转换过，无需再次转换
             False: 需要转换
         """
-        # 检查输出文件是否存在
-        if not output_file.exists():
-            return False
-        
+        return self.conversion_check(input_file, output_file, manifest, existing_outputs, key)[0]
+
+    def conversion_check(self, input_file: Path, output_file: Path,
+                         manifest: Optional[ConversionManifest] = None,
+                         existing_outputs: Optional[Set[str]] = None,
+                         key: Optional[str] = None) -> Tuple[bool, Optional[str]]:
+        """
+        幂等检测（参数见check_if_already_converted）
+
+        Returns:
+            (是否已转换, 上次转换时的源文件哈希)：只修改了时间戳的文件返回 (False, 记录的哈希)，
+            交给_convert_file的unchanged_hash，转换读取源文件计算哈希后与其比较，不单独再读一次文件
+        """
+        if existing_outputs is not None:
+            if output_file.name not in existing_outputs:
+                return False, None
+        elif not output_file.exists():
+            return False, None
+
+        manifest = manifest if manifest is not None else ConversionManifest(output_file.parent)
+
         try:
-            # 读取输出文件的元数据
-            with open(output_file, 'r', encoding='utf-8') as f:
-                content = f.read(10000)  # 读取更多内容确保找到元数据
-            
-            input_filename = input_file.name
-            input_stem = input_file.stem
-            
-            # 检查是否包含源文件名（多种可能的格式）
-            patterns_to_check = [
-                f"源文件: `{input_filename}`",
-                f"**源文件:** `{input_filename}`",
-                f"Excel文件转换结果: {input_filename}",
-                f"# Excel文件转换结果: {input_filename}",
-                f"文件名称: {input_filename}",
-                f"**文件名称:** {input_filename}",
-            ]
-            
-            for pattern in patterns_to_check:
-                if pattern in content:
-                    print(f"✓ 检测到已转换文件: {input_filename} (匹配模式: {pattern})")
-                    return True
-            
-            # 检查是否包含文件名（不含扩展名）
-            if input_stem and f"{input_stem}" in content:
-                # 进一步确认这是正确的文件
-                lines = content.split('\n')
-                for line in lines[:20]:  # 只检查前20行
-                    if input_filename in line or input_stem in line:
-                        print(f"✓ 检测到已转换文件: {input_filename} (在内容中找到匹配)")
-                        return True
-            
-            # 检查文件摘要中的JSON
-            if '"file_name":' in content:
-                import json
-                import re
-                # 尝试提取JSON部分
-                json_match = re.search(r'```json\s*(.*?)\s*```', content, re.DOTALL)
-                if json_match:
-                    try:
-                        summary = json.loads(json_match.group(1))
-                        if summary.get('file_name') == input_filename:
-                            print(f"✓ 检测到已转换文件: {input_filename} (JSON摘要匹配)")
-                            return True
-                    except:
-                        pass
-            
-            return False
-                
+            stat = input_file.stat()
+            entry = manifest.get(input_file, key)
+
+            if entry is not None:
+                if entry.get('output') != output_file.name or entry.get('size') != stat.st_size:
+                    return False, None
+                if entry.get('mtime_ns') == stat.st_mtime_ns:
+                    print(f"✓ 检测到已转换文件: {input_file.name} (转换清单匹配)")
+                    return True, None
+                return False, entry.get('hash')
+
+            recorded_hash = self.read_recorded_hash(output_file)
+            if recorded_hash is None:
+                return False, None
+            file_hash = self.calculate_file_hash(str(input_file))
+            if file_hash and file_hash == recorded_hash:
+                manifest.record(input_file, output_file, file_hash, stat, key)
+                print(f"✓ 检测到已转换文件: {input_file.name} (文件哈希匹配)")
+                return True, None
+
+            return False, None
+
         except Exception as e:
             print(f"检查输出文件时出错: {e}")
+            return False, None
+
+    def source_unchanged(self, input_path: str, file_hash: str, unchanged_hash: Optional[str]) -> bool:
+        """转换时计算的源文件哈希与上次转换时一致（只修改了时间戳）时返回True，保留原输出"""
+        if unchanged_hash is None or file_hash != unchanged_hash:
             return False
+        print(f"✓ 检测到已转换文件: {Path(input_path).name} (文件哈希匹配)")
+        return True
+
+    def is_excel_file(self, file_name: str) -> bool:
+        """目录模式下是否转换该文件（按扩展名判断，跳过Excel打开文件时生成的 ~$ 锁文件）"""
+        return Path(file_name).suffix.lower() in self.EXCEL_EXTENSIONS and not file_name.startswith('~$')
+
+    def output_name(self, input_file: Path) -> str:
+        """目录模式下的输出文件名：<源文件名>.md，启用压缩时加上 .gz / .zst"""
+        return with_compression_suffix(f"{input_file.stem}.md", self.compression).name
 
     def convert_single_file(self, input_path: str, output_path: str, force: bool = False) -> bool:
         """
@@ -329,27 +1374,172 @@ class ExcelToMarkdownConverter:
 
         Args:
             input_path: 输入文件路径
-            output_path: 输出文件路径
+            output_path: 输出文件路径（启用压缩时自动加上 .gz / .zst）
             force: 是否强制重新转换
 
         Returns:
             是否成功
         """
-        try:
-            input_file = Path(input_path)
-            output_file = Path(output_path)
+        input_file = Path(input_path)
+        output_file = with_compression_suffix(output_path, self.compression)
+        output_path = str(output_file)
 
-            print(f"处理文件: {input_file.name}")
+        print(f"处理文件: {input_file.name}")
 
-            # 幂等检测：检查是否已经转换过
-            if not force and self.check_if_already_converted(input_file, output_file):
+        manifest = ConversionManifest(output_file.parent)
+
+        # 幂等检测：检查是否已经转换过
+        unchanged_hash = None
+        if not force:
+            converted, unchanged_hash = self.conversion_check(input_file, output_file, manifest)
+            if converted:
+                manifest.save()
                 return True
 
-            # 读取Excel文件
-            sheets = self.read_excel_file(input_path)
+        file_hash = self._convert_file(input_path, output_path, unchanged_hash)
+        if file_hash is None:
+            return False
+
+        manifest.record(input_file, output_file, file_hash)
+        manifest.save()
+        return True
+
+    def iter_markdown(self, input_path: str) -> Iterator[str]:
+        """
+        逐段生成Excel文件的Markdown，不写入任何文件
+
+        依次生成文件元信息、每个sheet页的标题、每一页表格和文件摘要，全部片段按顺序拼接后
+        与convert_single_file写出的Markdown一致（不输出数据文件和增量文件，去重、缓存和压缩不生效）。
+        .xlsx/.xlsm/.xls的sheet页在迭代到时才读取和渲染，内存只与当前sheet页有关；
+        提前停止迭代时后面的sheet页不会被解析，调用生成器的close()（或等待其被回收）后释放源文件。
+
+        Args:
+            input_path: 输入文件路径
+
+        Yields:
+            Markdown片段
+
+        Raises:
+            ValueError: 文件中没有数据或所有引擎都无法读取
+        """
+        with self.open_source_file(input_path) as source:
+            file_hash = self.hash_source(source)
+            source.seek(0)
+            sheets_info = {}
+
+            if not (self.supports_streaming(input_path) or self.supports_lazy_loading(input_path)):
+                sheets = self.read_excel_file(input_path, source)
+                if not sheets:
+                    raise ValueError(f"文件 {Path(input_path).name} 中没有数据或读取失败")
+                yield self.render_output_header(input_path, len(sheets), file_hash)
+                for sheet_name, df in sheets.items():
+                    yield from self._iter_sheet_markdown(sheet_name, df, sheets_info)
+                yield self.render_output_summary(input_path, file_hash, sheets_info)
+                return
+
+            if self.supports_lazy_loading(input_path):
+                engine = 'xlrd'
+            else:
+                engine = 'fast' if self.engine == 'fast' else 'openpyxl'
+            try:
+                workbook = self.load_streaming_workbook(source, engine)
+            except UnsupportedXlsxFeature as e:
+                print(f"✗ fast 引擎不支持该文件，回退到openpyxl: {e}")
+                source.seek(0)
+                workbook = self.load_streaming_workbook(source, 'openpyxl')
+            try:
+                sheet_names = self.get_sheet_names(workbook)
+                yield self.render_output_header(input_path, len(sheet_names), file_hash)
+                for sheet_name in sheet_names:
+                    try:
+                        df = self.read_sheet_dataframe(workbook, sheet_name)
+                    except UnsupportedXlsxFeature as e:
+                        print(f"✗ fast 引擎不支持该sheet页，回退到openpyxl: {e}")
+                        workbook.close()
+                        source.seek(0)
+                        workbook = self.load_streaming_workbook(source, 'openpyxl')
+                        df = self.read_sheet_dataframe(workbook, sheet_name)
+                    yield from self._iter_sheet_markdown(sheet_name, df, sheets_info)
+                    del df
+                yield self.render_output_summary(input_path, file_hash, sheets_info)
+            finally:
+                workbook.close()
+
+    def _iter_sheet_markdown(self, sheet_name: str, df: pd.DataFrame, sheets_info: Dict) -> Iterator[str]:
+        """逐页生成一个sheet页的Markdown，并把该sheet页的摘要信息记录到sheets_info"""
+        sheet_info = {
+            "rows": len(df),
+            "columns": len(df.columns),
+            "column_names": df.columns.tolist(),
+            "pruned_rows": df.attrs.get('pruned_rows', 0),
+            "pruned_columns": df.attrs.get('pruned_columns', 0)
+        }
+        if self.column_stats:
+            sheet_info["column_profiles"] = self.profile_dataframe(df)
+        sheets_info[sheet_name] = sheet_info
+
+        yield f"## 📄 Sheet: {sheet_name}\n**行数:** {len(df)}, **列数:** {len(df.columns)}\n\n"
+        for page in self.iter_dataframe_pages(df, sheet_name):
+            yield page + "\n"
+        yield "---\n\n"
+
+    def _convert_file(self, input_path: str, output_path: str,
+                      unchanged_hash: Optional[str] = None) -> Optional[str]:
+        """
+        执行转换（不做幂等检测）
+
+        Args:
+            input_path: 输入文件路径
+            output_path: 输出文件路径
+            unchanged_hash: 上次转换时的源文件哈希（只修改了时间戳的文件），
+                读取源文件算出的哈希与其一致时不解析、保留原输出
+
+        Returns:
+            成功时返回源文件哈希，失败时返回None
+        """
+        try:
+            input_file = Path(input_path)
+            output_file = Path(output_path)
+
+            if self.sheet_jobs > 1 or self.sheet_cache:
+                if self.delta:
+                    print("提示: 增量模式需要在同一遍读取中对比每一行，不使用按sheet页并行处理和缓存")
+                elif self.dedup:
+                    print("提示: 去重模式逐个sheet页查找已渲染的相同内容，不使用按sheet页并行处理和缓存")
+                elif self.supports_streaming(input_path):
+                    return self._convert_file_sections(input_path, output_path, unchanged_hash)
+                else:
+                    print(f"提示: {input_file.suffix} 文件不支持按sheet页并行处理和缓存，使用常规模式")
+
+            # 去重需要在解析前按sheet页计算内容指纹，使用流式模式逐个sheet页处理
+            if self.dedup and self.supports_streaming(input_path):
+                if self.delta:
+                    print("提示: 增量模式需要逐行对比，不复用已渲染的sheet页")
+                return self._convert_file_streaming(input_path, output_path, unchanged_hash=unchanged_hash)
+
+            if self.streaming:
+                if self.supports_streaming(input_path):
+                    return self._convert_file_streaming(input_path, output_path, unchanged_hash=unchanged_hash)
+                if not self.supports_lazy_loading(input_path):
+                    print(f"提示: {input_file.suffix} 文件不支持流式读取，使用常规模式")
+
+            # .xls按需加载：逐个sheet页解析、渲染并卸载，内存只与最大的sheet页有关
+            if self.supports_lazy_loading(input_path):
+                try:
+                    return self._convert_file_streaming(input_path, output_path, engine='xlrd',
+                                                        unchanged_hash=unchanged_hash)
+                except Exception as e:
+                    print(f"✗ xlrd 按需加载失败，使用常规模式: {e}")
+
+            # 读取Excel文件，哈希与解析共用同一个打开的源文件
+            with self.open_source_file(input_path) as source:
+                file_hash = self.hash_source(source)
+                if self.source_unchanged(input_path, file_hash, unchanged_hash):
+                    return file_hash
+                sheets = self.read_excel_file(input_path, source)
             if not sheets:
                 print(f"文件 {input_file.name} 中没有数据或读取失败")
-                return False
+                return None
 
             # 生成Markdown内容
             markdown_content = []
@@ -359,7 +1549,6 @@ class ExcelToMarkdownConverter:
             markdown_content.append(f"**Sheet页数量:** {len(sheets)}")
 
             # 添加文件哈希（用于幂等检测）
-            file_hash = self.calculate_file_hash(input_path)
             if file_hash:
                 markdown_content.append(f"**文件哈希:** `{file_hash}`")
 
@@ -368,7 +1557,20 @@ class ExcelToMarkdownConverter:
             markdown_content.append("")
 
             # 处理每个sheet页
+            sheets_info = {}
+            data_names = self.data_file_names(sheets)
             for sheet_name, df in tqdm(sheets.items(), desc="处理Sheet页"):
+                sheet_info = {
+                    "rows": len(df),
+                    "columns": len(df.columns.tolist()),
+                    "column_names": df.columns.tolist(),
+                    "pruned_rows": df.attrs.get('pruned_rows', 0),
+                    "pruned_columns": df.attrs.get('pruned_columns', 0)
+                }
+                if self.column_stats:
+                    sheet_info["column_profiles"] = self.profile_dataframe(df)
+                sheets_info[sheet_name] = self._add_data_files(sheet_info, output_path, data_names[sheet_name])
+
                 markdown_content.append(f"## 📄 Sheet: {sheet_name}")
                 markdown_content.append(f"**行数:** {len(df)}, **列数:** {len(df.columns)}")
                 markdown_content.append("")
@@ -389,33 +1591,685 @@ class ExcelToMarkdownConverter:
                 "file_hash": file_hash,
                 "total_sheets": len(sheets),
                 "conversion_time": pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S'),
-                "sheets_info": {
-                    sheet_name: {
-                        "rows": len(df),
-                        "columns": len(df.columns.tolist()),
-                        "column_names": df.columns.tolist()
-                    }
-                    for sheet_name, df in sheets.items()
-                }
+                "sheets_info": sheets_info
             }
+            if self.selection.describe() is not None:
+                summary["selection"] = self.selection.describe()
             markdown_content.append(json.dumps(summary, indent=2, ensure_ascii=False))
             markdown_content.append("```")
 
-            # 写入输出文件
-            output_file.parent.mkdir(parents=True, exist_ok=True)
-            with open(output_file, 'w', encoding='utf-8') as f:
+            # 写入输出文件、数据文件和增量文件
+            with self.open_delta(input_path, output_path, file_hash) as delta, \
+                    self.open_data_dir(output_path) as data_dir, self.open_output_file(output_path) as f:
+                if delta is not None:
+                    for sheet_name, df in sheets.items():
+                        self.record_dataframe_delta(delta, sheet_name, df)
+                if data_dir is not None:
+                    for sheet_name, df in sheets.items():
+                        self.write_sheet_data(
+                            str(data_dir / data_names[sheet_name]), df.columns.tolist(),
+                            self.iter_dataframe_rows(df)
+                        )
                 f.write("\n".join(markdown_content))
 
             print(f"✓ 转换完成: {output_file}")
-            return True
+            return file_hash
 
         except Exception as e:
             print(f"转换文件 {input_path} 时出错: {e}")
             import traceback
             traceback.print_exc()
-            return False
+            return None
+
+    def _convert_file_streaming(self, input_path: str, output_path: str,
+                                engine: Optional[str] = None, unchanged_hash: Optional[str] = None) -> str:
+        """
+        流式转换单个Excel文件：按chunk_size分批读取行并直接写入磁盘
+
+        每个sheet页的表格行先写入临时文件，统计出行数和列数后再分页拷贝到输出文件，
+        峰值内存只与chunk_size有关，与sheet页行数无关。输出格式与常规模式一致。
+
+        Args:
+            input_path: 输入文件路径
+            output_path: 输出文件路径
+            engine: 读取引擎（fast/openpyxl/xlrd），默认根据self.engine选择；fast不支持时自动回退
+            unchanged_hash: 见_convert_file
+
+        Returns:
+            源文件哈希
+        """
+        input_file = Path(input_path)
+        output_file = Path(output_path)
+
+        engine = engine or ('fast' if self.engine == 'fast' else 'openpyxl')
+        print(f"使用流式模式读取 {input_file.name} (每批 {self.chunk_size} 行, {engine} 引擎)...")
+
+        with self.open_source_file(input_path) as source:
+            file_hash = self.hash_source(source)
+            if self.source_unchanged(input_path, file_hash, unchanged_hash):
+                return file_hash
+            try:
+                self._stream_workbook(input_path, output_path, source, engine, file_hash)
+            except UnsupportedXlsxFeature as e:
+                if engine != 'fast':
+                    raise
+                print(f"✗ fast 引擎不支持该文件，回退到openpyxl: {e}")
+                self._stream_workbook(input_path, output_path, source, 'openpyxl', file_hash)
+
+        print(f"✓ 转换完成: {output_file}")
+        return file_hash
+
+    def _stream_workbook(self, input_path: str, output_path: str, source, engine: str,
+                         file_hash: str):
+        """用指定引擎从已打开的源文件流式读取工作簿并写入输出文件"""
+        fingerprints = self.sheet_content_fingerprints(source) if self.dedup and not self.delta else {}
+        source.seek(0)
+        workbook = self.load_streaming_workbook(source, engine)
+        try:
+            self._write_streaming_output(input_path, output_path, workbook, file_hash, fingerprints)
+        finally:
+            workbook.close()
+
+    @contextmanager
+    def open_output_file(self, output_path: str):
+        """先写入临时文件，完成后再替换输出文件，转换失败时不会留下不完整的输出"""
+        output_file = Path(output_path)
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        temp_output = output_file.with_name(output_file.name + '.tmp')
+
+        try:
+            with open_markdown_writer(temp_output, output_file) as out:
+                yield out
+            os.replace(temp_output, output_file)
+        finally:
+            if temp_output.exists():
+                temp_output.unlink()
+
+    def write_output_header(self, out, input_path: str, sheet_count: int, file_hash: str):
+        """写入文件元信息，格式与常规模式一致"""
+        out.write(self.render_output_header(input_path, sheet_count, file_hash))
+
+    def render_output_header(self, input_path: str, sheet_count: int, file_hash: str) -> str:
+        """生成文件元信息（以换行结尾）"""
+        header_lines = [
+            f"# Excel文件转换结果: {Path(input_path).name}",
+            f"**源文件:** `{input_path}`",
+            f"**转换时间:** {pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')}",
+            f"**Sheet页数量:** {sheet_count}",
+        ]
+        if file_hash:
+            header_lines.append(f"**文件哈希:** `{file_hash}`")
+        header_lines.extend(["", "---", ""])
+        return "\n".join(header_lines) + "\n"
+
+    def write_sheet_section(self, out, workbook, sheet_name: str, data_base: Optional[str] = None,
+                            delta: Optional[DeltaRecorder] = None, rows_file=None) -> Dict:
+        """
+        流式渲染一个sheet页并写入输出
+
+        Args:
+            out: 输出文件对象
+            workbook: load_streaming_workbook返回的工作簿
+            sheet_name: sheet页名称
+            data_base: 数据文件路径（不含扩展名），为空时不输出数据文件
+            delta: 可选的增量记录器
+            rows_file: 可选的文本文件，同时写入补齐列数后的表格行（不含分页标题），用于去重存储
+
+        Returns:
+            文件摘要中该sheet页的信息
+        """
+        data_spool = tempfile.TemporaryFile('w+', encoding='utf-8', newline='\n') \
+            if data_base is not None else None
+        profiler = ColumnProfiler() if self.column_stats else None
+        if delta is not None:
+            delta.begin_sheet(sheet_name, self.selection.first_row)
+        with tempfile.TemporaryFile('w+', encoding='utf-8', newline='\n') as spool:
+            stats = {}
+            sheet_info = self.spool_sheet_rows(
+                self.sheet_rows(workbook, sheet_name, stats), spool, stats, data_spool, profiler, delta
+            )
+            if delta is not None:
+                delta.end_sheet(sheet_info['headers'])
+            print(f"  ✓ 读取sheet页: {sheet_name} ({sheet_info['rows']}行×{sheet_info['columns']}列)"
+                  f"{self._format_pruned(sheet_info)}")
+
+            row_lines = self._iter_spooled_rows(spool, sheet_info)
+            if rows_file is not None:
+                row_lines = _tee_lines(row_lines, rows_file)
+            self._write_sheet_block(out, sheet_name, sheet_info['headers'], sheet_info['rows'],
+                                    sheet_info['columns'], row_lines, self._spooled_row_costs(sheet_info))
+
+        if data_spool is not None:
+            with data_spool:
+                self.write_sheet_data(
+                    data_base, sheet_info['headers'],
+                    self._iter_spooled_data(data_spool, sheet_info['columns'])
+                )
+
+        result = {
+            "rows": sheet_info['rows'],
+            "columns": sheet_info['columns'],
+            "column_names": sheet_info['headers'],
+            "pruned_rows": sheet_info['pruned_rows'],
+            "pruned_columns": sheet_info['pruned_columns']
+        }
+        if profiler is not None:
+            result["column_profiles"] = profiler.profiles(sheet_info['headers'])
+        return result
+
+    def _write_sheet_block(self, out, sheet_name: str, headers: List, total_rows: int,
+                           total_columns: int, row_lines: Iterator[str],
+                           row_costs: Optional[np.ndarray] = None):
+        """写入一个sheet页的标题、行列数和分页表格"""
+        out.write(f"## 📄 Sheet: {sheet_name}\n")
+        out.write(f"**行数:** {total_rows}, **列数:** {total_columns}\n\n")
+        self.write_paged_table(out, sheet_name, headers, row_lines, total_rows, row_costs)
+        out.write("---\n\n")
+
+    def write_deduplicated_section(self, out, workbook, sheet_name: str, data_base: Optional[str],
+                                   store: SheetStore, fingerprint: str) -> Dict:
+        """
+        写入一个sheet页：去重存储中已有相同内容时直接按行拷贝，不解析和渲染；
+        否则流式渲染，同时把表格行、数据文件和摘要信息存入去重存储
+
+        Args:
+            out: 输出文件对象
+            workbook: load_streaming_workbook返回的工作簿
+            sheet_name: sheet页名称
+            data_base: 数据文件路径（不含扩展名），为空时不输出数据文件
+            store: 去重存储
+            fingerprint: sheet页内容指纹
+
+        Returns:
+            文件摘要中该sheet页的信息
+        """
+        self.dedup_stats['sheets'] += 1
+        sheet_info = store.get(fingerprint)
+        if sheet_info is not None:
+            print(f"  ✓ sheet页 {sheet_name} 与已渲染的内容相同，直接复用 "
+                  f"({sheet_info['rows']}行×{sheet_info['columns']}列)")
+            row_costs = None
+            if self.paged_by_budget():
+                # 先分批读一遍表格行计算各行大小，不把整个sheet页读入内存
+                rows = store.iter_rows(fingerprint)
+                batches = iter(lambda: list(itertools.islice(rows, self.chunk_size)), [])
+                row_costs = np.concatenate([self.line_costs(batch) for batch in batches] or [np.zeros(0)])
+            self._write_sheet_block(out, sheet_name, sheet_info['column_names'], sheet_info['rows'],
+                                    sheet_info['columns'], store.iter_rows(fingerprint), row_costs)
+            self.dedup_stats['reused'] += 1
+            self.dedup_stats['reused_rows'] += sheet_info['rows']
+            self.dedup_stats['reused_bytes'] += store.rows_size(fingerprint)
+        else:
+            temp_base = store.temp_base(fingerprint)
+            try:
+                with open(temp_base + '.md', 'w', encoding='utf-8', newline='\n') as rows_file:
+                    sheet_info = self.write_sheet_section(
+                        out, workbook, sheet_name, temp_base if data_base else None, rows_file=rows_file
+                    )
+                store.put(fingerprint, sheet_info, temp_base)
+            finally:
+                store.discard(temp_base)
+
+        if data_base is not None:
+            for ext in (DATA_FORMATS[fmt] for fmt in self.data_formats):
+                shutil.copyfile(store.data_base(fingerprint) + ext, data_base + ext)
+        return sheet_info
+
+    def write_output_summary(self, out, input_path: str, file_hash: str, sheets_info: Dict):
+        """写入JSON格式的文件摘要"""
+        out.write(self.render_output_summary(input_path, file_hash, sheets_info))
+
+    def render_output_summary(self, input_path: str, file_hash: str, sheets_info: Dict) -> str:
+        """生成JSON格式的文件摘要（位于输出末尾，不以换行结尾）"""
+        summary = {
+            "file_name": Path(input_path).name,
+            "file_hash": file_hash,
+            "total_sheets": len(sheets_info),
+            "conversion_time": pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S'),
+            "sheets_info": sheets_info
+        }
+        if self.selection.describe() is not None:
+            summary["selection"] = self.selection.describe()
+        return ("## 📊 文件摘要\n```json\n"
+                + json.dumps(summary, indent=2, ensure_ascii=False, default=str) + "\n```")
+
+    def _write_streaming_output(self, input_path: str, output_path: str, workbook, file_hash: str,
+                                fingerprints: Optional[Dict[str, Optional[str]]] = None):
+        """
+        逐个sheet页流式写入Markdown
+
+        fingerprints为各sheet页的内容指纹（见sheet_content_fingerprints），不为空时
+        相同内容的sheet页从输出目录的去重存储中复用渲染结果。
+        """
+        sheet_names = self.get_sheet_names(workbook)
+        sheets_info = {}
+        store = SheetStore(Path(output_path).parent, self.data_formats, self.column_stats,
+                           self.selection.signature()) if fingerprints else None
+
+        with self.open_delta(input_path, output_path, file_hash) as delta, \
+                self.open_data_dir(output_path) as data_dir, self.open_output_file(output_path) as out:
+            data_names = self.data_file_names(sheet_names)
+            self.write_output_header(out, input_path, len(sheet_names), file_hash)
+            for sheet_name in tqdm(sheet_names, desc="处理Sheet页"):
+                data_base = str(data_dir / data_names[sheet_name]) if data_dir else None
+                fingerprint = fingerprints.get(sheet_name) if store is not None else None
+                if fingerprint is not None:
+                    sheet_info = self.write_deduplicated_section(out, workbook, sheet_name, data_base,
+                                                                 store, fingerprint)
+                else:
+                    sheet_info = self.write_sheet_section(out, workbook, sheet_name, data_base, delta)
+                sheets_info[sheet_name] = self._add_data_files(sheet_info, output_path, data_names[sheet_name])
+            self.write_output_summary(out, input_path, file_hash, sheets_info)
+
+    @contextmanager
+    def open_data_dir(self, output_path: str):
+        """
+        数据文件目录 <输出文件名>_data/：先写入临时目录，完成后整体替换
+
+        已删除的sheet页不会在目录中留下旧的数据文件。未指定data_formats时返回None。
+        """
+        if not self.data_formats:
+            yield None
+            return
+
+        output_file = Path(output_path)
+        data_dir = output_file.with_name(f"{markdown_stem(output_file)}_data")
+        temp_dir = data_dir.with_name(data_dir.name + '.tmp')
+        if temp_dir.exists():
+            shutil.rmtree(temp_dir)
+        temp_dir.mkdir(parents=True)
+
+        try:
+            yield temp_dir
+            if data_dir.exists():
+                shutil.rmtree(data_dir)
+            os.replace(temp_dir, data_dir)
+        finally:
+            if temp_dir.exists():
+                shutil.rmtree(temp_dir)
+
+    @contextmanager
+    def open_delta(self, input_path: str, output_path: str, file_hash: str):
+        """
+        增量记录器：转换成功后写出 <输出文件名>.delta.md / .delta.jsonl 并更新行指纹索引
+
+        行指纹索引保存在输出目录的 .xlsx2md_rows/ 中；转换失败时增量文件和索引保持不变。
+        未启用delta时返回None。
+        """
+        if not self.delta:
+            yield None
+            return
+
+        source_key = ConversionManifest.source_key(Path(input_path))
+        index_path = Path(output_path).parent / RowIndex.DIR_NAME / \
+            f"{hashlib.md5(source_key.encode('utf-8')).hexdigest()}.npz"
+        recorder = DeltaRecorder(output_path, RowIndex(str(index_path)), self.delta_key,
+                                 self.render_table_header, self.render_table_rows, self.chunk_size)
+        try:
+            yield recorder
+            recorder.finish(input_path, file_hash)
+            totals = {operation: sum(counts[operation] for counts in recorder.summary.values())
+                      for operation in ('added', 'changed', 'removed')}
+            print(f"✓ 增量已写入: {recorder.markdown_path} (新增 {totals['added']} 行, "
+                  f"修改 {totals['changed']} 行, 删除 {totals['removed']} 行)")
+        finally:
+            recorder.close()
+
+    def data_file_names(self, sheet_names: Iterable[str]) -> Dict[str, str]:
+        """为每个sheet页生成数据文件名（不含扩展名）：替换文件名中不允许的字符并避免重名"""
+        names = {}
+        used = set()
+        for index, sheet_name in enumerate(sheet_names):
+            name = re.sub(r'[<>:"/\\|?*\x00-\x1f]', '_', str(sheet_name)).strip(' .') or f"sheet{index + 1}"
+            if name.lower() in used:
+                name = f"{name}_{index + 1}"
+            used.add(name.lower())
+            names[sheet_name] = name
+        return names
+
+    def _add_data_files(self, sheet_info: Dict, output_path: str, data_name: str) -> Dict:
+        """在sheet页摘要信息中加入数据文件的相对路径（相对于Markdown输出文件所在目录）"""
+        if not self.data_formats:
+            return sheet_info
+        data_dir_name = f"{markdown_stem(output_path)}_data"
+        return dict(sheet_info, data_files={
+            fmt: f"{data_dir_name}/{data_name}{DATA_FORMATS[fmt]}" for fmt in self.data_formats
+        })
+
+    def write_sheet_data(self, base_path: str, column_names: List,
+                         rows: Iterable[List[str]]) -> Dict[str, str]:
+        """
+        按chunk_size分批把sheet页数据写入data_formats指定的各格式文件
+
+        Args:
+            base_path: 数据文件路径（不含扩展名）
+            column_names: 列名列表
+            rows: 数据行迭代器，每行长度与列名数量相同
+
+        Returns:
+            {格式: 文件路径}
+        """
+        writer = SheetDataWriter(base_path, self.data_formats, column_names)
+        try:
+            rows = iter(rows)
+            while True:
+                batch = list(itertools.islice(rows, self.chunk_size))
+                if not batch:
+                    break
+                writer.write_rows(batch)
+        except Exception:
+            writer.abort()
+            raise
+        return writer.close()
+
+    def list_sheet_keys(self, source) -> List[Tuple[str, Optional[str]]]:
+        """
+        只解析工作簿目录，获取sheet页名称及内容指纹
+
+        指纹由fast解析器扫描工作表XML及其引用的共享字符串计算（见FastXlsxReader.sheet_fingerprint），
+        修改一个sheet页的文字不会使其他sheet页的缓存失效；fast解析器不支持该文件时使用
+        openpyxl只读模式获取名称，指纹为None（不使用sheet页缓存）。
+        """
+        try:
+            source.seek(0)
+            with FastXlsxReader(source) as reader:
+                return [(name, reader.sheet_fingerprint(name)) for name in self.get_sheet_names(reader)]
+        except UnsupportedXlsxFeature:
+            source.seek(0)
+            workbook = self.load_streaming_workbook(source, 'openpyxl')
+
+        try:
+            return [(name, None) for name in self.get_sheet_names(workbook)]
+        finally:
+            workbook.close()
+
+    def sheet_content_fingerprints(self, source) -> Dict[str, Optional[str]]:
+        """
+        计算各sheet页与sheet名和所在工作簿无关的内容指纹，用于跨工作簿去重
+
+        只扫描工作表XML和用到的共享字符串，不做解析；fast解析器不支持该文件时返回空字典
+        （不去重）。
+        """
+        try:
+            source.seek(0)
+            with FastXlsxReader(source) as reader:
+                return {name: reader.sheet_content_fingerprint(name) for name in self.get_sheet_names(reader)}
+        except UnsupportedXlsxFeature:
+            return {}
+
+    def _convert_file_sections(self, input_path: str, output_path: str,
+                               unchanged_hash: Optional[str] = None) -> str:
+        """
+        按sheet页分段转换：各sheet页单独渲染为分段文件，再按原顺序拼接为一个输出文件
+
+        - sheet_jobs > 1 时，需要渲染的sheet页由进程池并行处理，每个工作进程独立打开
+          工作簿，只解析分配给它的sheet页
+        - 启用sheet_cache时，分段文件保存在输出目录的缓存中，指纹未变化的sheet页
+          不再解析和渲染，直接拷贝缓存的分段
+
+        主进程按sheet页顺序等待结果并拷贝到输出文件，内存占用与单个sheet页的流式转换相同。
+        输出内容与常规模式一致。
 
-    def convert_directory(self, input_dir: str, output_dir: str, force: bool = False) -> Dict[str, bool]:
+        Args:
+            input_path: 输入文件路径（.xlsx/.xlsm）
+            output_path: 输出文件路径
+            unchanged_hash: 见_convert_file
+
+        Returns:
+            源文件哈希
+        """
+        output_file = Path(output_path)
+        engine = 'fast' if self.engine == 'fast' else 'openpyxl'
+
+        with self.open_source_file(input_path) as source:
+            file_hash = self.hash_source(source)
+            if self.source_unchanged(input_path, file_hash, unchanged_hash):
+                return file_hash
+            sheet_keys = self.list_sheet_keys(source)
+
+        if not self.sheet_cache and min(self.sheet_jobs, len(sheet_keys)) < 2:
+            return self._convert_file_streaming(input_path, output_path)
+
+        cache = SheetCache(output_file.parent, Path(input_path), self.paging_signature(),
+                           self.data_formats, self.column_stats,
+                           self.selection.signature()) if self.sheet_cache else None
+        sheets_info = {}
+
+        with tempfile.TemporaryDirectory() as section_dir:
+            # (sheet名, 分段文件路径, 缓存的摘要信息, 指纹)
+            sections = []
+            for index, (sheet_name, fingerprint) in enumerate(sheet_keys):
+                if cache is not None and fingerprint is not None:
+                    sections.append((sheet_name, cache.section_path(fingerprint),
+                                     cache.get(fingerprint), fingerprint))
+                else:
+                    sections.append((sheet_name, os.path.join(section_dir, f"{index}.md"), None, None))
+
+            pending = [(name, path) for name, path, info, _ in sections if info is None]
+            if cache is not None:
+                print(f"{len(sections) - len(pending)} 个sheet页未变化，使用缓存；"
+                      f"{len(pending)} 个sheet页需要重新渲染")
+
+            jobs = min(self.sheet_jobs, len(pending))
+            executor = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
+            workbook = None
+            try:
+                if executor is not None:
+                    print(f"使用 {jobs} 个进程并行处理 {len(pending)} 个sheet页 ({engine} 引擎)...")
+                    futures = {
+                        sheet_name: executor.submit(
+                            self._render_sheet_section, input_path, sheet_name, section_path, engine
+                        )
+                        for sheet_name, section_path in pending
+                    }
+                else:
+                    futures = {}
+                    if pending:
+                        try:
+                            workbook = self.load_streaming_workbook(input_path, engine)
+                        except UnsupportedXlsxFeature as e:
+                            print(f"✗ fast 引擎不支持该文件，回退到openpyxl: {e}")
+                            engine = 'openpyxl'
+                            workbook = self.load_streaming_workbook(input_path, engine)
+
+                with self.open_data_dir(output_path) as data_dir, \
+                        self.open_output_file(output_path) as out:
+                    data_names = self.data_file_names(sheet_name for sheet_name, _ in sheet_keys)
+                    self.write_output_header(out, input_path, len(sections), file_hash)
+                    for sheet_name, section_path, sheet_info, fingerprint in tqdm(sections,
+                                                                                  desc="处理Sheet页"):
+                        if sheet_info is None:
+                            sheet_info = self._wait_sheet_section(
+                                futures.get(sheet_name), input_path, sheet_name, section_path,
+                                engine, workbook
+                            )
+                            if fingerprint is not None:
+                                cache.put(fingerprint, sheet_info)
+
+                        with open(section_path, 'r', encoding='utf-8', newline='') as section:
+                            shutil.copyfileobj(section, out)
+                        if fingerprint is None:
+                            os.remove(section_path)
+
+                        # 数据文件与分段文件同名，缓存中的拷贝到数据目录，临时的直接移动
+                        for ext in (DATA_FORMATS[fmt] for fmt in self.data_formats):
+                            data_path = section_path[:-len('.md')] + ext
+                            target = data_dir / (data_names[sheet_name] + ext)
+                            if fingerprint is None:
+                                os.replace(data_path, target)
+                            else:
+                                shutil.copyfile(data_path, target)
+                        sheets_info[sheet_name] = self._add_data_files(
+                            sheet_info, output_path, data_names[sheet_name]
+                        )
+
+                    self.write_output_summary(out, input_path, file_hash, sheets_info)
+            finally:
+                if workbook is not None:
+                    workbook.close()
+                if executor is not None:
+                    executor.shutdown()
+
+        if cache is not None:
+            cache.prune(fingerprint for _, fingerprint in sheet_keys)
+
+        print(f"✓ 转换完成: {output_file}")
+        return file_hash
+
+    def _wait_sheet_section(self, future, input_path: str, sheet_name: str, section_path: str,
+                            engine: str, workbook=None) -> Dict:
+        """等待工作进程渲染完一个sheet页（没有future时在当前进程中渲染），fast不支持时回退到openpyxl"""
+        try:
+            if future is not None:
+                return future.result()
+            return self._render_sheet_section(input_path, sheet_name, section_path, engine, workbook)
+        except UnsupportedXlsxFeature as e:
+            if engine != 'fast':
+                raise
+            print(f"✗ fast 引擎不支持sheet页 {sheet_name}，回退到openpyxl: {e}")
+            return self._render_sheet_section(input_path, sheet_name, section_path, 'openpyxl')
+
+    def _render_sheet_section(self, input_path: str, sheet_name: str, section_path: str,
+                              engine: str, workbook=None) -> Dict:
+        """
+        读取并渲染单个sheet页，写入分段文件，返回该sheet页的摘要信息
+
+        在工作进程中调用时独立打开工作簿；在当前进程中依次渲染时复用已打开的workbook。
+        """
+        own_workbook = workbook is None
+        if own_workbook:
+            workbook = self.load_streaming_workbook(input_path, engine)
+
+        temp_path = section_path + '.tmp'
+        data_base = section_path[:-len('.md')] if self.data_formats else None
+        try:
+            with open(temp_path, 'w', encoding='utf-8', newline='\n') as out:
+                sheet_info = self.write_sheet_section(out, workbook, sheet_name, data_base)
+            os.replace(temp_path, section_path)
+            return sheet_info
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            if own_workbook:
+                workbook.close()
+
+    def preview_file(self, input_path: str, rows: int = 10) -> str:
+        """
+        快速预览工作簿，用于在完整转换前了解文件内容
+
+        只读取sheet列表、每个sheet页记录的使用范围和前rows行数据，
+        不计算文件哈希，不解析完整的sheet页（.xlsx的共享字符串表也只解析到用到的位置）。
+
+        Args:
+            input_path: 输入文件路径
+            rows: 每个sheet页预览的数据行数（不含表头）
+
+        Returns:
+            Markdown格式的预览摘要
+        """
+        input_file = Path(input_path)
+        rows = max(0, rows)
+
+        if self.supports_streaming(input_path):
+            engines = ['openpyxl', 'fast'] if self.engine == 'openpyxl' else ['fast', 'openpyxl']
+        elif self.supports_lazy_loading(input_path):
+            engines = ['xlrd']
+        else:
+            engines = []
+
+        for engine in engines:
+            try:
+                workbook = self.load_streaming_workbook(input_path, engine)
+            except Exception as e:
+                print(f"✗ 使用 {engine} 引擎预览失败: {e}", file=sys.stderr)
+                continue
+            try:
+                sheets = [(sheet_name, *self._preview_sheet(workbook, sheet_name, rows))
+                          for sheet_name in self.get_sheet_names(workbook)]
+            except UnsupportedXlsxFeature as e:
+                print(f"✗ fast 引擎不支持该文件，回退到openpyxl: {e}", file=sys.stderr)
+                continue
+            finally:
+                workbook.close()
+            return self._render_preview(input_file, engine, sheets)
+
+        # 其他格式（如.xlsb）交给pandas，只读取前rows行
+        excel_file = pd.ExcelFile(input_path)
+        sheets = []
+        for sheet_name in self.selection.select_sheets(excel_file.sheet_names):
+            nrows = rows if self.selection.row_range is None else None
+            df = pd.read_excel(excel_file, sheet_name=sheet_name, dtype=str, na_filter=False, nrows=nrows)
+            df = self.select_dataframe(df).head(rows)
+            sheets.append((sheet_name, None, None, df))
+        return self._render_preview(input_file, excel_file.engine, sheets)
+
+    def _preview_sheet(self, workbook, sheet_name: str, rows: int) -> Tuple[Optional[str], Optional[int], pd.DataFrame]:
+        """
+        读取一个sheet页的使用范围和前rows行
+
+        Returns:
+            (使用范围, 工作表XML字节数, 前rows行的DataFrame)
+        """
+        part_size = None
+        if isinstance(workbook, FastXlsxReader):
+            dimension = workbook.sheet_dimension(sheet_name)
+            part_size = workbook.sheet_part_size(sheet_name)
+        elif isinstance(workbook, LazyXlsReader):
+            sheet = workbook.book.sheet_by_name(sheet_name)
+            dimension = f"A1:{get_column_letter(sheet.ncols)}{sheet.nrows}" \
+                if sheet.nrows and sheet.ncols else None
+        else:
+            try:
+                dimension = workbook[sheet_name].calculate_dimension()
+            except ValueError:
+                dimension = None
+
+        # 读到表头和前rows行即停止，关闭迭代器以释放sheet页（xlrd在此时卸载）
+        sheet_rows = self.sheet_rows(workbook, sheet_name)
+        try:
+            df = self.rows_to_dataframe(sheet_rows, limit=rows)
+        finally:
+            if hasattr(sheet_rows, 'close'):
+                sheet_rows.close()
+        return dimension, part_size, df
+
+    def _render_preview(self, input_file: Path, engine: str, sheets: List[Tuple]) -> str:
+        """生成预览摘要的Markdown"""
+        lines = [
+            f"# Excel文件预览: {input_file.name}",
+            f"**源文件:** `{input_file}`",
+            f"**文件大小:** {_format_size(input_file.stat().st_size)}",
+            f"**Sheet页数量:** {len(sheets)}",
+            f"**读取引擎:** {engine}",
+            "",
+            "---",
+            "",
+        ]
+        for sheet_name, dimension, part_size, df in sheets:
+            lines.append(f"## 📄 Sheet: {sheet_name}")
+            if dimension:
+                try:
+                    min_col, min_row, max_col, max_row = range_boundaries(dimension)
+                    lines.append(f"**使用范围:** {dimension} ({max_row}行×{max_col}列)")
+                except (TypeError, ValueError):
+                    lines.append(f"**使用范围:** {dimension}")
+            else:
+                lines.append("**使用范围:** 未记录")
+            if part_size is not None:
+                lines.append(f"**工作表XML大小:** {_format_size(part_size)}")
+            lines.append("")
+            if len(df.columns) == 0:
+                lines.append("*(空表格)*")
+            else:
+                lines.append(f"**前 {len(df)} 行:**")
+                lines.append("")
+                lines.extend(self.render_table_header(df.columns.tolist()))
+                lines.extend(self.render_table_rows(df))
+            lines.extend(["", "---", ""])
+        return "\n".join(lines)
+
+    def convert_directory(self, input_dir: str, output_dir: str, force: bool = False,
+                          jobs: int = 1) -> Dict[str, bool]:
         """
         转换目录下的所有Excel文件 - 增加幂等检测
 
@@ -423,6 +2277,7 @@ class ExcelToMarkdownConverter:
             input_dir: 输入目录
             output_dir: 输出目录
             force: 是否强制重新转换所有文件
+            jobs: 并行转换的进程数，1为顺序转换，0表示使用全部CPU核数
 
         Returns:
             转换结果字典 {文件名: 是否成功}
@@ -434,26 +2289,120 @@ class ExcelToMarkdownConverter:
         output_path.mkdir(parents=True, exist_ok=True)
 
         # 查找所有Excel文件
-        excel_extensions = ['.xlsx', '.xls', '.xlsm', '.xlsb']
         excel_files = []
-        for ext in excel_extensions:
+        for ext in self.EXCEL_EXTENSIONS:
             excel_files.extend(Path(input_dir).glob(f"*{ext}"))
 
         if not excel_files:
             print(f"在目录 {input_dir} 中没有找到Excel文件")
-            print(f"支持的扩展名: {', '.join(excel_extensions)}")
+            print(f"支持的扩展名: {', '.join(self.EXCEL_EXTENSIONS)}")
             return results
 
         print(f"找到 {len(excel_files)} 个Excel文件")
+        self.reset_dedup_stats()
+
+        # 幂等检测在主进程中统一完成，所有文件共用同一个转换清单；
+        # 输入目录只解析一次、输出目录只列一次，未变化的文件只需对源文件做一次stat
+        manifest = ConversionManifest(output_path)
+        input_root = str(Path(input_dir).resolve())
+        existing_outputs = set(os.listdir(output_path))
+        pending_files = []
+        # 只修改了时间戳的文件: 源文件 -> 上次转换时的哈希（转换时比较）
+        unchanged_hashes = {}
+        for excel_file in excel_files:
+            output_file = output_path / self.output_name(excel_file)
+            key = ConversionManifest.source_key(excel_file, input_root)
+            converted, unchanged_hash = (False, None) if force else self.conversion_check(
+                excel_file, output_file, manifest, existing_outputs, key)
+            results[excel_file.name] = converted
+            if not converted:
+                pending_files.append(excel_file)
+                unchanged_hashes[excel_file] = unchanged_hash
+
+        skipped = len(excel_files) - len(pending_files)
+        if skipped:
+            print(f"跳过 {skipped} 个已转换文件")
 
-        # 处理每个文件
-        for excel_file in tqdm(excel_files, desc="处理文件"):
-            output_file = output_path / f"{excel_file.stem}.md"
-            success = self.convert_single_file(str(excel_file), str(output_file), force)
-            results[excel_file.name] = success
-
+        try:
+            jobs = jobs if jobs > 0 else (os.cpu_count() or 1)
+            jobs = min(jobs, len(pending_files))
+            if jobs > 1:
+                self._convert_files_parallel(pending_files, output_path, manifest, results, jobs,
+                                             unchanged_hashes)
+            else:
+                # 处理每个文件
+                for excel_file in tqdm(pending_files, desc="处理文件"):
+                    output_file = output_path / self.output_name(excel_file)
+                    print(f"处理文件: {excel_file.name}")
+                    file_hash = self._convert_file(str(excel_file), str(output_file),
+                                                   unchanged_hashes[excel_file])
+                    if file_hash is not None:
+                        manifest.record(excel_file, output_file, file_hash)
+                        manifest.autosave()
+                        results[excel_file.name] = True
+        finally:
+            manifest.save()
+
+        if self.dedup:
+            SheetStore(output_path).prune()
         return results
 
+    def _convert_file_counted(self, input_path: str, output_path: str,
+                              unchanged_hash: Optional[str] = None) -> Tuple[Optional[str], Dict[str, int]]:
+        """在工作进程中转换单个文件，同时返回该文件的去重统计（工作进程中的统计不会传回主进程）"""
+        self.reset_dedup_stats()
+        return self._convert_file(input_path, output_path, unchanged_hash), self.dedup_stats
+
+    def reset_dedup_stats(self):
+        """清零去重统计（开始一次目录转换或一次监视触发的转换前调用）"""
+        self.dedup_stats = dict.fromkeys(self.dedup_stats, 0)
+
+    def print_dedup_summary(self):
+        """输出上次清零以来的去重统计"""
+        stats = self.dedup_stats
+        print(f"去重: {stats['sheets']} 个sheet页中 {stats['reused']} 个复用了已渲染的相同内容，"
+              f"节省解析和渲染 {stats['reused_rows']:,} 行 ({_format_size(stats['reused_bytes'])})")
+
+    def _convert_files_parallel(self, excel_files: List[Path], output_path: Path,
+                                manifest: ConversionManifest, results: Dict[str, bool],
+                                jobs: int, unchanged_hashes: Optional[Dict[Path, Optional[str]]] = None):
+        """
+        使用进程池并行转换多个文件，结果写入results并记录到转换清单
+
+        大文件优先提交，减少最后只剩一个大文件在转换的等待时间；
+        结果字典仍按文件查找顺序排列。转换清单只在主进程中读写。
+        unchanged_hashes为只修改了时间戳的文件上次转换时的哈希（见_convert_file）。
+        """
+        unchanged_hashes = unchanged_hashes or {}
+        print(f"使用 {jobs} 个进程并行转换")
+        submit_order = sorted(excel_files, key=lambda f: f.stat().st_size, reverse=True)
+
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = {
+                executor.submit(
+                    self._convert_file_counted,
+                    str(excel_file), str(output_path / self.output_name(excel_file)),
+                    unchanged_hashes.get(excel_file)
+                ): excel_file
+                for excel_file in submit_order
+            }
+            with tqdm(total=len(futures), desc="处理文件") as progress:
+                for future in as_completed(futures):
+                    excel_file = futures[future]
+                    try:
+                        file_hash, dedup_stats = future.result()
+                        for key, value in dedup_stats.items():
+                            self.dedup_stats[key] += value
+                    except Exception as e:
+                        # 工作进程异常退出（如内存不足被杀死）
+                        print(f"转换文件 {excel_file} 时进程异常: {e}")
+                        file_hash = None
+                    if file_hash is not None:
+                        manifest.record(excel_file, output_path / self.output_name(excel_file), file_hash)
+                        manifest.autosave()
+                        results[excel_file.name] = True
+                    progress.update(1)
+
 
 def main():
     """主函数"""
@@ -464,19 +2413,113 @@ def main():
     parser.add_argument('--output_dir', '-od', type=str, default='./markdown_output',
                        help='输出目录路径（默认: ./markdown_output）')
     parser.add_argument('--chunk_size', '-c', type=int, default=1000,
-                       help='分块处理的行数（默认: 1000）')
+                       help='分块处理的行数，流式模式下每批读取的行数（默认: 1000）')
     parser.add_argument('--max_rows', '-m', type=int, default=500,
                        help='每个Markdown页面的最大行数（默认: 500）')
+    parser.add_argument('--page_bytes', '-pb', type=int, metavar='BYTES',
+                       help='按字节预算分页：每页（含标题和表头）尽量不超过该字节数，代替--max_rows的固定行数')
+    parser.add_argument('--page_tokens', '-pt', type=int, metavar='TOKENS',
+                       help='按估算的token数预算分页（ASCII约4字符1个token，中文每字1个token），'
+                            '便于控制每页占用的大模型上下文')
     parser.add_argument('--force', '-f', action='store_true',
                        help='强制重新转换，即使输出文件已存在')
+    parser.add_argument('--stream', '-s', action='store_true',
+                       help='流式模式：按chunk_size分批读取并直接写入磁盘，内存占用与行数无关（仅.xlsx/.xlsm）')
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                       help='目录模式下并行转换的进程数，0表示使用全部CPU核数（默认: 1）')
+    parser.add_argument('--sheet_jobs', '-sj', type=int, default=1,
+                       help='单个文件内并行处理sheet页的进程数，0表示使用全部CPU核数（默认: 1，仅.xlsx/.xlsm）')
+    parser.add_argument('--sheet_cache', '-sc', action='store_true',
+                       help='缓存各sheet页的渲染结果，源文件变化时只重新渲染变化的sheet页（仅.xlsx/.xlsm）')
+    parser.add_argument('--data_format', '-df', action='append', default=[], choices=list(DATA_FORMATS),
+                       help='同时把每个sheet页的数据输出为Parquet/Arrow IPC/JSONL文件，可多次指定'
+                            '（写入 <输出文件名>_data/ 目录，parquet/arrow需要pyarrow）')
+    parser.add_argument('--column_stats', '-cs', action='store_true',
+                       help='在文件摘要中输出每列的统计信息：空值比例、近似去重数（HyperLogLog）、'
+                            '最小/最大长度和推断类型，与转换在同一遍读取中完成')
+    parser.add_argument('--string_storage', '-ss', choices=STRING_STORAGES, default='object',
+                       help='常规模式下表格数据的字符串存储方式：pyarrow为Arrow字符串列（需要pyarrow），'
+                            'category为字典编码（适合重复值多的数据），均可大幅降低内存占用（默认: object）')
+    parser.add_argument('--preview', '-p', type=int, metavar='N',
+                       help='预览模式：只读取sheet列表、使用范围和每个sheet页的前N行，'
+                            '输出简短的Markdown摘要（指定--output时写入文件，否则打印）')
+    parser.add_argument('--delta', '-dl', action='store_true',
+                       help='增量模式：保存每行的指纹索引，同时输出与上次转换相比新增、修改和删除的行'
+                            '（<输出文件名>.delta.md / .delta.jsonl）')
+    parser.add_argument('--delta_key', '-dk', type=str, metavar='COLUMN',
+                       help='增量对比使用的键列名称（默认按行号对比），指定时自动启用 --delta')
+    parser.add_argument('--sheets', '-sh', nargs='+', metavar='SHEET',
+                       help='只转换指定的sheet页，未选中的sheet页不会被解析')
+    parser.add_argument('--exclude_sheets', '-xs', nargs='+', metavar='SHEET',
+                       help='不转换指定的sheet页')
+    parser.add_argument('--columns', '-cl', nargs='+', metavar='COLUMN',
+                       help='只保留指定的列：表头名称或Excel列字母/范围（如 B、D:F），读取时跳过其余列')
+    parser.add_argument('--rows', '-r', type=str, metavar='START:END',
+                       help='只保留Excel行号在该范围内的行（第1行表头始终保留，两端均可省略，如 2:1000、5000:），'
+                            '读到结束行即停止')
+    parser.add_argument('--compress', '-z', choices=list(COMPRESSIONS),
+                       help='通过流式压缩器直接写出压缩的Markdown（.md.gz / .md.zst，zstd需要zstandard），'
+                            '幂等检测同样识别压缩后的输出；输出文件名以 .md.gz / .md.zst 结尾时自动压缩')
+    parser.add_argument('--dedup', '-dd', action='store_true',
+                       help='去重：按内容指纹识别不同工作簿中相同的sheet页（如模板页、对照表），'
+                            '只解析和渲染一次，之后直接拷贝（仅.xlsx/.xlsm，存储在输出目录的 .xlsx2md_store/）')
+    parser.add_argument('--watch', '-w', action='store_true',
+                       help='与--dir一起使用：转换完成后常驻运行，监视目录并转换新增或修改的文件'
+                            '（Linux使用inotify，其他系统退回轮询）')
+    parser.add_argument('--debounce', '-db', type=float, default=2.0, metavar='SECONDS',
+                       help='监视模式下文件停止变化多少秒后才开始转换，避免读取未写完的文件（默认: 2）')
+    parser.add_argument('--poll_interval', '-pi', type=float, default=5.0, metavar='SECONDS',
+                       help='监视模式下不支持inotify时的轮询间隔（默认: 5）')
+    parser.add_argument('--engine', '-e', type=str, choices=ExcelToMarkdownConverter.ENGINES,
+                       help='优先使用的读取引擎；fast为内置的zip+iterparse快速解析器（仅.xlsx/.xlsm），'
+                            '遇到不支持的特性时自动回退到openpyxl/xlrd')
 
     args = parser.parse_args()
 
     # 创建转换器
-    converter = ExcelToMarkdownConverter(
-        chunk_size=args.chunk_size,
-        max_rows_per_page=args.max_rows
-    )
+    try:
+        converter = ExcelToMarkdownConverter(
+            chunk_size=args.chunk_size,
+            max_rows_per_page=args.max_rows,
+            streaming=args.stream,
+            engine=args.engine,
+            sheet_jobs=args.sheet_jobs,
+            sheet_cache=args.sheet_cache,
+            data_formats=args.data_format,
+            column_stats=args.column_stats,
+            string_storage=args.string_storage,
+            delta=args.delta,
+            delta_key=args.delta_key,
+            sheets=args.sheets,
+            exclude_sheets=args.exclude_sheets,
+            columns=args.columns,
+            rows=args.rows,
+            compression=args.compress,
+            dedup=args.dedup,
+            page_bytes=args.page_bytes,
+            page_tokens=args.page_tokens
+        )
+    except (ImportError, ValueError) as e:
+        parser.error(str(e))
+
+    if args.watch and (not args.dir or args.input):
+        parser.error("--watch 需要与 --dir 一起使用")
+
+    # 预览单个文件
+    if args.preview is not None:
+        if not args.input:
+            parser.error("--preview 需要与 --input 一起使用")
+        try:
+            digest = converter.preview_file(args.input, args.preview)
+        except Exception as e:
+            print(f"预览文件 {args.input} 时出错: {e}", file=sys.stderr)
+            sys.exit(1)
+        if args.output:
+            Path(args.output).write_text(digest + "\n", encoding='utf-8')
+            print(f"✓ 预览已写入: {args.output}")
+        else:
+            print(digest)
+        sys.exit(0)
 
     # 处理单个文件
     if args.input:
@@ -486,11 +2529,22 @@ def main():
             args.output = f"{input_path.stem}.md"
 
         success = converter.convert_single_file(args.input, args.output, args.force)
+        if converter.dedup:
+            converter.print_dedup_summary()
         sys.exit(0 if success else 1)
 
+    # 监视目录
+    elif args.dir and args.watch:
+        # 收到SIGTERM（如systemd停止服务）时转换完当前文件后退出
+        stop_event = threading.Event()
+        signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+        watch_directory(converter, args.dir, args.output_dir, args.debounce, args.poll_interval,
+                        args.force, args.jobs, stop_event=stop_event)
+        sys.exit(0)
+
     # 处理目录
     elif args.dir:
-        results = converter.convert_directory(args.dir, args.output_dir, args.force)
+        results = converter.convert_directory(args.dir, args.output_dir, args.force, args.jobs)
 
         # 统计结果
         total = len(results)
@@ -500,6 +2554,8 @@ def main():
         print(f"转换完成!")
         print(f"成功: {successful}/{total}")
         print(f"失败: {total - successful}")
+        if converter.dedup:
+            converter.print_dedup_summary()
 
         if total - successful > 0:
             print("\n失败的文件:")
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+sheet页数据输出模块
+将sheet页的表格数据按批写入 Parquet / Arrow IPC / JSONL 文件，
+下游可以直接加载列式数据（Arrow IPC文件可内存映射零拷贝读取），无需解析Markdown表格。
+
+所有列均为字符串类型，与转换时以 dtype=str 读取的结果一致。
+Parquet 和 Arrow IPC 需要安装 pyarrow，JSONL 只依赖标准库。
+"""
+
+import json
+import os
+from typing import Dict, Iterable, List
+
+# 支持的数据格式及文件扩展名
+DATA_FORMATS = {
+    'parquet': '.parquet',
+    'arrow': '.arrow',
+    'jsonl': '.jsonl',
+}
+
+# 需要pyarrow的格式
+ARROW_FORMATS = ('parquet', 'arrow')
+
+
+def require_pyarrow():
+    """导入pyarrow，未安装时给出安装提示"""
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("写入Parquet/Arrow格式需要安装pyarrow库: pip install pyarrow")
+    return pyarrow
+
+
+class SheetDataWriter:
+    """把一个sheet页的数据按批写入一种或多种格式的文件"""
+
+    def __init__(self, base_path: str, formats: Iterable[str], column_names: List):
+        """
+        打开各格式的输出文件（先写入临时文件，close()时再替换为正式文件）
+
+        Args:
+            base_path: 输出文件路径（不含扩展名）
+            formats: 数据格式列表（parquet/arrow/jsonl）
+            column_names: 列名列表
+        """
+        self.column_names = [str(name) for name in column_names]
+        self.paths = {fmt: base_path + DATA_FORMATS[fmt] for fmt in formats}
+        self._jsonl = None
+        self._arrow_sink = None
+        self._arrow_writer = None
+        self._parquet_writer = None
+
+        try:
+            if 'jsonl' in self.paths:
+                self._jsonl = open(self._temp_path('jsonl'), 'w', encoding='utf-8', newline='\n')
+
+            if any(fmt in self.paths for fmt in ARROW_FORMATS):
+                pa = require_pyarrow()
+                self._schema = pa.schema([pa.field(name, pa.string()) for name in self.column_names])
+                if 'arrow' in self.paths:
+                    self._arrow_sink = pa.OSFile(self._temp_path('arrow'), 'wb')
+                    self._arrow_writer = pa.ipc.new_file(self._arrow_sink, self._schema)
+                if 'parquet' in self.paths:
+                    import pyarrow.parquet as pq
+                    self._parquet_writer = pq.ParquetWriter(self._temp_path('parquet'), self._schema)
+        except Exception:
+            self._close_files()
+            self._remove_temp_files()
+            raise
+
+    def _temp_path(self, fmt: str) -> str:
+        return self.paths[fmt] + '.tmp'
+
+    def write_rows(self, rows: List[List[str]]):
+        """
+        写入一批数据行
+
+        Args:
+            rows: 数据行列表，每行的长度与列名数量相同
+        """
+        if not rows:
+            return
+
+        if self._jsonl is not None:
+            for row in rows:
+                self._jsonl.write(json.dumps(dict(zip(self.column_names, row)), ensure_ascii=False))
+                self._jsonl.write("\n")
+
+        if self._arrow_writer is not None or self._parquet_writer is not None:
+            import pyarrow as pa
+            columns = list(zip(*rows)) if self.column_names else []
+            batch = pa.record_batch(
+                [pa.array(column, type=pa.string()) for column in columns], schema=self._schema
+            )
+            if self._arrow_writer is not None:
+                self._arrow_writer.write_batch(batch)
+            if self._parquet_writer is not None:
+                self._parquet_writer.write_table(pa.Table.from_batches([batch], schema=self._schema))
+
+    def close(self) -> Dict[str, str]:
+        """
+        完成写入，用临时文件替换正式文件
+
+        Returns:
+            {格式: 文件路径}
+        """
+        self._close_files()
+        for fmt, path in self.paths.items():
+            os.replace(self._temp_path(fmt), path)
+        return dict(self.paths)
+
+    def abort(self):
+        """放弃写入，删除临时文件"""
+        self._close_files()
+        self._remove_temp_files()
+
+    def _close_files(self):
+        if self._jsonl is not None:
+            self._jsonl.close()
+            self._jsonl = None
+        if self._arrow_writer is not None:
+            self._arrow_writer.close()
+            self._arrow_writer = None
+        if self._arrow_sink is not None:
+            self._arrow_sink.close()
+            self._arrow_sink = None
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+
+    def _remove_temp_files(self):
+        for fmt in self.paths:
+            if os.path.exists(self._temp_path(fmt)):
+                os.remove(self._temp_path(fmt))
@@ -0,0 +1,600 @@
+#!/usr/bin/env python3
+"""
+XLSX快速读取模块
+直接从zip包中增量解析 xl/sharedStrings.xml 和 xl/worksheets/sheetN.xml，
+不构造openpyxl的工作簿和单元格对象，只提取单元格的值。
+工作表使用expat回调逐块解析，不为每个XML元素创建对象。
+
+单元格值的转换规则（数字、日期、布尔、错误值等）与openpyxl只读模式一致，
+遇到不支持的工作簿特性时抛出 UnsupportedXlsxFeature，由调用方回退到openpyxl。
+"""
+
+import hashlib
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+import xml.parsers.expat as expat
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format, is_timedelta_format
+from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900, from_excel, from_ISO8601
+
+SHEET_MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+WORKSHEET_REL = REL_NS + "/worksheet"
+CHARTSHEET_REL = REL_NS + "/chartsheet"
+SHARED_STRINGS_REL = REL_NS + "/sharedStrings"
+STYLES_REL = REL_NS + "/styles"
+OFFICE_DOCUMENT_REL = REL_NS + "/officeDocument"
+
+TEXT_TAG = f"{{{SHEET_MAIN_NS}}}t"
+RICH_RUN_TAG = f"{{{SHEET_MAIN_NS}}}r"
+SHARED_STRING_TAG = f"{{{SHEET_MAIN_NS}}}si"
+
+# expat（namespace_separator=" "）回调中的元素名
+ROW_NAME = f"{SHEET_MAIN_NS} row"
+C_NAME = f"{SHEET_MAIN_NS} c"
+V_NAME = f"{SHEET_MAIN_NS} v"
+IS_NAME = f"{SHEET_MAIN_NS} is"
+T_NAME = f"{SHEET_MAIN_NS} t"
+RPH_NAME = f"{SHEET_MAIN_NS} rPh"
+DIMENSION_NAME = f"{SHEET_MAIN_NS} dimension"
+SHEET_DATA_NAME = f"{SHEET_MAIN_NS} sheetData"
+
+# 每次从zip中读取并交给解析器的字节数
+READ_BLOCK_SIZE = 1 << 16
+
+# 计算sheet页内容指纹时每次扫描的工作表XML字节数
+SCAN_BLOCK_SIZE = 1 << 22
+
+# 内容指纹的摘要字节数（BLAKE2b，160位）
+FINGERPRINT_DIGEST_SIZE = 20
+
+# 内容指纹扫描：引用共享字符串的单元格、单元格类型为共享字符串的属性、样式编号属性
+# （以字面量开头，正则引擎可以快速跳过无关内容；多匹配的属性只会使指纹更严格）
+SHARED_STRING_CELL = re.compile(rb't=["\']s["\'][^>]*>\s*<(?:\w+:)?v>\s*(\d+)\s*</(?:\w+:)?v>')
+SHARED_STRING_TYPE = re.compile(rb't=["\']s["\']')
+STYLE_ATTRIBUTE = re.compile(rb's=["\'](\d+)["\']')
+
+
+class UnsupportedXlsxFeature(Exception):
+    """快速读取器不支持的工作簿特性，调用方应回退到openpyxl"""
+
+
+class _StopParsing(Exception):
+    """读到需要的元素后提前结束expat解析"""
+
+
+def _text_content(element) -> str:
+    """提取字符串节点的纯文本（直接文本加富文本片段，忽略拼音注释）"""
+    snippets = []
+    plain = element.find(TEXT_TAG)
+    if plain is not None and plain.text is not None:
+        snippets.append(plain.text)
+    for run in element.iterfind(RICH_RUN_TAG):
+        text = run.findtext(TEXT_TAG)
+        if text is not None:
+            snippets.append(text)
+    return "".join(snippets)
+
+
+def _cast_number(value: str):
+    """将数字字符串转换为int或float"""
+    if "." in value or "E" in value or "e" in value:
+        return float(value)
+    return int(value)
+
+
+class FastXlsxReader:
+    """基于zip + iterparse的XLSX快速读取器，只读取单元格值"""
+
+    def __init__(self, file_path: str):
+        """
+        打开工作簿并解析sheet列表、样式中的日期格式
+
+        Args:
+            file_path: .xlsx/.xlsm文件路径
+
+        Raises:
+            UnsupportedXlsxFeature: 文件结构不在快速读取器支持范围内
+        """
+        self.file_path = file_path
+        try:
+            self.archive = zipfile.ZipFile(file_path)
+        except zipfile.BadZipFile as e:
+            raise UnsupportedXlsxFeature(f"不是有效的zip格式XLSX文件: {e}")
+
+        try:
+            workbook_part = self._find_workbook_part()
+            self.epoch = CALENDAR_WINDOWS_1900
+            self.sheets: List[Tuple[str, str]] = []
+            self.shared_strings_part: Optional[str] = None
+            self.styles_part: Optional[str] = None
+            self._read_workbook(workbook_part)
+            self.date_formats, self.timedelta_formats = self._read_date_styles()
+            self._shared_strings: List[str] = []
+            self._shared_strings_source = None
+            self._shared_strings_parser = None
+            self._shared_strings_done = self.shared_strings_part is None
+        except Exception:
+            self.archive.close()
+            raise
+
+    @property
+    def sheetnames(self) -> List[str]:
+        """工作表名称列表（按工作簿中的顺序，不含图表页）"""
+        return [name for name, _ in self.sheets]
+
+    def sheet_fingerprint(self, sheet_name: str) -> Optional[str]:
+        """
+        sheet页缓存使用的指纹，由sheet名和内容指纹（见sheet_content_fingerprint）计算
+
+        内容指纹只包含本sheet页引用的共享字符串，其他sheet页的文字修改会改变共享字符串表，
+        但不会改变本sheet页的指纹。
+
+        Returns:
+            指纹字符串；无法计算内容指纹时返回None（不使用缓存）
+        """
+        content = self.sheet_content_fingerprint(sheet_name)
+        if content is None:
+            return None
+        return hashlib.md5(f"{sheet_name}|{content}".encode("utf-8")).hexdigest()
+
+    def sheet_content_fingerprint(self, sheet_name: str) -> Optional[str]:
+        """
+        与sheet名和所在工作簿无关的sheet页内容指纹，用于识别不同工作簿中相同的sheet页
+
+        工作表XML相同时，单元格的位置、类型和原始值都相同，不同工作簿之间只有共享字符串表
+        和样式表可能不同。因此只扫描一遍解压后的工作表XML，在计算其摘要的同时找出引用的
+        共享字符串编号和样式编号（不做解析和类型转换），指纹由工作表XML的摘要、这些共享
+        字符串的内容及样式是否为日期/时长格式计算。指纹用作去重的唯一标识，使用BLAKE2b
+        摘要，不使用zip目录中的32位CRC（大小相同、内容不同的工作表可能CRC相同）。
+
+        Returns:
+            指纹字符串；工作表XML中有无法可靠识别的共享字符串引用时返回None
+        """
+        part = dict(self.sheets)[sheet_name]
+        try:
+            info = self.archive.getinfo(part)
+        except KeyError:
+            return None
+
+        digest = hashlib.blake2b(digest_size=FINGERPRINT_DIGEST_SIZE)
+        indices = []
+        styles = set()
+        typed_cells = 0
+        referenced = 0
+        with self.archive.open(part) as source:
+            carry = b""
+            while True:
+                block = source.read(SCAN_BLOCK_SIZE)
+                digest.update(block)
+                data = carry + block
+                if block:
+                    # 在最后一个单元格开始处截断，单元格不会跨越两次扫描
+                    cut = max(data.rfind(b"<c "), data.rfind(b":c "))
+                    if cut > 0 and data[cut:cut + 1] == b":":
+                        cut = data.rfind(b"<", 0, cut)
+                    if cut <= 0:
+                        carry = data
+                        continue
+                    data, carry = data[:cut], data[cut:]
+                matches = SHARED_STRING_CELL.findall(data)
+                typed_cells += len(SHARED_STRING_TYPE.findall(data))
+                referenced += len(matches)
+                if matches:
+                    indices.append(np.unique(np.array(matches, dtype=np.int64)))
+                styles.update(int(style) for style in set(STYLE_ATTRIBUTE.findall(data)))
+                if not block:
+                    break
+
+        # 共享字符串单元格的写法不在识别范围内（如值前有公式）时不计算指纹
+        if typed_cells != referenced:
+            return None
+        used = np.unique(np.concatenate(indices)) if indices else np.empty(0, dtype=np.int64)
+
+        digest.update(f"|{info.file_size}|{self.epoch}|".encode())
+        digest.update(repr([(style, style in self.date_formats, style in self.timedelta_formats)
+                            for style in sorted(styles)]).encode())
+        if len(used):
+            try:
+                self.shared_string(int(used[-1]))
+            except IndexError:
+                return None
+            strings = self._shared_strings
+            digest.update(f"|{len(used)}|".encode())
+            digest.update("\x00".join(strings[index] for index in used.tolist()).encode("utf-8"))
+        return digest.hexdigest()
+
+    def sheet_dimension(self, sheet_name: str) -> Optional[str]:
+        """
+        读取工作表XML中记录的使用范围（<dimension ref="A1:F3000"/>）
+
+        只解析到sheetData开始为止，不读取单元格数据；文件中没有记录时返回None。
+        记录的范围由写入程序维护，可能因零散格式而偏大。
+        """
+        part = dict(self.sheets)[sheet_name]
+        try:
+            source = self.archive.open(part)
+        except KeyError:
+            raise UnsupportedXlsxFeature(f"缺少工作表部件: {part}")
+
+        found = {}
+
+        def start(name, attrs):
+            if name == DIMENSION_NAME:
+                found['ref'] = attrs.get("ref")
+            if name in (DIMENSION_NAME, SHEET_DATA_NAME):
+                raise _StopParsing()
+
+        parser = expat.ParserCreate(namespace_separator=" ")
+        parser.StartElementHandler = start
+        with source:
+            try:
+                while True:
+                    data = source.read(READ_BLOCK_SIZE)
+                    parser.Parse(data, not data)
+                    if not data:
+                        break
+            except _StopParsing:
+                pass
+            except expat.ExpatError as e:
+                raise UnsupportedXlsxFeature(f"工作表XML解析失败: {e}")
+        return found.get('ref')
+
+    def sheet_part_size(self, sheet_name: str) -> Optional[int]:
+        """工作表XML解压后的字节数（取自zip目录，不解压）"""
+        try:
+            return self.archive.getinfo(dict(self.sheets)[sheet_name]).file_size
+        except KeyError:
+            return None
+
+    def close(self):
+        """关闭zip文件"""
+        self._close_shared_strings()
+        self.archive.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _read_xml(self, part: str):
+        """读取并解析一个较小的XML部件"""
+        try:
+            with self.archive.open(part) as source:
+                return ET.parse(source).getroot()
+        except KeyError:
+            raise UnsupportedXlsxFeature(f"缺少部件: {part}")
+
+    def _read_rels(self, part: str) -> Dict[str, Tuple[str, str]]:
+        """读取部件的关系文件，返回 {rId: (类型, 目标路径)}"""
+        folder, name = posixpath.split(part)
+        rels_part = posixpath.join(folder, "_rels", name + ".rels")
+        if rels_part not in self.archive.namelist():
+            return {}
+
+        rels = {}
+        for rel in self._read_xml(rels_part).iter(f"{{{PKG_REL_NS}}}Relationship"):
+            if rel.get("TargetMode") == "External":
+                continue
+            target = rel.get("Target", "")
+            if target.startswith("/"):
+                target = target[1:]
+            else:
+                target = posixpath.normpath(posixpath.join(folder, target))
+            rels[rel.get("Id")] = (rel.get("Type"), target)
+        return rels
+
+    def _find_workbook_part(self) -> str:
+        """从包关系中找到workbook.xml的位置"""
+        for rel_type, target in self._read_rels("").values():
+            if rel_type == OFFICE_DOCUMENT_REL:
+                return target
+        raise UnsupportedXlsxFeature("未找到workbook部件（可能是Strict OOXML格式）")
+
+    def _read_workbook(self, workbook_part: str):
+        """解析sheet列表、日期基准和共享字符串/样式部件位置"""
+        root = self._read_xml(workbook_part)
+        if root.tag != f"{{{SHEET_MAIN_NS}}}workbook":
+            raise UnsupportedXlsxFeature(f"不支持的workbook命名空间: {root.tag}")
+
+        properties = root.find(f"{{{SHEET_MAIN_NS}}}workbookPr")
+        if properties is not None and properties.get("date1904", "").lower() in ("1", "true"):
+            self.epoch = CALENDAR_MAC_1904
+
+        rels = self._read_rels(workbook_part)
+        for rel_type, target in rels.values():
+            if rel_type == SHARED_STRINGS_REL:
+                self.shared_strings_part = target
+            elif rel_type == STYLES_REL:
+                self.styles_part = target
+
+        for sheet in root.iter(f"{{{SHEET_MAIN_NS}}}sheet"):
+            rel_type, target = rels.get(sheet.get(f"{{{REL_NS}}}id"), (None, None))
+            if rel_type == CHARTSHEET_REL:
+                # 与pandas一致，图表页不作为数据sheet页
+                continue
+            if rel_type != WORKSHEET_REL:
+                raise UnsupportedXlsxFeature(f"sheet页 {sheet.get('name')} 不是普通工作表")
+            self.sheets.append((sheet.get("name"), target))
+
+    def _read_date_styles(self) -> Tuple[Set[int], Set[int]]:
+        """找出数字格式为日期/时长的单元格样式编号"""
+        date_formats, timedelta_formats = set(), set()
+        if self.styles_part is None:
+            return date_formats, timedelta_formats
+
+        root = self._read_xml(self.styles_part)
+        custom_formats = {
+            int(fmt.get("numFmtId")): fmt.get("formatCode")
+            for fmt in root.iter(f"{{{SHEET_MAIN_NS}}}numFmt")
+        }
+        cell_xfs = root.find(f"{{{SHEET_MAIN_NS}}}cellXfs")
+        if cell_xfs is None:
+            return date_formats, timedelta_formats
+
+        for idx, xf in enumerate(cell_xfs.iterfind(f"{{{SHEET_MAIN_NS}}}xf")):
+            num_fmt_id = int(xf.get("numFmtId", 0))
+            fmt = custom_formats.get(num_fmt_id, BUILTIN_FORMATS.get(num_fmt_id))
+            if is_date_format(fmt):
+                date_formats.add(idx)
+            if is_timedelta_format(fmt):
+                timedelta_formats.add(idx)
+        return date_formats, timedelta_formats
+
+    @property
+    def shared_strings(self) -> List[str]:
+        """完整的共享字符串表"""
+        while not self._shared_strings_done:
+            self._load_shared_strings(READ_BLOCK_SIZE)
+        return self._shared_strings
+
+    def shared_string(self, index: int) -> str:
+        """
+        按编号取共享字符串，只解析到该编号为止
+
+        共享字符串表按需逐块解析，只读取前几行时（如预览）不必解析整个表。
+        """
+        strings = self._shared_strings
+        while index >= len(strings) and not self._shared_strings_done:
+            self._load_shared_strings(READ_BLOCK_SIZE)
+        return strings[index]
+
+    def _load_shared_strings(self, size: int):
+        """从共享字符串表中再解析size字节，读完后关闭该部件"""
+        if self._shared_strings_parser is None:
+            self._shared_strings_source = self.archive.open(self.shared_strings_part)
+            self._shared_strings_parser = ET.XMLPullParser(events=("end",))
+
+        data = self._shared_strings_source.read(size)
+        if data:
+            self._shared_strings_parser.feed(data)
+        else:
+            self._shared_strings_parser.close()
+            self._shared_strings_done = True
+        for _, node in self._shared_strings_parser.read_events():
+            if node.tag == SHARED_STRING_TAG:
+                self._shared_strings.append(_text_content(node).replace('x005F_', ''))
+                node.clear()
+        if self._shared_strings_done:
+            self._close_shared_strings()
+
+    def _close_shared_strings(self):
+        if self._shared_strings_source is not None:
+            self._shared_strings_source.close()
+            self._shared_strings_source = None
+        self._shared_strings_parser = None
+
+    def _convert_value(self, data_type: str, value: Optional[str], style_id: int):
+        """按单元格类型转换值，规则与openpyxl只读模式(data_only)一致"""
+        if data_type == "n":
+            value = _cast_number(value)
+            if style_id in self.date_formats:
+                try:
+                    return from_excel(value, self.epoch,
+                                      timedelta=style_id in self.timedelta_formats)
+                except (OverflowError, ValueError):
+                    return "#VALUE!"
+            return value
+        if data_type == "s":
+            try:
+                return self.shared_string(int(value))
+            except (IndexError, ValueError):
+                raise UnsupportedXlsxFeature(f"无效的共享字符串索引: {value}")
+        if data_type == "b":
+            return bool(int(value))
+        if data_type == "d":
+            return from_ISO8601(value)
+        # str（公式字符串结果）和 e（错误值）直接返回文本
+        return value
+
+    def iter_rows(self, sheet_name: str, extent: Optional[Dict] = None,
+                  select_columns: Optional[Callable[[tuple], Sequence[int]]] = None,
+                  row_range: Optional[Tuple[int, Optional[int]]] = None) -> Iterator[tuple]:
+        """
+        增量解析sheet页，逐行返回单元格值
+
+        从第1行开始，没有值的行返回空元组，每行宽度到该行最后一个有值的单元格为止。
+        只有格式没有值的单元格不会出现在结果中，末尾没有值的行也不会返回，
+        因此使用范围被零散格式扩大到XFD列或第1048576行时不会分配这些空行空列。
+
+        Args:
+            sheet_name: sheet页名称
+            extent: 可选字典，解析完成后写入使用范围: rows_read（行数）、raw_width（列数）；
+                选择了列或行时不写入
+            select_columns: 可选函数，参数为第1行（表头）的单元格值，返回保留的列下标（从0开始）；
+                之后未保留列的单元格不做转换，返回的每行只包含保留的列
+            row_range: 可选的 (起始行, 结束行)，第1行之外只返回该范围内的行，
+                起始行之前的行不做转换，解析到结束行即停止
+
+        Yields:
+            单元格值元组
+        """
+        part = dict(self.sheets)[sheet_name]
+        try:
+            source = self.archive.open(part)
+        except KeyError:
+            raise UnsupportedXlsxFeature(f"缺少工作表部件: {part}")
+
+        handler = _SheetRowHandler(self)
+        min_row, max_row = row_range or (1, None)
+        handler.min_row = min_row
+        handler.max_row = max_row
+        # 保留的列号（从1开始），读到表头后确定
+        columns = None
+        parser = expat.ParserCreate(namespace_separator=" ")
+        parser.buffer_text = True
+        parser.StartElementHandler = handler.start
+        parser.EndElementHandler = handler.end
+        parser.CharacterDataHandler = handler.data
+
+        next_row = 1
+        blank_rows = 0
+        with source:
+            while True:
+                data = source.read(READ_BLOCK_SIZE)
+                try:
+                    parser.Parse(data, not data)
+                except _StopParsing:
+                    # 已超过结束行，不再解析后面的内容
+                    data = b""
+                except expat.ExpatError as e:
+                    raise UnsupportedXlsxFeature(f"工作表XML解析失败: {e}")
+
+                for row_number, cells in handler.completed_rows:
+                    if row_number < next_row:
+                        continue
+                    if select_columns is not None and columns is None:
+                        header = _cells_to_tuple(cells) if row_number == 1 else ()
+                        columns = [index + 1 for index in select_columns(header)]
+                        handler.columns = set(columns)
+                    if next_row == 1 and row_number > 1:
+                        # 第1行（表头）为空
+                        blank_rows += 1
+                        next_row = 2
+                    if row_number < min_row and row_number > 1:
+                        next_row = row_number + 1
+                        continue
+                    blank_rows += row_number - max(next_row, min_row)
+                    next_row = row_number + 1
+
+                    if columns is not None:
+                        cells = {position: cells[column] for position, column in enumerate(columns, 1)
+                                 if column in cells}
+                    if not cells:
+                        blank_rows += 1
+                        continue
+                    # 中间的空行只在遇到后续有值的行时才补出
+                    for _ in range(blank_rows):
+                        yield ()
+                    blank_rows = 0
+                    yield _cells_to_tuple(cells)
+                handler.completed_rows.clear()
+
+                if not data:
+                    break
+
+        if extent is not None and select_columns is None and row_range is None:
+            extent['rows_read'] = max(extent.get('rows_read', 0), next_row - 1)
+            extent['raw_width'] = max(extent.get('raw_width', 0), handler.max_column)
+
+
+def _cells_to_tuple(cells: Dict[int, object]) -> tuple:
+    """把 {列号: 值} 转换为单元格值元组，缺少的单元格为None"""
+    if not cells:
+        return ()
+    values = [None] * max(cells)
+    for column, value in cells.items():
+        values[column - 1] = value
+    return tuple(values)
+
+
+class _SheetRowHandler:
+    """expat回调：收集已解析完成的行 (行号, {列号: 值})，只记录有值的单元格"""
+
+    def __init__(self, reader: FastXlsxReader):
+        self.reader = reader
+        self.completed_rows: List[Tuple[int, Dict[int, object]]] = []
+        self.column_cache: Dict[str, int] = {}
+        self.row_counter = 0
+        self.col_counter = 0
+        self.max_column = 0
+        self.cells: Dict[int, object] = {}
+        self.cell_type = "n"
+        self.style_id = 0
+        self.value: Optional[List[str]] = None
+        self.inline_text: Optional[List[str]] = None
+        self.capture: Optional[List[str]] = None
+        self.in_phonetic = False
+        # 行列选择: 保留的列号、起始行和结束行；skip_row表示当前行不需要转换
+        self.columns: Optional[Set[int]] = None
+        self.min_row = 1
+        self.max_row: Optional[int] = None
+        self.skip_row = False
+
+    def start(self, name: str, attrs: Dict[str, str]):
+        if name == C_NAME:
+            ref = attrs.get("r")
+            if ref:
+                letters = ref.rstrip("0123456789")
+                column = self.column_cache.get(letters)
+                if column is None:
+                    column = 0
+                    for char in letters.upper():
+                        column = column * 26 + ord(char) - 64
+                    self.column_cache[letters] = column
+                self.col_counter = column
+            else:
+                self.col_counter += 1
+            self.cell_type = attrs.get("t", "n")
+            self.style_id = int(attrs.get("s", 0))
+            self.value = None
+            self.inline_text = None
+        elif name == V_NAME:
+            self.value = self.capture = []
+        elif name == T_NAME:
+            if self.inline_text is not None and not self.in_phonetic:
+                self.capture = self.inline_text
+        elif name == IS_NAME:
+            self.inline_text = []
+        elif name == RPH_NAME:
+            self.in_phonetic = True
+        elif name == ROW_NAME:
+            row_ref = attrs.get("r")
+            self.row_counter = int(float(row_ref)) if row_ref else self.row_counter + 1
+            if self.max_row is not None and self.row_counter > self.max_row:
+                raise _StopParsing()
+            self.skip_row = 1 < self.row_counter < self.min_row
+            self.col_counter = 0
+            self.cells = {}
+
+    def end(self, name: str):
+        if name == C_NAME:
+            if self.skip_row or (self.columns is not None and self.col_counter not in self.columns):
+                value = None
+            elif self.cell_type == "inlineStr":
+                value = "".join(self.inline_text) if self.inline_text is not None else None
+            else:
+                value = "".join(self.value) if self.value else None
+                if value is not None:
+                    value = self.reader._convert_value(self.cell_type, value, self.style_id)
+            if value is not None:
+                self.cells[self.col_counter] = value
+            if self.col_counter > self.max_column:
+                self.max_column = self.col_counter
+        elif name == V_NAME or name == T_NAME:
+            self.capture = None
+        elif name == RPH_NAME:
+            self.in_phonetic = False
+        elif name == ROW_NAME:
+            self.completed_rows.append((self.row_counter, self.cells))
+
+    def data(self, text: str):
+        if self.capture is not None:
+            self.capture.append(text)
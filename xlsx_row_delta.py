@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+"""
+行级增量模块
+为每个源文件保存一份紧凑的行指纹索引（每行16字节: 键哈希 + 行内容哈希；按键列对比时另存行号，
+以及拼接成一个UTF-8字节串的键值，用于报告删除的键），
+下次转换时在同一遍读取中按批与索引比较，只输出新增、修改和删除的行。
+
+- 指定键列时按键列的值对应新旧行，否则按行号对应
+- 索引保存在输出目录的 .xlsx2md_rows/ 中（numpy .npz 格式），按键哈希排序，
+  每批数据用 searchsorted 向量化查找，不需要把上次的数据读回内存
+- 删除的行只能给出键和上次的行号，索引中不保存行内容
+"""
+
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from markdown_compression import markdown_stem
+
+# 增量记录中的操作类型及Markdown中的名称
+DELTA_OPERATIONS = {
+    'added': '新增',
+    'changed': '修改',
+    'removed': '删除',
+}
+
+# 拼接一行单元格计算行指纹时使用的分隔符（Excel单元格中不会出现NUL字符）
+ROW_SEPARATOR = "\x00"
+
+
+def hash_strings(values: List[str]) -> np.ndarray:
+    """计算字符串的64位哈希（pandas的确定性哈希，与进程无关）"""
+    if not values:
+        return np.empty(0, dtype=np.uint64)
+    return pd.util.hash_array(np.array(values, dtype=object), categorize=False)
+
+
+class RowIndex:
+    """一个源文件的行指纹索引文件"""
+
+    DIR_NAME = '.xlsx2md_rows'
+    VERSION = 2
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: 索引文件路径（.npz）
+        """
+        self.path = path
+        # 上次转换时源文件的哈希（load后可用）
+        self.file_hash: Optional[str] = None
+
+    def load(self) -> Dict[str, Dict]:
+        """
+        读取上次转换的索引
+
+        Returns:
+            {sheet名: {mode, keys, hashes, rows, labels, label_offsets}}，没有索引或索引损坏时返回空字典
+        """
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                meta = json.loads(str(data['meta']))
+                if meta.get('version') != self.VERSION:
+                    return {}
+                self.file_hash = meta.get('file_hash')
+                sheets = {}
+                for sheet_name, info in meta['sheets'].items():
+                    prefix = info['prefix']
+                    key_mode = info['mode'] == 'key'
+                    sheets[sheet_name] = {
+                        'mode': info['mode'],
+                        'keys': data[f'{prefix}_keys'],
+                        'hashes': data[f'{prefix}_hashes'],
+                        'rows': data[f'{prefix}_rows'] if key_mode else None,
+                        'labels': data[f'{prefix}_labels'] if key_mode else None,
+                        'label_offsets': data[f'{prefix}_label_offsets'] if key_mode else None,
+                        'first_row': info.get('first_row', 2),
+                    }
+                return sheets
+        except (OSError, ValueError, KeyError) as e:
+            print(f"警告: 行指纹索引 {self.path} 无法读取，将按首次转换处理: {e}")
+            return {}
+
+    def save(self, sheets: Dict[str, Dict], file_hash: Optional[str]):
+        """保存本次转换的索引（先写临时文件再替换）"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        arrays = {}
+        meta = {'version': self.VERSION, 'file_hash': file_hash, 'sheets': {}}
+        for sheet_idx, (sheet_name, entry) in enumerate(sheets.items()):
+            prefix = f"s{sheet_idx}"
+            meta['sheets'][sheet_name] = {'prefix': prefix, 'mode': entry['mode'], 'first_row': entry['first_row']}
+            arrays[f'{prefix}_keys'] = entry['keys']
+            arrays[f'{prefix}_hashes'] = entry['hashes']
+            if entry['mode'] == 'key':
+                arrays[f'{prefix}_rows'] = entry['rows']
+                arrays[f'{prefix}_labels'] = entry['labels']
+                arrays[f'{prefix}_label_offsets'] = entry['label_offsets']
+        arrays['meta'] = np.array(json.dumps(meta, ensure_ascii=False))
+
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(temp_path, self.path)
+
+
+class SheetDelta:
+    """一个sheet页的逐行对比：按批计算行指纹并与上次的索引比较"""
+
+    def __init__(self, old: Optional[Dict], key_index: Optional[int], first_row: int = 2):
+        """
+        Args:
+            old: 上次转换时该sheet页的索引，首次转换时为None
+            key_index: 键列的位置，为None时按行号对应
+            first_row: 第一个数据行的Excel行号（只转换部分行时大于2）
+        """
+        self.mode = 'key' if key_index is not None else 'position'
+        self.key_index = key_index
+        if old is not None and old['mode'] != self.mode:
+            print(f"  提示: 对比方式已变化（{old['mode']} → {self.mode}），所有行按新增处理")
+            old = None
+        self.old = old
+        self.seen = np.zeros(len(old['keys']), dtype=bool) if old is not None else None
+        self.first_row = first_row
+        self.next_row = first_row
+        self.keys: List[np.ndarray] = []
+        self.hashes: List[np.ndarray] = []
+        # 按键列对比时：各批键值的UTF-8字节串和每个键值的字节数（按行的先后顺序，行号连续）
+        self.labels: List[bytes] = []
+        self.label_lengths: List[np.ndarray] = []
+        self.rows: List[np.ndarray] = []
+        self.counts = {operation: 0 for operation in DELTA_OPERATIONS}
+
+    def update(self, rows: List[List[str]]) -> List[Tuple[str, int, str, List[str]]]:
+        """
+        加入一批数据行（字符串列表，已去掉末尾空单元格）
+
+        Returns:
+            新增和修改的行: [(操作, Excel行号, 键, 单元格)]
+        """
+        if not rows:
+            return []
+        row_numbers = np.arange(self.next_row, self.next_row + len(rows), dtype=np.uint64)
+        self.next_row += len(rows)
+
+        row_hashes = hash_strings([ROW_SEPARATOR.join(row) for row in rows])
+        if self.mode == 'key':
+            labels = [row[self.key_index] if self.key_index < len(row) else "" for row in rows]
+            keys = hash_strings(labels)
+            encoded = [label.encode('utf-8') for label in labels]
+            self.labels.append(b"".join(encoded))
+            self.label_lengths.append(np.fromiter(map(len, encoded), dtype=np.uint64, count=len(encoded)))
+            self.rows.append(row_numbers.astype(np.uint32))
+        else:
+            labels = None
+            keys = row_numbers
+        self.keys.append(keys)
+        self.hashes.append(row_hashes)
+
+        if self.old is None:
+            changed = np.ones(len(rows), dtype=bool)
+            operations = np.full(len(rows), 'added', dtype=object)
+        else:
+            old_keys = self.old['keys']
+            positions = np.searchsorted(old_keys, keys)
+            in_range = positions < len(old_keys)
+            found = np.zeros(len(rows), dtype=bool)
+            found[in_range] = old_keys[positions[in_range]] == keys[in_range]
+            self.seen[positions[found]] = True
+
+            modified = np.zeros(len(rows), dtype=bool)
+            modified[found] = self.old['hashes'][positions[found]] != row_hashes[found]
+            changed = modified | ~found
+            operations = np.where(found, 'changed', 'added').astype(object)
+
+        results = []
+        for row_idx in np.flatnonzero(changed).tolist():
+            operation = operations[row_idx]
+            self.counts[operation] += 1
+            key = labels[row_idx] if labels is not None else str(int(row_numbers[row_idx]))
+            results.append((operation, int(row_numbers[row_idx]), key, rows[row_idx]))
+        return results
+
+    def finish(self) -> Tuple[List[Tuple[int, str]], Dict]:
+        """
+        完成对比
+
+        Returns:
+            (删除的行: [(上次的Excel行号, 键)]，按行号排序, 本次的索引)
+        """
+        removed = []
+        if self.old is not None:
+            unseen = np.flatnonzero(~self.seen)
+            if self.mode == 'key':
+                order = np.argsort(self.old['rows'][unseen], kind='stable')
+                removed_rows = self.old['rows'][unseen[order]].tolist()
+                labels = self.old['labels'].tobytes() if removed_rows else b""
+                offsets = self.old['label_offsets']
+                removed = []
+                for row in removed_rows:
+                    # 键值按行的先后顺序保存
+                    position = row - self.old['first_row']
+                    label = labels[offsets[position]:offsets[position + 1]].decode('utf-8')
+                    removed.append((row, label))
+            else:
+                removed = [(row, str(row)) for row in self.old['keys'][unseen].tolist()]
+        self.counts['removed'] = len(removed)
+
+        keys = np.concatenate(self.keys) if self.keys else np.empty(0, dtype=np.uint64)
+        hashes = np.concatenate(self.hashes) if self.hashes else np.empty(0, dtype=np.uint64)
+        order = np.argsort(keys, kind='stable')
+        entry = {'mode': self.mode, 'keys': keys[order], 'hashes': hashes[order], 'rows': None,
+                 'labels': None, 'label_offsets': None, 'first_row': self.first_row}
+        if self.mode == 'key':
+            rows = np.concatenate(self.rows) if self.rows else np.empty(0, dtype=np.uint32)
+            entry['rows'] = rows[order]
+            # 键值不随键哈希排序，按行的先后顺序拼接保存，删除的行按 行号 - first_row 查找
+            entry['labels'] = np.frombuffer(b"".join(self.labels), dtype=np.uint8)
+            lengths = np.concatenate(self.label_lengths) if self.label_lengths else np.empty(0, dtype=np.uint64)
+            entry['label_offsets'] = np.concatenate([np.zeros(1, dtype=np.uint64), np.cumsum(lengths, dtype=np.uint64)])
+            if len(np.unique(entry['keys'])) != len(entry['keys']):
+                print("  警告: 键列存在重复值，重复的键只能对应到其中一行")
+        return removed, entry
+
+
+class DeltaRecorder:
+    """
+    在转换的同一遍读取中记录各sheet页的变化，完成后写出增量文件并更新索引
+
+    增量文件与输出文件同名: <输出文件名>.delta.md 和 <输出文件名>.delta.jsonl，
+    每次转换都会覆盖；变化的行先写入临时文件，sheet页读完、列名确定后再写入增量文件。
+    """
+
+    def __init__(self, output_path: str, index: RowIndex, key_column: Optional[str],
+                 render_header: Callable[[List], List[str]],
+                 render_rows: Callable[[pd.DataFrame], List[str]], chunk_size: int = 1000):
+        """
+        Args:
+            output_path: Markdown输出文件路径
+            index: 行指纹索引
+            key_column: 键列名称，为None时按行号对比
+            render_header: 生成Markdown表头的函数
+            render_rows: 把DataFrame渲染为Markdown表格行的函数
+            chunk_size: 写出增量行时每批的行数
+        """
+        output_file = Path(output_path)
+        self.markdown_path = output_file.with_name(f"{markdown_stem(output_file)}.delta.md")
+        self.jsonl_path = output_file.with_name(f"{markdown_stem(output_file)}.delta.jsonl")
+        self.index = index
+        self.old_sheets = index.load()
+        self.key_column = key_column
+        self.render_header = render_header
+        self.render_rows = render_rows
+        self.chunk_size = chunk_size
+
+        self.new_sheets: Dict[str, Dict] = {}
+        self.summary: Dict[str, Dict] = {}
+        self.sections = tempfile.TemporaryFile('w+', encoding='utf-8', newline='\n')
+        self.records = tempfile.TemporaryFile('w+', encoding='utf-8', newline='\n')
+        self.sheet_name = None
+        self.first_row = 2
+        self.sheet_delta: Optional[SheetDelta] = None
+        self.changes = None
+
+    def begin_sheet(self, sheet_name: str, first_row: int = 2):
+        """
+        开始记录一个sheet页，读到表头后需调用set_headers
+
+        Args:
+            sheet_name: sheet页名称
+            first_row: 第一个数据行的Excel行号
+        """
+        self.sheet_name = sheet_name
+        self.first_row = first_row
+        self.sheet_delta = None
+        self.changes = tempfile.TemporaryFile('w+', encoding='utf-8', newline='\n')
+
+    def set_headers(self, headers: List):
+        """
+        根据表头确定键列位置，该sheet页没有键列时按行号对比
+
+        Args:
+            headers: 列名列表（与最终列名一致的前缀即可）
+        """
+        key_index = None
+        if self.key_column is not None:
+            names = [str(header) for header in headers]
+            if self.key_column in names:
+                key_index = names.index(self.key_column)
+            else:
+                print(f"  提示: sheet页 {self.sheet_name} 中没有键列 {self.key_column}，按行号对比")
+        self.sheet_delta = SheetDelta(self.old_sheets.get(self.sheet_name), key_index, self.first_row)
+
+    def add_rows(self, rows: List[List[str]]):
+        """加入一批数据行（字符串列表，已去掉末尾空单元格）"""
+        for operation, row_number, key, cells in self.sheet_delta.update(rows):
+            self.changes.write(json.dumps([operation, row_number, key, cells], ensure_ascii=False) + "\n")
+
+    def end_sheet(self, headers: List):
+        """sheet页读取完成：写出该sheet页的增量并保存本次的索引"""
+        if self.sheet_delta is None:
+            self.set_headers(headers)
+        removed, entry = self.sheet_delta.finish()
+        self.new_sheets[self.sheet_name] = entry
+        with self.changes:
+            self._write_sheet(self.sheet_name, headers, self.sheet_delta, removed)
+        self.sheet_delta = None
+        self.changes = None
+
+    def _write_sheet(self, sheet_name: str, headers: List, sheet_delta: SheetDelta,
+                     removed: List[Tuple[int, str]]):
+        counts = sheet_delta.counts
+        self.summary[sheet_name] = dict(counts)
+        headers = [str(header) for header in headers]
+        self.sections.write(f"## 📄 Sheet: {sheet_name}\n")
+        self.sections.write(", ".join(
+            f"**{name}:** {counts[operation]}" for operation, name in DELTA_OPERATIONS.items()
+        ) + "\n\n")
+
+        if counts['added'] or counts['changed']:
+            table_header = self.render_header(["变更", "行号"] + headers)
+            self.sections.write("\n".join(table_header) + "\n")
+            self.changes.seek(0)
+            while True:
+                batch = [json.loads(line) for _, line in zip(range(self.chunk_size), self.changes)]
+                if not batch:
+                    break
+                table_rows = []
+                for operation, row_number, key, cells in batch:
+                    cells = cells + [""] * (len(headers) - len(cells))
+                    table_rows.append([DELTA_OPERATIONS[operation], str(row_number)] + cells)
+                    self._write_record(sheet_name, operation, row_number, key,
+                                       dict(zip(headers, cells)))
+                for line in self.render_rows(pd.DataFrame(table_rows, dtype=object)):
+                    self.sections.write(line + "\n")
+            self.sections.write("\n")
+
+        if removed:
+            label = "删除的键" if sheet_delta.mode == 'key' else "删除的行号"
+            self.sections.write(f"**{label}:** " + ", ".join(f"`{key}`" for _, key in removed) + "\n\n")
+            for row_number, key in removed:
+                self._write_record(sheet_name, 'removed', int(row_number), key, None)
+        self.sections.write("---\n\n")
+
+    def _write_record(self, sheet_name: str, operation: str, row_number: int,
+                      key: str, values: Optional[Dict]):
+        record = {"sheet": sheet_name, "op": operation, "row": row_number, "key": key}
+        if values is not None:
+            record["values"] = values
+        self.records.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def finish(self, input_path: str, file_hash: str):
+        """
+        所有sheet页读取完成：写出增量文件（先写临时文件再替换）并保存索引
+
+        上次有、本次没有的sheet页，其所有行按删除处理。
+        """
+        for sheet_name, old in self.old_sheets.items():
+            if sheet_name in self.new_sheets:
+                continue
+            # 没有新的数据行，finish返回上次的全部行
+            sheet_delta = SheetDelta(old, 0 if old['mode'] == 'key' else None)
+            removed, _ = sheet_delta.finish()
+            self.changes = tempfile.TemporaryFile('w+', encoding='utf-8', newline='\n')
+            with self.changes:
+                self._write_sheet(sheet_name, [], sheet_delta, removed)
+            self.changes = None
+
+        comparison = f"按键列 `{self.key_column}`" if self.key_column is not None else "按行号"
+        header_lines = [
+            f"# Excel文件增量: {Path(input_path).name}",
+            f"**源文件:** `{input_path}`",
+            f"**转换时间:** {pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')}",
+            f"**文件哈希:** `{file_hash}`",
+            f"**上次文件哈希:** " + (f"`{self.index.file_hash}`" if self.index.file_hash
+                                  else "无（首次转换，所有行按新增输出）"),
+            f"**对比方式:** {comparison}",
+            "", "---", "",
+        ]
+        summary = {
+            "file_name": Path(input_path).name,
+            "file_hash": file_hash,
+            "previous_hash": self.index.file_hash,
+            "key_column": self.key_column,
+            "sheets": self.summary,
+        }
+
+        self._replace(self.markdown_path, "\n".join(header_lines) + "\n", self.sections,
+                      "## 📊 增量摘要\n```json\n" + json.dumps(summary, indent=2, ensure_ascii=False) + "\n```")
+        self._replace(self.jsonl_path, "", self.records, "")
+        self.index.save(self.new_sheets, file_hash)
+        self.close()
+
+    def _replace(self, path: Path, head: str, spool, tail: str):
+        temp_path = path.with_name(path.name + '.tmp')
+        try:
+            with open(temp_path, 'w', encoding='utf-8', newline='\n') as out:
+                out.write(head)
+                spool.seek(0)
+                for line in spool:
+                    out.write(line)
+                out.write(tail)
+            os.replace(temp_path, path)
+        finally:
+            if temp_path.exists():
+                temp_path.unlink()
+
+    def close(self):
+        """释放临时文件（转换失败时不写出增量，也不更新索引）"""
+        for spool in (self.sections, self.records, self.changes):
+            if spool is not None and not spool.closed:
+                spool.close()
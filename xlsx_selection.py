@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+sheet页/列/行选择模块
+解析 --sheets、--exclude_sheets、--columns 和 --rows 指定的范围，交给各读取器在解析时下推：
+
+- 未选中的sheet页不会被打开和解析
+- 列按表头名称或Excel列字母（如 B、D:F）选择，读取器读到表头后确定列号，
+  其余行中未选中列的单元格不做类型转换（fast引擎也不查共享字符串表）
+- 行按Excel行号选择（第1行表头始终保留），读取器跳过起始行之前的行，读到结束行即停止
+"""
+
+import hashlib
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from openpyxl.utils.cell import column_index_from_string
+
+# Excel列字母或列字母范围，如 B 或 D:F
+COLUMN_LETTERS = re.compile(r"([A-Za-z]{1,3})(?::([A-Za-z]{1,3}))?")
+
+# 行范围 START:END，两端均可省略；只有一个数字时表示单行
+ROW_RANGE = re.compile(r"\s*(\d*)\s*(?::\s*(\d*)\s*)?")
+
+
+def parse_row_range(text: str) -> Tuple[int, Optional[int]]:
+    """
+    解析行范围 START:END（Excel行号，包含两端）
+
+    Returns:
+        (起始行, 结束行)，起始行至少为2（第1行为表头），没有结束行时为None
+
+    Raises:
+        ValueError: 格式不正确或结束行小于起始行
+    """
+    match = ROW_RANGE.fullmatch(text)
+    if not match or not (match.group(1) or match.group(2)):
+        raise ValueError(f"行范围格式不正确: {text}，应为 START:END（如 2:1000、5000:、:200）")
+    start = int(match.group(1)) if match.group(1) else 2
+    if match.group(2) is None:
+        end = start if ":" not in text else None
+    else:
+        end = int(match.group(2)) if match.group(2) else None
+    start = max(2, start)
+    if end is not None and end < start:
+        raise ValueError(f"行范围 {text} 的结束行小于起始行（第1行为表头，数据从第2行开始）")
+    return start, end
+
+
+class SheetSelection:
+    """要转换的sheet页、列和行"""
+
+    def __init__(self, sheets: Optional[Iterable[str]] = None,
+                 exclude_sheets: Optional[Iterable[str]] = None,
+                 columns: Optional[Iterable[str]] = None,
+                 rows: Optional[str] = None):
+        """
+        Args:
+            sheets: 只转换这些sheet页（按工作簿中的顺序输出），为空时转换全部
+            exclude_sheets: 不转换这些sheet页
+            columns: 只保留这些列：表头名称（与摘要中的column_names一致）或Excel列字母/范围，
+                名称优先于列字母
+            rows: 行范围 START:END（Excel行号），第1行表头始终保留
+
+        Raises:
+            ValueError: 行范围格式不正确
+        """
+        self.sheets = list(dict.fromkeys(sheets)) if sheets else None
+        self.exclude_sheets = set(exclude_sheets or ())
+        self.columns = list(dict.fromkeys(columns)) if columns else None
+        self.rows = rows
+        self.row_range = parse_row_range(rows) if rows else None
+
+    @property
+    def first_row(self) -> int:
+        """第一个数据行的Excel行号"""
+        return self.row_range[0] if self.row_range else 2
+
+    @property
+    def filters_cells(self) -> bool:
+        """是否需要在读取时过滤列或行"""
+        return self.columns is not None or self.row_range is not None
+
+    def select_sheets(self, sheet_names: Sequence[str]) -> List[str]:
+        """按选择条件过滤sheet页名称，保持工作簿中的顺序；指定的sheet页不存在时给出提示"""
+        if self.sheets is not None:
+            missing = [name for name in self.sheets if name not in sheet_names]
+            if missing:
+                print(f"提示: 工作簿中没有sheet页: {', '.join(missing)}")
+            selected = set(self.sheets)
+            sheet_names = [name for name in sheet_names if name in selected]
+        return [name for name in sheet_names if name not in self.exclude_sheets]
+
+    def column_indices(self, header_names: List[str]) -> List[int]:
+        """
+        根据表头确定要保留的列
+
+        Args:
+            header_names: 第1行的列名（与pandas一致的命名规则，如 Unnamed: 2、名称.1）
+
+        Returns:
+            保留的列下标（从0开始，升序）
+        """
+        indices = set()
+        for column in self.columns:
+            if column in header_names:
+                indices.add(header_names.index(column))
+                continue
+            match = COLUMN_LETTERS.fullmatch(column.strip())
+            if match:
+                first = column_index_from_string(match.group(1).upper())
+                last = column_index_from_string((match.group(2) or match.group(1)).upper())
+                indices.update(range(min(first, last) - 1, max(first, last)))
+            else:
+                print(f"  提示: 表头中没有列 {column}")
+        return sorted(indices)
+
+    def describe(self) -> Optional[Dict]:
+        """文件摘要中记录的选择条件，未做任何选择时返回None"""
+        selection = {}
+        if self.sheets is not None:
+            selection["sheets"] = self.sheets
+        if self.exclude_sheets:
+            selection["exclude_sheets"] = sorted(self.exclude_sheets)
+        if self.columns is not None:
+            selection["columns"] = self.columns
+        if self.rows:
+            selection["rows"] = self.rows
+        return selection or None
+
+    def signature(self) -> str:
+        """影响sheet页内容的选择条件（列和行）的短摘要，用于sheet页缓存的文件名"""
+        if not self.filters_cells:
+            return ""
+        text = repr((self.columns, self.row_range))
+        return hashlib.md5(text.encode('utf-8')).hexdigest()[:8]
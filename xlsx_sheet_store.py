@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+sheet页内容去重存储模块
+目录中的许多工作簿含有完全相同的sheet页（模板页、对照表等）。本模块按sheet页内容指纹
+（见 FastXlsxReader.sheet_content_fingerprint，与sheet名和所在工作簿无关）保存渲染结果：
+
+- 表格行：已转义、已补齐列数的Markdown表格行，不含sheet名和分页标题，
+  因此同一份内容可以按任意sheet名和每页行数写出
+- 摘要信息：行数、列数、列名、去掉的空行空列数、列统计
+- 数据文件：与表格行同名、扩展名不同
+
+存储位于输出目录的 .xlsx2md_store/ 中，跨工作簿、跨多次运行共用；
+相同内容只解析和渲染一次，之后按行拷贝。
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional
+
+from xlsx_data_writer import DATA_FORMATS
+
+# 超过该天数未被使用的条目在目录转换结束时删除
+MAX_IDLE_DAYS = 30
+
+
+class SheetStore:
+    """按内容指纹保存sheet页渲染结果的存储"""
+
+    DIR_NAME = '.xlsx2md_store'
+    VERSION = 1
+
+    def __init__(self, output_dir: Path, data_formats: Iterable[str] = (),
+                 column_stats: bool = False, selection: str = ""):
+        """
+        Args:
+            output_dir: 输出目录
+            data_formats: 同时保存的数据文件格式（见xlsx_data_writer.DATA_FORMATS）
+            column_stats: 摘要信息中是否包含列统计
+            selection: 列和行选择条件的摘要（见SheetSelection.signature），为空表示未选择
+        """
+        self.directory = Path(output_dir) / self.DIR_NAME
+        # 表格行与每页行数无关，分页在写出时进行
+        self.settings = "-".join([f"v{self.VERSION}", *sorted(data_formats)]
+                                 + (["stats"] if column_stats else [])
+                                 + ([f"sel{selection}"] if selection else []))
+        self.data_extensions = [DATA_FORMATS[fmt] for fmt in data_formats]
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, fingerprint: str, suffix: str) -> Path:
+        return self.directory / f"{fingerprint}-{self.settings}{suffix}"
+
+    def data_base(self, fingerprint: str) -> str:
+        """数据文件路径（不含扩展名）"""
+        return str(self._path(fingerprint, ''))
+
+    def temp_base(self, fingerprint: str) -> str:
+        """
+        本进程写入新条目时使用的临时路径（不含扩展名）
+
+        并行转换的多个进程可能同时渲染相同内容的sheet页，各自写入带进程号的临时文件，
+        put时再整体替换，不会互相覆盖。
+        """
+        return f"{self.data_base(fingerprint)}.{os.getpid()}"
+
+    def get(self, fingerprint: str) -> Optional[Dict]:
+        """
+        返回已保存的sheet页摘要信息，并记录本次使用时间
+
+        表格行文件、数据文件或摘要不存在时返回None。
+        """
+        info_path = self._path(fingerprint, '.json')
+        required = [info_path] + [self._path(fingerprint, ext) for ext in ['.md'] + self.data_extensions]
+        if not all(path.exists() for path in required):
+            return None
+        try:
+            with open(info_path, 'r', encoding='utf-8') as f:
+                sheet_info = json.load(f)
+            os.utime(info_path)
+        except (OSError, ValueError):
+            return None
+        return sheet_info
+
+    def put(self, fingerprint: str, sheet_info: Dict, temp_base: str):
+        """
+        把temp_base下写好的表格行文件（.md）和数据文件移入存储，最后记录sheet页摘要信息
+
+        Args:
+            fingerprint: sheet页内容指纹
+            sheet_info: 文件摘要中该sheet页的信息
+            temp_base: temp_base()返回的临时路径
+        """
+        for ext in ['.md'] + self.data_extensions:
+            os.replace(temp_base + ext, self._path(fingerprint, ext))
+        info_path = self._path(fingerprint, '.json')
+        temp_path = f"{temp_base}.json.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(sheet_info, f, ensure_ascii=False, default=str)
+        os.replace(temp_path, info_path)
+
+    def discard(self, temp_base: str):
+        """删除写入失败时残留的临时文件"""
+        for ext in ['.md'] + self.data_extensions:
+            if os.path.exists(temp_base + ext):
+                os.remove(temp_base + ext)
+
+    def iter_rows(self, fingerprint: str) -> Iterator[str]:
+        """逐行读出保存的Markdown表格行（不含换行符）"""
+        with open(self._path(fingerprint, '.md'), 'r', encoding='utf-8', newline='\n') as f:
+            for line in f:
+                yield line[:-1]
+
+    def rows_size(self, fingerprint: str) -> int:
+        """表格行文件的字节数"""
+        return self._path(fingerprint, '.md').stat().st_size
+
+    def prune(self, max_idle_days: int = MAX_IDLE_DAYS) -> int:
+        """删除超过max_idle_days天未使用的条目及残留的临时文件，返回删除的条目数"""
+        cutoff = time.time() - max_idle_days * 86400
+        expired = set()
+        for path in self.directory.glob('*.json'):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    expired.add(path.name[:-len('.json')])
+            except OSError:
+                pass
+        for path in self.directory.iterdir():
+            # 条目文件为 <指纹>-<设置>.<扩展名>，临时文件名中还有进程号
+            name, *suffixes = path.name.split('.')
+            try:
+                stale = len(suffixes) > 1 and path.stat().st_mtime < cutoff
+            except OSError:
+                continue
+            if name in expired or stale:
+                path.unlink(missing_ok=True)
+        return len(expired)
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+紧凑字符串存储模块
+常规模式默认以 dtype=str 读取，每个单元格都是一个Python字符串对象，内存占用是原始数据的数倍。
+本模块按批把数据行逐列写入紧凑的列存储，不会先生成整张表的对象矩阵:
+
+- pyarrow: Arrow字符串列（一块连续的UTF-8缓冲区加偏移量），需要安装pyarrow
+- category: 字典编码，每个不同值只保存一次，单元格只占4字节编码；不同值较多的列不做字典编码，
+  已安装pyarrow时存为Arrow large_string列，否则按对象存储（记录在DataFrame.attrs['object_columns']中）
+
+渲染时按列在紧凑存储上完成空值处理和转义，不转换回object类型。
+"""
+
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from xlsx_data_writer import require_pyarrow
+
+# 可选的字符串存储方式，object为原有的Python对象存储
+STRING_STORAGES = ('object', 'pyarrow', 'category')
+
+# category存储下，不同值占比超过该比例的列不做字典编码
+MAX_CATEGORY_RATIO = 0.5
+
+
+def _distinct_values_array(values: List[Optional[str]]):
+    """不同值较多、不做字典编码的列：已安装pyarrow时存为Arrow large_string列，否则为对象数组"""
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return np.array(values, dtype=object)
+    return pd.arrays.ArrowStringArray(pa.array(values, type=pa.large_string()))
+
+
+def _count_object_columns(arrays) -> int:
+    """按对象存储（没有紧凑存储）的列数"""
+    return sum(isinstance(array, np.ndarray) and array.dtype == object for array in arrays)
+
+
+class _ArrowColumn:
+    """按批追加的Arrow字符串列"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def append(self, values: List[str]):
+        import pyarrow as pa
+        self.chunks.append(pa.array(values, type=pa.string()))
+
+    def finish(self):
+        import pyarrow as pa
+        return pd.arrays.ArrowStringArray(pa.chunked_array(self.chunks, type=pa.string()))
+
+
+class _CategoryColumn:
+    """
+    按批追加的字典编码列，每批只保存int32编码
+
+    不同值超过已读行数的一半时字典编码反而更占内存，该列改为逐个保存的值，
+    完成时存为Arrow字符串列（未安装pyarrow时为对象列）
+    """
+
+    def __init__(self):
+        self.lookup = {}
+        self.codes = []
+        self.rows = 0
+        self.values = None
+
+    def append(self, values: List[str]):
+        self.rows += len(values)
+        if self.values is not None:
+            self.values.extend(values)
+            return
+
+        lookup = self.lookup
+        self.codes.append(np.fromiter(
+            (lookup.setdefault(value, len(lookup)) for value in values), dtype=np.int32, count=len(values)
+        ))
+        if len(lookup) > self.rows * MAX_CATEGORY_RATIO:
+            categories = list(lookup)
+            self.values = [categories[code] for code in np.concatenate(self.codes).tolist()]
+            self.lookup = {}
+            self.codes = []
+
+    def finish(self):
+        if self.values is not None:
+            return _distinct_values_array(self.values)
+        codes = np.concatenate(self.codes) if self.codes else np.empty(0, dtype=np.int32)
+        return pd.Categorical.from_codes(codes, categories=list(self.lookup))
+
+
+class CompactFrameBuilder:
+    """按批接收数据行（字符串列表，长度可以不同），逐列写入紧凑存储，最后生成DataFrame"""
+
+    def __init__(self, storage: str):
+        if storage == 'pyarrow':
+            require_pyarrow()
+            self.column_class = _ArrowColumn
+        elif storage == 'category':
+            self.column_class = _CategoryColumn
+        else:
+            raise ValueError(f"不支持的紧凑字符串存储: {storage}")
+        self.columns = []
+        self.rows = 0
+
+    def append_rows(self, rows: List[List[str]]):
+        """追加一批数据行，较短的行和之前没有的列用空字符串补齐"""
+        if not rows:
+            return
+        width = max(len(row) for row in rows)
+        while len(self.columns) < width:
+            column = self.column_class()
+            if self.rows:
+                column.append([""] * self.rows)
+            self.columns.append(column)
+
+        for col_idx, column in enumerate(self.columns):
+            column.append([row[col_idx] if col_idx < len(row) else "" for row in rows])
+        self.rows += len(rows)
+
+    def to_dataframe(self, headers: List) -> pd.DataFrame:
+        """
+        生成DataFrame，列数由headers决定（没有数据的列补空字符串）
+
+        没有紧凑存储的列数记录在DataFrame.attrs['object_columns']中
+        """
+        while len(self.columns) < len(headers):
+            column = self.column_class()
+            column.append([""] * self.rows)
+            self.columns.append(column)
+
+        arrays = {col_idx: column.finish() for col_idx, column in enumerate(self.columns)}
+        df = pd.DataFrame(arrays)
+        df.columns = headers
+        df.attrs['object_columns'] = _count_object_columns(arrays.values())
+        return df
+
+
+def compact_dataframe(df: pd.DataFrame, storage: str) -> pd.DataFrame:
+    """
+    把已读取的DataFrame（如pandas读取的.xls）转换为紧凑字符串存储
+
+    非字符串的单元格转换为字符串，空值保留为缺失值（渲染为空字符串）；
+    没有紧凑存储的列数记录在DataFrame.attrs['object_columns']中
+    """
+    if storage == 'object' or not len(df.columns):
+        return df
+    if storage == 'pyarrow':
+        require_pyarrow()
+
+    columns = {}
+    for col_idx in range(len(df.columns)):
+        column = df.iloc[:, col_idx]
+        values = column.to_numpy(dtype=object)
+        missing = pd.isna(values)
+        strings = pd.Series(
+            [None if is_missing else str(value) for value, is_missing in zip(values.tolist(), missing)],
+            dtype=object
+        )
+        if storage == 'pyarrow':
+            columns[col_idx] = strings.astype(pd.StringDtype('pyarrow')).array
+        elif strings.nunique() > len(strings) * MAX_CATEGORY_RATIO:
+            columns[col_idx] = _distinct_values_array(strings.tolist())
+        else:
+            columns[col_idx] = pd.Categorical(strings)
+
+    compacted = pd.DataFrame(columns, index=df.index)
+    compacted.columns = df.columns
+    compacted.attrs.update(df.attrs)
+    compacted.attrs['object_columns'] = _count_object_columns(columns.values())
+    return compacted
+
+
+def is_compact_column(column: pd.Series) -> bool:
+    """判断列是否使用紧凑存储（字典编码或Arrow字符串）"""
+    dtype = column.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        return True
+    return isinstance(dtype, pd.StringDtype) and dtype.storage == 'pyarrow'
+
+
+def escape_compact_column(column: pd.Series, escape) -> List[str]:
+    """
+    在紧凑存储上完成空值处理和Markdown转义，返回一页的单元格字符串
+
+    Args:
+        column: 紧凑存储的列（通常是一页的切片）
+        escape: 批量转义一列字符串的函数
+    """
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        # 只转义本页用到的字典值
+        codes = column.cat.codes.to_numpy()
+        present = codes >= 0
+        used, inverse = np.unique(codes[present], return_inverse=True)
+        escaped = escape([str(value) for value in column.cat.categories.take(used)])
+        cells = np.full(len(codes), "", dtype=object)
+        cells[present] = np.array(escaped, dtype=object)[inverse]
+        return cells.tolist()
+
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    values = pc.fill_null(pa.array(column.array), "")
+    values = pc.replace_substring(values, "|", "\\|")
+    values = pc.replace_substring(values, "\n", "<br>")
+    return values.to_pylist()
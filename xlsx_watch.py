@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+目录监视模块
+常驻进程监视输入目录，只转换新增或修改的Excel文件：
+
+- Linux上使用inotify（通过ctypes调用libc，无需额外依赖），没有文件变化时不扫描目录
+- 不支持inotify时退回轮询，每隔poll_interval秒对目录做一次stat快照比较
+- 文件最后一次变化后等待debounce秒、且大小和修改时间不再变化才开始转换，
+  避免读取正在写入或复制中的文件
+- 转换仍经过转换清单的幂等检测，只修改了时间戳（如touch）的文件不会重新转换
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Set, Tuple
+
+# inotify事件掩码（linux/inotify.h）
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF
+
+# struct inotify_event { int wd; uint32_t mask; uint32_t cookie; uint32_t len; char name[]; }
+EVENT_HEADER = struct.Struct('iIII')
+
+# 等待事件的最长时间，到时检查是否需要退出
+MAX_WAIT_SECONDS = 1.0
+
+
+class WatchedDirectoryGone(Exception):
+    """被监视的目录已删除或移走"""
+
+
+class InotifyWatcher:
+    """基于inotify的目录监视器，只报告发生变化的文件名"""
+
+    description = "inotify"
+
+    def __init__(self, directory: Path):
+        """
+        Raises:
+            OSError: 系统不支持inotify或监视数量达到上限
+        """
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            init, add_watch = libc.inotify_init1, libc.inotify_add_watch
+        except (OSError, AttributeError):
+            raise OSError("系统不支持inotify")
+
+        self.fd = init(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1失败")
+        if add_watch(self.fd, os.fsencode(str(directory)), WATCH_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"无法监视目录 {directory}: {os.strerror(errno)}")
+        self.directory = directory
+
+    def wait(self, timeout: Optional[float]) -> Optional[Set[str]]:
+        """
+        等待文件变化
+
+        Returns:
+            发生变化的文件名集合（超时时为空）；事件队列溢出时返回None，调用方需要重新检查所有文件
+
+        Raises:
+            WatchedDirectoryGone: 目录已删除或移走
+        """
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        names = set()
+        while True:
+            try:
+                data = os.read(self.fd, 1 << 16)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                _, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b'\0')
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    return None
+                if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                    raise WatchedDirectoryGone(str(self.directory))
+                if name:
+                    names.add(os.fsdecode(name))
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """轮询目录监视器：每隔interval秒比较一次目录中各文件的大小和修改时间"""
+
+    def __init__(self, directory: Path, interval: float):
+        self.directory = directory
+        self.interval = max(0.1, interval)
+        self.description = f"轮询，每 {self.interval:g} 秒"
+        self.snapshot = self._scan()
+        self.next_scan = time.monotonic() + self.interval
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        try:
+            with os.scandir(self.directory) as entries:
+                snapshot = {}
+                for entry in entries:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        snapshot[entry.name] = (stat.st_size, stat.st_mtime_ns)
+                return snapshot
+        except FileNotFoundError:
+            raise WatchedDirectoryGone(str(self.directory))
+
+    def wait(self, timeout: Optional[float]) -> Set[str]:
+        """等待到下一次扫描（或超时），返回大小或修改时间有变化的文件名"""
+        delay = self.next_scan - time.monotonic()
+        if timeout is not None and timeout < delay:
+            time.sleep(max(0.0, timeout))
+            return set()
+        time.sleep(max(0.0, delay))
+        self.next_scan = time.monotonic() + self.interval
+
+        snapshot = self._scan()
+        changed = {name for name, state in snapshot.items() if self.snapshot.get(name) != state}
+        self.snapshot = snapshot
+        return changed
+
+    def close(self):
+        pass
+
+
+def open_watcher(directory: Path, poll_interval: float, use_inotify: bool = True):
+    """优先使用inotify，不支持时退回轮询"""
+    if use_inotify:
+        try:
+            return InotifyWatcher(directory)
+        except OSError as e:
+            print(f"提示: 无法使用inotify ({e})，改为轮询")
+    return PollingWatcher(directory, poll_interval)
+
+
+def _file_state(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def watch_directory(converter, input_dir: str, output_dir: str, debounce: float = 2.0,
+                    poll_interval: float = 5.0, force: bool = False, jobs: int = 1,
+                    use_inotify: bool = True, stop_event: Optional[threading.Event] = None):
+    """
+    先转换目录中尚未转换的文件，然后持续监视目录，转换新增或修改的Excel文件
+
+    Args:
+        converter: ExcelToMarkdownConverter
+        input_dir: 输入目录
+        output_dir: 输出目录
+        debounce: 文件最后一次变化后等待的秒数
+        poll_interval: 不支持inotify时的轮询间隔（秒）
+        force: 启动时是否强制重新转换所有文件（之后的转换仍做幂等检测）
+        jobs: 启动时并行转换的进程数
+        use_inotify: 是否尝试使用inotify
+        stop_event: 设置后退出监视（默认一直运行到Ctrl+C）
+    """
+    input_path = Path(input_dir)
+    output_path = Path(output_dir)
+    stop_event = stop_event or threading.Event()
+
+    # 先开始监视再做首次转换，转换期间发生的变化不会遗漏
+    watcher = open_watcher(input_path, poll_interval, use_inotify)
+    try:
+        converter.convert_directory(input_dir, output_dir, force, jobs)
+        if converter.dedup:
+            converter.print_dedup_summary()
+        print(f"\n监视目录 {input_path}（{watcher.description}，文件稳定 {debounce:g} 秒后转换），按 Ctrl+C 退出")
+
+        # 文件名 -> (转换时间, 最后一次看到的大小和修改时间)
+        pending: Dict[str, Tuple[float, Optional[Tuple[int, int]]]] = {}
+        while not stop_event.is_set():
+            now = time.monotonic()
+            timeout = MAX_WAIT_SECONDS
+            if pending:
+                timeout = min(timeout, max(0.0, min(due for due, _ in pending.values()) - now))
+
+            changed = watcher.wait(timeout)
+            if changed is None:
+                print("提示: 文件事件过多，重新检查目录中的所有文件")
+                changed = {path.name for path in input_path.iterdir()}
+            for name in changed:
+                if converter.is_excel_file(name):
+                    pending[name] = (time.monotonic() + debounce, _file_state(input_path / name))
+
+            now = time.monotonic()
+            for name, (due, state) in list(pending.items()):
+                if due > now:
+                    continue
+                excel_file = input_path / name
+                current = _file_state(excel_file)
+                if current is None:
+                    del pending[name]
+                elif current != state:
+                    # 仍在写入，重新等待
+                    pending[name] = (now + debounce, current)
+                else:
+                    del pending[name]
+                    output_file = output_path / converter.output_name(excel_file)
+                    converter.reset_dedup_stats()
+                    if not converter.convert_single_file(str(excel_file), str(output_file)):
+                        print(f"✗ 转换失败: {name}（文件再次变化时重试）")
+                    elif converter.dedup:
+                        converter.print_dedup_summary()
+    except KeyboardInterrupt:
+        print("\n停止监视")
+    except WatchedDirectoryGone as e:
+        print(f"✗ 监视的目录已不存在: {e}")
+    finally:
+        watcher.close()